@@ -9,9 +9,28 @@ ETH_PRIVATE_KEY = os.getenv("ETH_PRIVATE_KEY")
 
 parser = argparse.ArgumentParser(description="Ping script")
 parser.add_argument("--symbol", dest="symbol", required=True)
+parser.add_argument(
+    "--snapshot-every",
+    dest="snapshot_every",
+    type=int,
+    default=0,
+    help="write a binary order book snapshot every N updates",
+)
 args = parser.parse_args()
 symbol = args.symbol
 symbols = [symbol]
+dydx_connector = DydxConnector(symbols, Network.mainnet)
+updates_count = 0
+
+
+def write_snapshot():
+    order_book = dydx_connector.order_book[symbol]
+    os.makedirs("../data/order_book/snapshots", exist_ok=True)
+    with open(
+        f"../data/order_book/snapshots/order_book_{symbol}_{order_book.offset}.bin",
+        "wb",
+    ) as file:
+        file.write(order_book.to_bytes())
 
 
 def on_order_book_update(update):
@@ -28,10 +47,14 @@ def on_order_book_update(update):
         json.dump(oreder_book, file)
         file.write("\n")
 
+    global updates_count
+    updates_count += 1
+    if args.snapshot_every and updates_count % args.snapshot_every == 0:
+        write_snapshot()
+
 
 def main():
-    dydx_connector = DydxConnector(symbols, Network.mainnet)
-    dydx_connector.add_orderbook_listener(on_order_book_update)
+    dydx_connector.add_orderbook_subscription(symbol, on_order_book_update)
     dydx_connector.start()
 
 
@@ -24,7 +24,7 @@ DATA_PATH = f"../data/trades/raw/trades_{symbol}_{str(file_index)}.json"
 
 def on_trade_update(update):
     trade = {
-        "update": update,
+        "update": update.to_dict(),
         "time": datetime.now().strftime("%Y-%m-%dT%H:%M:%S.%fZ"),
     }
 
@@ -35,7 +35,7 @@ def on_trade_update(update):
 
 def main():
     dydx_connector = DydxConnector(symbols, Network.mainnet)
-    dydx_connector.add_trade_listener(on_trade_update)
+    dydx_connector.add_trade_subscription(symbol, on_trade_update)
     dydx_connector.start()
 
 
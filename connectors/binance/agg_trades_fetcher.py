@@ -0,0 +1,186 @@
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+import numpy as np
+from tqdm import tqdm
+
+from utils.rate_limiter import RateLimiter
+
+ENDPOINT_WEIGHT = "weight"
+# Binance futures allow 2400 weight per minute per IP
+WEIGHT_LIMITS = {ENDPOINT_WEIGHT: (2400 / 60, 1200)}
+AGG_TRADES_WEIGHT = 20
+HOUR_MS = 60 * 60 * 1000
+
+# Column name, dtype and the aggTrades field it is read from
+COLUMNS = (
+    ("id", np.int64, "a"),
+    ("price", np.float64, "p"),
+    ("qty", np.float64, "q"),
+    ("first_id", np.int64, "f"),
+    ("last_id", np.int64, "l"),
+    ("time", np.int64, "T"),
+    ("is_buyer_maker", np.bool_, "m"),
+)
+
+
+def read_columns(path: str) -> dict:
+    """Return value: column name -> numpy array of a fetched directory"""
+    return {
+        name: np.fromfile(os.path.join(path, name + ".bin"), dtype=dtype)
+        for name, dtype, _ in COLUMNS
+    }
+
+
+class AggTradesFetcher:
+    """
+    Fetches futures aggregate trades between two times into a directory
+    with one raw binary file per column. The aggregate id range is
+    split into chunks that are fetched in parallel under the weight
+    budget of rate_limiter, while chunks are appended strictly in id
+    order. A rerun continues after the last id on disk.
+    """
+
+    page_size = 1000
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        get_agg_trades: Callable,
+        path: str,
+        start_ms: int,
+        end_ms: int,
+        rate_limiter: RateLimiter = None,
+        pages_per_chunk: int = 10,
+        max_workers: int = 8,
+    ) -> None:
+        self.get_agg_trades = get_agg_trades
+        self.path = path
+        self.start_ms = start_ms
+        self.end_ms = end_ms
+        self.rate_limiter = rate_limiter or RateLimiter(WEIGHT_LIMITS)
+        self.pages_per_chunk = pages_per_chunk
+        self.max_workers = max_workers
+
+    def _request(self, **params) -> list:
+        attempt = 0
+        while True:
+            self.rate_limiter.acquire(ENDPOINT_WEIGHT, AGG_TRADES_WEIGHT)
+            try:
+                trades = self.get_agg_trades(**params)
+            except Exception as error:
+                # 429 and 418 mean the weight budget was exceeded
+                if getattr(error, "status_code", None) not in (429, 418):
+                    raise
+                self.rate_limiter.on_throttled(ENDPOINT_WEIGHT)
+                delay = self.rate_limiter.get_retry_delay(
+                    ENDPOINT_WEIGHT, attempt
+                )
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                attempt += 1
+                continue
+            self.rate_limiter.on_success()
+            return trades
+
+    def _get_first_id_after(self, timestamp_ms: int):
+        """Return value: id of the first trade at or after timestamp_ms"""
+        now_ms = int(time.time() * 1000)
+        while timestamp_ms < now_ms:
+            trades = self._request(
+                startTime=timestamp_ms,
+                endTime=timestamp_ms + HOUR_MS - 1,
+                limit=1,
+            )
+            if trades:
+                return trades[0]["a"]
+            timestamp_ms += HOUR_MS
+        return None
+
+    def get_id_range(self) -> tuple:
+        """Return value: first and last aggregate id to fetch"""
+        first_id = self._get_first_id_after(self.start_ms)
+        end_id = self._get_first_id_after(self.end_ms)
+        if end_id is None:
+            end_id = self._request(limit=1)[-1]["a"] + 1
+        return first_id, end_id - 1
+
+    def fetch_chunk(self, from_id: int, to_id: int) -> dict:
+        """Return value: columns of trades with from_id <= id <= to_id"""
+        trades = []
+        while from_id <= to_id:
+            page = self._request(
+                fromId=from_id, limit=min(self.page_size, to_id - from_id + 1)
+            )
+            if not page:
+                break
+            trades.extend(page)
+            from_id = page[-1]["a"] + 1
+        return {
+            name: np.array([trade[field] for trade in trades], dtype=dtype)
+            for name, dtype, field in COLUMNS
+        }
+
+    def _get_column_path(self, name: str) -> str:
+        return os.path.join(self.path, name + ".bin")
+
+    def _get_column_rows(self, name: str, dtype) -> int:
+        path = self._get_column_path(name)
+        if not os.path.exists(path):
+            return 0
+        return os.path.getsize(path) // np.dtype(dtype).itemsize
+
+    def get_saved_rows(self) -> int:
+        """Truncates the columns to the last fully written row"""
+        os.makedirs(self.path, exist_ok=True)
+        rows = min(
+            self._get_column_rows(name, dtype) for name, dtype, _ in COLUMNS
+        )
+        for name, dtype, _ in COLUMNS:
+            with open(self._get_column_path(name), "ab") as file:
+                file.truncate(rows * np.dtype(dtype).itemsize)
+        return rows
+
+    def get_last_saved_id(self):
+        if not self.get_saved_rows():
+            return None
+        ids = np.memmap(self._get_column_path("id"), dtype=np.int64, mode="r")
+        return int(ids[-1])
+
+    def _append(self, columns: dict) -> None:
+        for name, _, _ in COLUMNS:
+            with open(self._get_column_path(name), "ab") as file:
+                columns[name].tofile(file)
+
+    def run(self) -> str:
+        """Return value: directory with the fetched columns"""
+        last_saved_id = self.get_last_saved_id()
+        first_id, last_id = self.get_id_range()
+        if first_id is None:
+            return self.path
+        if last_saved_id is not None:
+            first_id = max(first_id, last_saved_id + 1)
+        chunk_size = self.page_size * self.pages_per_chunk
+        chunks = [
+            (from_id, min(from_id + chunk_size - 1, last_id))
+            for from_id in range(first_id, last_id + 1, chunk_size)
+        ]
+        progress_bar = tqdm(total=len(chunks))
+        pending = deque()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for chunk in chunks:
+                pending.append(executor.submit(self.fetch_chunk, *chunk))
+                # Bounded look-ahead keeps finished chunks from piling up
+                # behind a slow one
+                if len(pending) >= 2 * self.max_workers:
+                    self._append(pending.popleft().result())
+                    progress_bar.update(1)
+            while pending:
+                self._append(pending.popleft().result())
+                progress_bar.update(1)
+        progress_bar.close()
+        return self.path
@@ -10,7 +10,12 @@ from binance.enums import FuturesType
 
 from utils.logger import LOGGER
 
+from connectors.binance.agg_trades_fetcher import AggTradesFetcher
 from connectors.binance.depth_cache import DepthCache
+from connectors.binance.depth_sync import DepthSync
+from connectors.binance.symbol_filters import SymbolFilters
+from connectors.binance.trade import BinanceTrade
+from connectors.binance.trade import TRADE_FORMAT_DICT
 
 
 def dt_to_ms_timestamp(date_time: datetime):
@@ -20,6 +25,8 @@ def dt_to_ms_timestamp(date_time: datetime):
 class BinanceConnector:
     # pylint: disable=logging-fstring-interpolation
     depth_caches = {}
+    depth_snapshot_limit = 1000
+    depth_snapshot_retry_sec = 1
     symbol_infos = {}
     run_duration = 0
 
@@ -33,15 +40,29 @@ class BinanceConnector:
     execution_report_listeners = []
     finish_listeners = []
 
+    # pylint: disable=too-many-arguments
     def __init__(
-        self, api_key, api_secret, symbols, future_type=FuturesType.USD_M
+        self,
+        api_key,
+        api_secret,
+        symbols,
+        future_type=FuturesType.USD_M,
+        trade_format=TRADE_FORMAT_DICT,
     ):
         self.api_key = api_key
         self.api_secret = api_secret
         self.symbols = symbols
         self.future_type = future_type
+        # TRADE_FORMAT_RECORD passes BinanceTrade records to listeners
+        self.trade_format = trade_format
 
         self.sync_client = Client(self.api_key, self.api_secret)
+        self.async_client = None
+        self.symbol_filters = {}
+        self.symbol_filters_loaded = False
+        self.depth_syncs = {}
+        # symbol -> task of _sync_depth, cancelled when the streams stop
+        self.depth_sync_tasks = {}
 
         # TODO: fix cache error in code below. Problems with import
         # for symbol in self.symbols:
@@ -72,23 +93,44 @@ class BinanceConnector:
             self.symbol_infos[symbol] = self.sync_client.get_symbol_info(symbol)
         return self.symbol_infos[symbol]
 
+    def load_symbol_filters(self):
+        """Loads the filters of all the symbols with one request"""
+        exchange_info = self.sync_client.get_exchange_info()
+        for symbol_info in exchange_info["symbols"]:
+            symbol = symbol_info["symbol"]
+            if symbol in self.symbols:
+                self.symbol_infos[symbol] = symbol_info
+                symbol_filters = SymbolFilters.from_symbol_info(symbol_info)
+                self.symbol_filters[symbol] = symbol_filters
+        self.symbol_filters_loaded = True
+
+    def get_symbol_filters(self, symbol) -> SymbolFilters:
+        if symbol not in self.symbol_filters:
+            if not self.symbol_filters_loaded:
+                self.load_symbol_filters()
+            if symbol not in self.symbol_filters:
+                symbol_info = self.get_cached_symbol_info(symbol)
+                if symbol_info is None:
+                    raise ValueError(f"Unknown Binance symbol: {symbol}")
+                self.symbol_filters[symbol] = SymbolFilters.from_symbol_info(
+                    symbol_info
+                )
+        return self.symbol_filters[symbol]
+
     def trunc_price(self, symbol, price):
-        symbol_info = self.get_cached_symbol_info(symbol)
-        tick_size = 0.01
-        for symbol_filter in symbol_info["filters"]:
-            if symbol_filter["filterType"] == "PRICE_FILTER":
-                tick_size = symbol_filter["tick_size"]
-        return self._trunc(price, float(tick_size))
+        return self.get_symbol_filters(symbol).trunc_price(price)
 
     def trunc_quantity(self, symbol, quantity):
-        symbol_info = self.get_cached_symbol_info(symbol)
-        step_size = 0.01
-        for symbol_filter in symbol_info["filters"]:
-            if symbol_filter["filterType"] == "LOT_SIZE":
-                step_size = symbol_filter["step_size"]
-        return self._trunc(quantity, float(step_size))
+        return self.get_symbol_filters(symbol).trunc_quantity(quantity)
 
     def get_cached_order_book(self, symbol):
+        """
+        Return value: live book of a symbol on the depth stream, None
+        while it resyncs. Other symbols get a REST snapshot once.
+        """
+        depth_sync = self.depth_syncs.get(symbol)
+        if depth_sync is not None:
+            return depth_sync.depth_cache
         if symbol not in self.depth_caches:
             raw_order_book = self.sync_client.get_order_book(symbol=symbol)
             depth_cache = DepthCache(symbol)
@@ -152,6 +194,66 @@ class BinanceConnector:
             symbol=symbol, origClientOrderId=str(our_id)
         )
 
+    async def get_async_client(self):
+        if self.async_client is None:
+            self.async_client = await AsyncClient.create(
+                self.api_key, self.api_secret
+            )
+        return self.async_client
+
+    async def close(self):
+        self._cancel_depth_syncs()
+        if self.async_client is not None:
+            await self.async_client.close_connection()
+            self.async_client = None
+
+    async def _async_send_order(
+        self, *, symbol, side, price, quantity, our_id, time_in_force
+    ):
+        async_client = await self.get_async_client()
+        return await async_client.create_order(
+            symbol=symbol,
+            side=side,
+            type=ORDER_TYPE_LIMIT,
+            timeInForce=time_in_force,
+            price=price,
+            quantity=quantity,
+            newClientOrderId=our_id,
+        )
+
+    async def async_send_limit_order(
+        self, *, symbol, side, price, quantity, our_id
+    ):
+        LOGGER.debug(f"send limit order: {symbol} {side} {price} {quantity}")
+        return await self._async_send_order(
+            symbol=symbol,
+            side=side,
+            price=price,
+            quantity=quantity,
+            our_id=our_id,
+            time_in_force=TIME_IN_FORCE_GTC,
+        )
+
+    async def async_send_ioc_order(
+        self, *, symbol, side, price, quantity, our_id
+    ):
+        LOGGER.debug(f"send ioc order: {symbol} {side} {price} {quantity}")
+        return await self._async_send_order(
+            symbol=symbol,
+            side=side,
+            price=price,
+            quantity=quantity,
+            our_id=our_id,
+            time_in_force=TIME_IN_FORCE_IOC,
+        )
+
+    async def async_cancel_order(self, symbol, our_id):
+        LOGGER.debug(f"canceled order: symbol: {symbol} our_id: {str(our_id)}")
+        async_client = await self.get_async_client()
+        return await async_client.cancel_order(
+            symbol=symbol, origClientOrderId=str(our_id)
+        )
+
     def get_historical_trades(self, symbol, from_id, limit):
         return self.sync_client.get_historical_trades(
             symbol=symbol,
@@ -214,6 +316,24 @@ class BinanceConnector:
             trade["time"] -= time_bias
         return trades
 
+    def get_futures_agg_trades(self, symbol, **params):
+        if self.future_type == FuturesType.COIN_M:
+            return self.sync_client.futures_coin_aggregate_trades(
+                symbol=symbol, **params
+            )
+        return self.sync_client.futures_aggregate_trades(
+            symbol=symbol, **params
+        )
+
+    def fetch_futures_agg_trades(self, symbol, start_dt, end_dt, path):
+        """Return value: directory with the columns, see read_columns"""
+        return AggTradesFetcher(
+            lambda **params: self.get_futures_agg_trades(symbol, **params),
+            path,
+            dt_to_ms_timestamp(start_dt),
+            dt_to_ms_timestamp(end_dt),
+        ).run()
+
     async def start(self, run_duration=timedelta(days=1)):
         if self.started:
             LOGGER.error("connector already started")
@@ -223,10 +343,67 @@ class BinanceConnector:
         await self._async_start()
         LOGGER.info("binance connector has been started")
 
-    def _call_order_book_listeners(self, depth_update):
-        # self.depth_caches[depth_update['symbol']].apply_orders(depth_update)
+    def _call_order_book_listeners(self, depth_cache):
         for listener in self.order_book_listeners:
-            listener(self.depth_caches[depth_update["symbol"]])
+            listener(depth_cache)
+
+    async def _get_depth_snapshot(self, async_client, symbol):
+        if self.future_type == FuturesType.COIN_M:
+            return await async_client.futures_coin_order_book(
+                symbol=symbol, limit=self.depth_snapshot_limit
+            )
+        return await async_client.futures_order_book(
+            symbol=symbol, limit=self.depth_snapshot_limit
+        )
+
+    async def _sync_depth(self, async_client, depth_sync):
+        while depth_sync.needs_snapshot:
+            try:
+                snapshot = await self._get_depth_snapshot(
+                    async_client, depth_sync.symbol
+                )
+            except Exception as error:
+                LOGGER.error(f"depth snapshot exception: {str(error)}")
+            else:
+                if depth_sync.on_snapshot(snapshot):
+                    depth_cache = depth_sync.depth_cache
+                    self.depth_caches[depth_sync.symbol] = depth_cache
+                    LOGGER.info(f"{depth_sync.symbol} depth synced")
+                    self._call_order_book_listeners(depth_cache)
+                    return
+                LOGGER.warning(
+                    f"{depth_sync.symbol} depth snapshot rejected, retrying"
+                )
+            # Every snapshot costs request weight
+            await asyncio.sleep(self.depth_snapshot_retry_sec)
+
+    def _start_depth_sync(self, async_client, depth_sync):
+        task = self.depth_sync_tasks.get(depth_sync.symbol)
+        if task is not None and not task.done():
+            return
+        task = asyncio.create_task(self._sync_depth(async_client, depth_sync))
+        task.add_done_callback(self._on_depth_sync_done)
+        self.depth_sync_tasks[depth_sync.symbol] = task
+
+    @staticmethod
+    def _on_depth_sync_done(task):
+        if not task.cancelled() and task.exception() is not None:
+            LOGGER.error(f"depth sync exception: {str(task.exception())}")
+
+    def _cancel_depth_syncs(self):
+        for task in self.depth_sync_tasks.values():
+            task.cancel()
+        self.depth_sync_tasks.clear()
+
+    def _on_depth_update(self, async_client, depth_update):
+        depth_sync = self.depth_syncs[depth_update["s"]]
+        was_synced = depth_sync.is_synced
+        if depth_sync.on_event(depth_update):
+            self._call_order_book_listeners(depth_sync.depth_cache)
+        elif was_synced:
+            self.depth_caches.pop(depth_sync.symbol, None)
+            LOGGER.warning(f"{depth_sync.symbol} depth gap, resyncing")
+            self._start_depth_sync(async_client, depth_sync)
 
     def _call_trade_listeners(self, trade):
         # self.depth_caches[trade['symbol']].apply_trade(trade)
@@ -247,12 +424,13 @@ class BinanceConnector:
             await self.user_data_task
 
     async def _subscribe_exchange_data(self):
-        async_client = await AsyncClient.create()
+        async_client = await self.get_async_client()
         binance_manager = BinanceSocketManager(async_client)
 
         streams = []
 
         for symbol in self.symbols:
+            self.depth_syncs[symbol] = DepthSync(symbol)
             lower_symbol = symbol.lower()
             streams.extend(
                 [
@@ -269,42 +447,30 @@ class BinanceConnector:
 
         stop_time = datetime.utcnow() + self.run_duration
         async with multiplex_socket as msm_socket:
-            while datetime.utcnow() < stop_time:
-                update = await msm_socket.recv()
-                try:
-                    stream = update["stream"]
-                    if stream.endswith("trade"):
-                        trade = {}
-                        trade["size"] = float(update["data"]["q"])
-                        trade["side"] = "BUY" if update["data"]["m"] else "SELL"
-                        trade["price"] = float(update["data"]["p"])
-                        trade["createdAt"] = (
-                            datetime.fromtimestamp(update["data"]["E"] / 1000)
-                        ).strftime("%Y-%m-%dT%H:%M:%S.%f")
-                        trade["exchange"] = "binance"
-                        trade["symbol"] = update["data"]["s"]
-                        trade["recieveTime"] = (datetime.utcnow()).strftime(
-                            "%Y-%m-%dT%H:%M:%S.%f"
-                        )
-                        self._call_trade_listeners(trade)
-                    elif stream.endswith("depth"):
-                        self._call_order_book_listeners(update["data"])
-                    else:
-                        LOGGER.error(f"unknown message: {update}")
-                except Exception as error:
-                    LOGGER.error(
-                        f"exchange data exception: {str(error)} traceback: {traceback.format_exc()}"
-                    )
-
-    @staticmethod
-    def _trunc(price, tick_size):
-        # pylint: disable=consider-using-f-string
-        num = 0
-        while tick_size < 1:
-            num += 1
-            tick_size *= 10
-        string = f"{price}"
-        if "e" in string or "E" in string:
-            return "{0:.{1}f}".format(price, num)
-        iteration, _, dec = string.partition(".")
-        return float(".".join([iteration, (dec + "0" * num)[:num]]))
+            for depth_sync in self.depth_syncs.values():
+                self._start_depth_sync(async_client, depth_sync)
+            try:
+                await self._read_exchange_data(
+                    async_client, msm_socket, stop_time
+                )
+            finally:
+                self._cancel_depth_syncs()
+
+    async def _read_exchange_data(self, async_client, msm_socket, stop_time):
+        while datetime.utcnow() < stop_time:
+            update = await msm_socket.recv()
+            try:
+                stream = update["stream"]
+                if stream.endswith("trade"):
+                    trade = BinanceTrade.from_message(update["data"])
+                    if self.trade_format == TRADE_FORMAT_DICT:
+                        trade = trade.to_dict()
+                    self._call_trade_listeners(trade)
+                elif stream.endswith("depth"):
+                    self._on_depth_update(async_client, update["data"])
+                else:
+                    LOGGER.error(f"unknown message: {update}")
+            except Exception as error:
+                LOGGER.error(
+                    f"exchange data exception: {str(error)} traceback: {traceback.format_exc()}"
+                )
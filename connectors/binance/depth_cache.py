@@ -1,68 +1,123 @@
-from operator import itemgetter
+import time
+from itertools import islice
+
+from sortedcontainers import SortedDict
+
+from utils.book_snapshot import BookSnapshot
+from utils.book_snapshot import make_side
+from utils.book_snapshot import pack_snapshot
+from utils.book_snapshot import unpack_snapshot
 
 
 class DepthCache:
+    """
+    Levels are kept in SortedDicts keyed by the converted price, so the
+    best levels and crossed ranges are found without sorting.
+    """
+
     def __init__(self, symbol, conv_type=float):
         self.symbol = symbol
-        self._bids = {}
-        self._asks = {}
+        self._bids = SortedDict()
+        self._asks = SortedDict()
         self.timestamp = None
+        self.last_update_id = None
         self.conv_type = conv_type
 
     def add_bid(self, bid):
-        self._bids[bid[0]] = self.conv_type(bid[1])
-        if bid[1] == "0.00000000":
-            del self._bids[bid[0]]
+        price = self.conv_type(bid[0])
+        quantity = self.conv_type(bid[1])
+        if quantity:
+            self._bids[price] = quantity
+        else:
+            self._bids.pop(price, None)
 
     def add_ask(self, ask):
-        self._asks[ask[0]] = self.conv_type(ask[1])
-        if ask[1] == "0.00000000":
-            del self._asks[ask[0]]
+        price = self.conv_type(ask[0])
+        quantity = self.conv_type(ask[1])
+        if quantity:
+            self._asks[price] = quantity
+        else:
+            self._asks.pop(price, None)
 
     def get_bids(self):
-        return DepthCache.sort_depth(
-            self._bids, reverse=True, conv_type=self.conv_type
-        )
+        return self.top_bids(len(self._bids))
 
     def get_asks(self):
-        return DepthCache.sort_depth(
-            self._asks, reverse=False, conv_type=self.conv_type
-        )
+        return self.top_asks(len(self._asks))
+
+    def top_bids(self, n: int) -> list:
+        """Return value: [[price, quantity]] of the n best bids"""
+        return [
+            [price, self._bids[price]]
+            for price in islice(reversed(self._bids), n)
+        ]
+
+    def top_asks(self, n: int) -> list:
+        """Return value: [[price, quantity]] of the n best asks"""
+        return [[price, self._asks[price]] for price in islice(self._asks, n)]
+
+    def get_best_bid(self):
+        return self._bids.peekitem(-1)[0] if self._bids else None
+
+    def get_best_ask(self):
+        return self._asks.peekitem(0)[0] if self._asks else None
 
     def apply_orders(self, msg):
-        self.timestamp = msg["E"]
+        self.timestamp = msg.get("E", self.timestamp)
         for bid in msg.get("b", []) + msg.get("bids", []):
             self.add_bid(bid)
         for ask in msg.get("a", []) + msg.get("asks", []):
             self.add_ask(ask)
 
+    @staticmethod
+    def _remove_range(book: SortedDict, **irange_kwargs) -> None:
+        for price in list(book.irange(**irange_kwargs)):
+            del book[price]
+
     def apply_trade(self, trade):
         self.timestamp = trade["E"]
+        price = self.conv_type(trade["p"])
         if trade["aggressor_side"] == "BUY":
-            to_delete = []
-            for price, _ in self._asks.items():
-                if float(price) < trade["price"]:
-                    to_delete.append(price)
-
-            for price in to_delete:
-                del self._asks[price]
-
-            if trade["p"] not in self._asks:
-                self._asks[trade["p"]] = trade["qty"]
+            self._remove_range(
+                self._asks, maximum=price, inclusive=(True, False)
+            )
+            self._asks.setdefault(price, trade["qty"])
         else:
-            to_delete = []
-            for price, _ in self._bids.items():
-                if float(price) > trade["price"]:
-                    to_delete.append(price)
-
-            for price in to_delete:
-                del self._bids[price]
+            self._remove_range(
+                self._bids, minimum=price, inclusive=(False, True)
+            )
+            self._bids.setdefault(price, trade["qty"])
 
-            if trade["p"] not in self._bids:
-                self._bids[trade["p"]] = trade["qty"]
+    def to_bytes(self) -> bytes:
+        return pack_snapshot(
+            BookSnapshot(
+                self.symbol,
+                self.timestamp or int(time.time() * 1000),
+                self.last_update_id or 0,
+                make_side(
+                    (price, quantity, 0)
+                    for price, quantity in self._bids.items()
+                ),
+                make_side(
+                    (price, quantity, 0)
+                    for price, quantity in self._asks.items()
+                ),
+            )
+        )
 
-    @staticmethod
-    def sort_depth(vals, reverse=False, conv_type=float):
-        lst = [[conv_type(price), quantity] for price, quantity in vals.items()]
-        lst = sorted(lst, key=itemgetter(0), reverse=reverse)
-        return lst
+    @classmethod
+    def from_bytes(cls, data: bytes, conv_type=float) -> "DepthCache":
+        snapshot = unpack_snapshot(data)
+        depth_cache = cls(snapshot.symbol, conv_type=conv_type)
+        depth_cache.timestamp = snapshot.timestamp
+        depth_cache.last_update_id = snapshot.offset or None
+        for book, side in (
+            (depth_cache._bids, snapshot.bids),
+            (depth_cache._asks, snapshot.asks),
+        ):
+            # Through repr, so Decimal gets the shortest exact digits
+            book.update(
+                (conv_type(repr(price)), conv_type(repr(quantity)))
+                for price, quantity in zip(side.prices, side.sizes)
+            )
+        return depth_cache
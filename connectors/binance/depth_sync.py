@@ -0,0 +1,70 @@
+from connectors.binance.depth_cache import DepthCache
+
+
+class DepthSync:
+    """
+    Keeps a DepthCache in step with a futures diff-depth stream:
+    events are buffered until a REST snapshot arrives, events older
+    than its lastUpdateId are dropped and the rest must chain through
+    pu == previous u. On a break the cache is dropped and a new
+    snapshot is requested through needs_snapshot.
+    """
+
+    def __init__(self, symbol: str) -> None:
+        self.symbol = symbol
+        self.depth_cache = None
+        self.last_update_id = None
+        self.buffer = []
+        self.needs_snapshot = True
+        self.is_first_event = False
+        self.resyncs = 0
+
+    @property
+    def is_synced(self) -> bool:
+        return self.depth_cache is not None
+
+    def _reset(self) -> None:
+        self.depth_cache = None
+        self.last_update_id = None
+        self.buffer = []
+        self.needs_snapshot = True
+        self.resyncs += 1
+
+    def _apply(self, event: dict) -> bool:
+        if self.is_first_event:
+            # First event after the snapshot must straddle lastUpdateId
+            if not event["U"] <= self.last_update_id <= event["u"]:
+                self._reset()
+                return False
+            self.is_first_event = False
+        elif event["pu"] != self.last_update_id:
+            self._reset()
+            return False
+        self.depth_cache.apply_orders(event)
+        self.depth_cache.last_update_id = event["u"]
+        self.last_update_id = event["u"]
+        return True
+
+    def on_event(self, event: dict) -> bool:
+        """Return value: True if the event was applied to a synced cache"""
+        if not self.is_synced:
+            self.buffer.append(event)
+            return False
+        return self._apply(event)
+
+    def on_snapshot(self, snapshot: dict) -> bool:
+        """Return value: True if the buffered events chained onto it"""
+        depth_cache = DepthCache(self.symbol)
+        depth_cache.apply_orders(snapshot)
+        depth_cache.last_update_id = snapshot["lastUpdateId"]
+        self.depth_cache = depth_cache
+        self.last_update_id = snapshot["lastUpdateId"]
+        self.needs_snapshot = False
+        self.is_first_event = True
+        buffer, self.buffer = self.buffer, []
+        for event in buffer:
+            if event["u"] < snapshot["lastUpdateId"]:
+                continue
+            if not self._apply(event):
+                return False
+        return True
@@ -0,0 +1,161 @@
+import asyncio
+import re
+import time
+from collections import defaultdict
+from typing import Callable, NamedTuple
+
+import websockets
+
+from utils.decoder import loads
+from utils.reconnect import run_forever
+
+COIN_M_STREAM_URL = "wss://dstream.binance.com/stream?streams="
+USD_M_STREAM_URL = "wss://fstream.binance.com/stream?streams="
+
+STREAM_TRADE = "trade"
+STREAM_AGG_TRADE = "aggTrade"
+STREAM_BOOK_TICKER = "bookTicker"
+
+# Combined stream messages start with {"stream":"<symbol>@<stream>"
+STREAM_NAME_START = len('{"stream":"')
+TRADE_TIME_RE = re.compile(r'"T":(\d+)')
+
+
+class BestPrice(NamedTuple):
+    symbol: str
+    bid_price: float
+    bid_size: float
+    ask_price: float
+    ask_size: float
+    update_id: int
+    time_ms: int
+    receive_ns: int
+
+    @property
+    def mid(self) -> float:
+        return (self.bid_price + self.ask_price) / 2
+
+
+class MarketTrade(NamedTuple):
+    symbol: str
+    stream: str
+    price: float
+    size: float
+    is_buyer_maker: bool
+    time_ms: int
+    receive_ns: int
+
+
+class BinanceMarketFeed:
+    """
+    Reads trade, aggTrade and bookTicker streams of many symbols over
+    combined stream connections. Trades are filtered on the raw text
+    before decoding: buyer-maker trades when skip_buyer_maker is set,
+    non-market trades and trades older than min_trade_time_ms. Listeners
+    get BestPrice and MarketTrade records.
+    """
+
+    max_streams_per_connection = 200
+    reconnect_delay_sec = 1
+
+    def __init__(
+        self,
+        symbols: list,
+        streams: tuple = (STREAM_TRADE, STREAM_AGG_TRADE, STREAM_BOOK_TICKER),
+        stream_url: str = COIN_M_STREAM_URL,
+        skip_buyer_maker: bool = False,
+    ) -> None:
+        self.stream_names = [
+            f"{symbol.lower()}@{stream}"
+            for symbol in symbols
+            for stream in streams
+        ]
+        self.stream_url = stream_url
+        self.skip_buyer_maker = skip_buyer_maker
+        self.min_trade_time_ms = 0
+        self.listeners = defaultdict(list)
+        self.received = 0
+        self.filtered = 0
+
+    def add_listener(self, stream: str, listener: Callable) -> None:
+        self.listeners[stream].append(listener)
+
+    def _is_trade_skipped(self, message: str) -> bool:
+        if self.skip_buyer_maker and '"m":true' in message:
+            return True
+        # Only the trade stream has X, other values are liquidations
+        # and ADL fills
+        if '"X":"' in message and '"X":"MARKET"' not in message:
+            return True
+        if self.min_trade_time_ms:
+            match = TRADE_TIME_RE.search(message)
+            if match and int(match.group(1)) <= self.min_trade_time_ms:
+                return True
+        return False
+
+    @staticmethod
+    def parse_book_ticker(data: dict, receive_ns: int) -> BestPrice:
+        return BestPrice(
+            data["s"],
+            float(data["b"]),
+            float(data["B"]),
+            float(data["a"]),
+            float(data["A"]),
+            data["u"],
+            data["T"],
+            receive_ns,
+        )
+
+    @staticmethod
+    def parse_trade(stream: str, data: dict, receive_ns: int) -> MarketTrade:
+        return MarketTrade(
+            data["s"],
+            stream,
+            float(data["p"]),
+            float(data["q"]),
+            data["m"],
+            data["T"],
+            receive_ns,
+        )
+
+    def on_message(self, message: str, receive_ns: int) -> None:
+        self.received += 1
+        name_end = message.find('"', STREAM_NAME_START)
+        stream = message[message.find("@", STREAM_NAME_START) + 1 : name_end]
+        listeners = self.listeners.get(stream)
+        if not listeners:
+            return
+        if stream != STREAM_BOOK_TICKER and self._is_trade_skipped(message):
+            self.filtered += 1
+            return
+        data = loads(message)["data"]
+        if stream == STREAM_BOOK_TICKER:
+            event = self.parse_book_ticker(data, receive_ns)
+        else:
+            event = self.parse_trade(stream, data, receive_ns)
+        for listener in listeners:
+            listener(event)
+
+    async def _read_connection(self, stream_names: list) -> None:
+        async with websockets.connect(
+            self.stream_url + "/".join(stream_names), ping_interval=None
+        ) as websocket:
+            while True:
+                message = await websocket.recv()
+                self.on_message(message, time.monotonic_ns())
+
+    async def _run_connection(self, stream_names: list) -> None:
+        await run_forever(
+            lambda: self._read_connection(stream_names),
+            "Binance market feed",
+            self.reconnect_delay_sec,
+        )
+
+    async def run(self) -> None:
+        step = self.max_streams_per_connection
+        await asyncio.gather(
+            *[
+                self._run_connection(self.stream_names[start : start + step])
+                for start in range(0, len(self.stream_names), step)
+            ]
+        )
@@ -0,0 +1,42 @@
+import math
+from typing import NamedTuple
+
+
+def get_decimals(step: str) -> int:
+    """Return value: decimals of a step such as 0.01000000"""
+    _, _, fraction = step.rstrip("0").partition(".")
+    return len(fraction)
+
+
+class SymbolFilters(NamedTuple):
+    tick_size: float
+    step_size: float
+    price_scale: int
+    quantity_scale: int
+
+    @classmethod
+    def from_symbol_info(cls, symbol_info: dict) -> "SymbolFilters":
+        tick_size = "0.01"
+        step_size = "0.01"
+        for symbol_filter in symbol_info["filters"]:
+            if symbol_filter["filterType"] == "PRICE_FILTER":
+                tick_size = symbol_filter["tickSize"]
+            elif symbol_filter["filterType"] == "LOT_SIZE":
+                step_size = symbol_filter["stepSize"]
+        return cls(
+            float(tick_size),
+            float(step_size),
+            10 ** get_decimals(tick_size),
+            10 ** get_decimals(step_size),
+        )
+
+    @staticmethod
+    def _trunc(value: float, scale: int) -> float:
+        # Rounding first keeps 0.29 * 100 = 28.999999999999996 at 29
+        return math.floor(round(value * scale, 6)) / scale
+
+    def trunc_price(self, price: float) -> float:
+        return self._trunc(price, self.price_scale)
+
+    def trunc_quantity(self, quantity: float) -> float:
+        return self._trunc(quantity, self.quantity_scale)
@@ -0,0 +1,48 @@
+import time
+from datetime import datetime
+from typing import NamedTuple
+
+TRADE_FORMAT_DICT = "dict"
+TRADE_FORMAT_RECORD = "record"
+
+
+class BinanceTrade(NamedTuple):
+    symbol: str
+    side: str
+    price: float
+    size: float
+    created_at_ms: int
+    # time.time_ns(), unlike the monotonic receive_ns of the feeds
+    receive_time_ns: int
+    exchange: str = "binance"
+
+    @classmethod
+    def from_message(cls, data: dict, receive_time_ns: int = None):
+        return cls(
+            data["s"],
+            "BUY" if data["m"] else "SELL",
+            float(data["p"]),
+            float(data["q"]),
+            data["E"],
+            time.time_ns() if receive_time_ns is None else receive_time_ns,
+        )
+
+    @property
+    def receive_ms(self) -> int:
+        return self.receive_time_ns // 1_000_000
+
+    def to_dict(self) -> dict:
+        """Return value: trade in the string format of the dict stream"""
+        return {
+            "size": self.size,
+            "side": self.side,
+            "price": self.price,
+            "createdAt": datetime.fromtimestamp(
+                self.created_at_ms / 1000
+            ).strftime("%Y-%m-%dT%H:%M:%S.%f"),
+            "exchange": self.exchange,
+            "symbol": self.symbol,
+            "recieveTime": datetime.utcfromtimestamp(
+                self.receive_time_ns / 1e9
+            ).strftime("%Y-%m-%dT%H:%M:%S.%f"),
+        }
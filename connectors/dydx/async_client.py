@@ -0,0 +1,172 @@
+import json
+
+import aiohttp
+
+from dydx3 import Client
+from dydx3.constants import TIME_IN_FORCE_GTT
+from dydx3.errors import DydxApiError
+from dydx3.helpers.db import get_account_id
+from dydx3.helpers.request_helpers import epoch_seconds_to_iso
+from dydx3.helpers.request_helpers import generate_now_iso
+from dydx3.helpers.request_helpers import generate_query_path
+from dydx3.helpers.request_helpers import json_stringify
+from dydx3.helpers.request_helpers import random_client_id
+from dydx3.helpers.request_helpers import remove_nones
+from dydx3.starkex.order import SignableOrder
+
+
+# pylint: disable=too-few-public-methods
+class ApiResponse:
+    """Minimal response object accepted by DydxApiError"""
+
+    def __init__(self, status_code: int, text: str) -> None:
+        self.status_code = status_code
+        self.text = text
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class AsyncRestClient:
+    """
+    Asyncio counterpart of dydx3.Client for the order entry endpoints.
+    Requests are signed with the credentials of the wrapped sync client
+    and sent over one pooled keep-alive aiohttp session.
+    """
+
+    def __init__(
+        self,
+        client: Client,
+        connections_limit: int = 32,
+        keepalive_timeout: float = 60,
+    ) -> None:
+        self.client = client
+        self.host = client.host
+        self.connections_limit = connections_limit
+        self.keepalive_timeout = keepalive_timeout
+        self.session = None
+
+    def get_session(self) -> aiohttp.ClientSession:
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self.connections_limit,
+                    keepalive_timeout=self.keepalive_timeout,
+                    ttl_dns_cache=300,
+                ),
+                headers={
+                    "Accept": "application/json",
+                    "Content-Type": "application/json",
+                    "User-Agent": "dydx/python",
+                },
+            )
+        return self.session
+
+    async def close(self) -> None:
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+
+    async def _request(
+        self, method: str, request_path: str, body: str = None, headers=None
+    ) -> dict:
+        async with self.get_session().request(
+            method, self.host + request_path, data=body, headers=headers
+        ) as response:
+            text = await response.text()
+            if not 200 <= response.status < 300:
+                raise DydxApiError(ApiResponse(response.status, text))
+            return json.loads(text) if text else {}
+
+    async def _private_request(
+        self, method: str, endpoint: str, data: dict = None
+    ) -> dict:
+        data = remove_nones(data or {})
+        now_iso_string = generate_now_iso()
+        request_path = "/".join(["/v3", endpoint])
+        signature = self.client.private.sign(
+            request_path=request_path,
+            method=method,
+            iso_timestamp=now_iso_string,
+            data=data,
+        )
+        headers = {
+            "DYDX-SIGNATURE": signature,
+            "DYDX-API-KEY": self.client.api_key_credentials["key"],
+            "DYDX-TIMESTAMP": now_iso_string,
+            "DYDX-PASSPHRASE": self.client.api_key_credentials["passphrase"],
+        }
+        return await self._request(
+            method,
+            request_path,
+            json_stringify(data) if data else None,
+            headers,
+        )
+
+    async def get_account(self, ethereum_address: str = None) -> dict:
+        address = ethereum_address or self.client.default_address
+        return await self._private_request(
+            "GET", "/".join(["accounts", get_account_id(address)])
+        )
+
+    # pylint: disable=too-many-locals
+    async def create_order(
+        self,
+        *,
+        position_id,
+        market: str,
+        side: str,
+        order_type: str,
+        post_only: bool,
+        size: str,
+        price: str,
+        limit_fee: str,
+        expiration_epoch_seconds: int,
+        time_in_force: str = None,
+        cancel_id: str = None,
+        trigger_price: str = None,
+        trailing_percent: str = None,
+        client_id: str = None,
+        signature: str = None,
+    ) -> dict:
+        client_id = client_id or random_client_id()
+        if not signature:
+            signature = SignableOrder(
+                network_id=self.client.network_id,
+                position_id=position_id,
+                client_id=client_id,
+                market=market,
+                side=side,
+                human_size=size,
+                human_price=price,
+                limit_fee=limit_fee,
+                expiration_epoch_seconds=expiration_epoch_seconds,
+            ).sign(self.client.stark_private_key)
+
+        order = {
+            "market": market,
+            "side": side,
+            "type": order_type,
+            "timeInForce": time_in_force or TIME_IN_FORCE_GTT,
+            "size": size,
+            "price": price,
+            "limitFee": limit_fee,
+            "expiration": epoch_seconds_to_iso(expiration_epoch_seconds),
+            "cancelId": cancel_id,
+            "triggerPrice": trigger_price,
+            "trailingPercent": trailing_percent,
+            "postOnly": post_only,
+            "clientId": client_id,
+            "signature": signature,
+        }
+        return await self._private_request("POST", "orders", order)
+
+    async def cancel_order(self, order_id: str) -> dict:
+        return await self._private_request(
+            "DELETE", "/".join(["orders", order_id])
+        )
+
+    async def cancel_all_orders(self, market: str = None) -> dict:
+        params = {"market": market} if market else {}
+        return await self._private_request(
+            "DELETE", generate_query_path("orders", params)
+        )
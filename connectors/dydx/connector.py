@@ -1,18 +1,19 @@
-import json
 import os
 import asyncio
+import itertools
+import time
 
 from typing import Callable
+from concurrent.futures import ThreadPoolExecutor
 from functools import wraps
 from datetime import datetime
-from dataclasses import dataclass
+from dataclasses import dataclass, asdict
 from web3 import Web3
 from tqdm import tqdm
 
-import websockets
-
 from dydx3 import Client
 from dydx3.helpers.request_helpers import generate_now_iso
+from dydx3.helpers.request_helpers import random_client_id
 from dydx3.constants import TIME_IN_FORCE_FOK
 from dydx3.constants import TIME_IN_FORCE_GTT
 from dydx3.constants import NETWORK_ID_MAINNET, NETWORK_ID_ROPSTEN
@@ -26,28 +27,113 @@ from dydx3.constants import ORDER_TYPE_TRAILING_STOP
 from dydx3.constants import ORDER_STATUS_OPEN
 from dydx3.errors import DydxApiError
 
+from connectors.dydx.async_client import AsyncRestClient
 from connectors.dydx.order_book_cache import OrderBookCache
-
-
-def safe_execute(f: Callable):
-    @wraps(f)
-    def wrapper(*args, **kwargs):
-        num_of_connection_attempts = 50
-        for _ in range(num_of_connection_attempts):
-            try:
-                return f(*args, **kwargs)
-            except DydxApiError as error:
-                raise error
-            except Exception as error:
-                print(
-                    "Basic exception while executing function",
-                    f.__name__,
-                    ":",
-                    error,
-                )
-        raise Exception("DydxConnecotor error")
-
-    return wrapper
+from connectors.dydx.order_book_cache import OrderBookGapError
+from connectors.dydx.order_signer import OrderSigner
+from connectors.dydx.subscription import Subscription
+from connectors.dydx.subscription import CHANNEL_ACCOUNTS
+from connectors.dydx.subscription import CHANNEL_ORDERBOOK
+from connectors.dydx.subscription import CHANNEL_TRADES
+from connectors.dydx.trade import Trade
+from connectors.dydx.websocket_manager import WebsocketManager
+from connectors.dydx.websocket_manager import SHARD_BY_SYMBOL
+from utils.decoder import loads
+from utils.logger import LOGGER
+from utils.rate_limiter import RateLimiter
+
+ENDPOINT_PUBLIC = "public"
+ENDPOINT_PRIVATE = "private"
+ENDPOINT_ORDERS = "orders"
+ENDPOINT_CANCEL = "cancel"
+ENDPOINT_CANCEL_ALL = "cancel_all"
+
+# dYdX v3 limits as (requests per second, burst)
+RATE_LIMITS = {
+    ENDPOINT_PUBLIC: (17.5, 175),
+    ENDPOINT_PRIVATE: (17.5, 175),
+    ENDPOINT_ORDERS: (10, 10),
+    ENDPOINT_CANCEL: (25, 250),
+    ENDPOINT_CANCEL_ALL: (0.3, 3),
+}
+
+
+def _get_rate_limiter(args: tuple) -> RateLimiter:
+    rate_limiter = getattr(args[0], "rate_limiter", None) if args else None
+    return rate_limiter or RateLimiter.shared("default", RATE_LIMITS)
+
+
+def _get_retry_delay(
+    rate_limiter: RateLimiter,
+    endpoint_class: str,
+    function_name: str,
+    error: Exception,
+    attempt: int,
+) -> float:
+    if isinstance(error, DydxApiError):
+        if error.status_code != 429:
+            raise error
+        rate_limiter.on_throttled(endpoint_class)
+    else:
+        LOGGER.warning(
+            f"Basic exception while executing function {function_name}:"
+            f" {error}"
+        )
+    delay = rate_limiter.get_retry_delay(endpoint_class, attempt)
+    if delay is None:
+        raise error
+    return delay
+
+
+def rate_limited(endpoint_class: str) -> Callable:
+    def decorator(f: Callable):
+        # The retry loop only ends by returning or raising
+        # pylint: disable=inconsistent-return-statements
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            rate_limiter = _get_rate_limiter(args)
+            for attempt in itertools.count():
+                rate_limiter.acquire(endpoint_class)
+                try:
+                    result = f(*args, **kwargs)
+                except Exception as error:
+                    delay = _get_retry_delay(
+                        rate_limiter, endpoint_class, f.__name__, error, attempt
+                    )
+                else:
+                    rate_limiter.on_success()
+                    return result
+                time.sleep(delay)
+
+        return wrapper
+
+    return decorator
+
+
+def async_rate_limited(endpoint_class: str) -> Callable:
+    def decorator(f: Callable):
+        @wraps(f)
+        async def wrapper(*args, **kwargs):
+            rate_limiter = _get_rate_limiter(args)
+            for attempt in itertools.count():
+                await rate_limiter.async_acquire(endpoint_class)
+                try:
+                    result = await f(*args, **kwargs)
+                except Exception as error:
+                    delay = _get_retry_delay(
+                        rate_limiter, endpoint_class, f.__name__, error, attempt
+                    )
+                else:
+                    rate_limiter.on_success()
+                    return result
+                await asyncio.sleep(delay)
+
+        return wrapper
+
+    return decorator
+
+
+safe_execute = rate_limited(ENDPOINT_PRIVATE)
 
 
 @dataclass
@@ -74,19 +160,51 @@ class Network:
     )
 
 
+@dataclass
+class OrderRequest:
+    method: str
+    params: dict
+
+
+@dataclass
+class OrderResult:
+    request: OrderRequest
+    response: dict = None
+    error: Exception = None
+    elapsed_ns: int = 0
+
+
+@dataclass
+class ResyncStats:
+    gaps: int = 0
+    disconnects: int = 0
+    resyncs: int = 0
+    total_ns: int = 0
+    max_ns: int = 0
+    last_ns: int = 0
+
+
 class DydxConnector:
-    order_book = {}
-    symbols_info = {}
     num_of_connection_attempts = 50
+    batch_max_workers = 8
 
+    # pylint: disable=too-many-arguments
     def __init__(
         self,
         symbols: list = [],
         network: NetworkSettings = Network.ropsten,
+        rate_limiter: RateLimiter = None,
+        decoder: Callable = loads,
+        num_connections: int = 1,
+        shard_by: str = SHARD_BY_SYMBOL,
     ) -> None:
         self.address = os.getenv("ETH_ADDRESS")
         self.private_key = os.getenv("ETH_PRIVATE_KEY")
         self.network = network
+        self.decoder = decoder
+        self.rate_limiter = rate_limiter or RateLimiter.shared(
+            str(self.address), RATE_LIMITS
+        )
         self.sync_client = Client(
             network_id=self.network.network_id,
             host=self.network.api_host,
@@ -97,16 +215,38 @@ class DydxConnector:
         self.sync_client.stark_private_key = (
             self.sync_client.onboarding.derive_stark_key()
         )
+        self.async_client = AsyncRestClient(self.sync_client)
+        self.order_signer = OrderSigner(
+            self.sync_client.network_id, self.sync_client.stark_private_key
+        )
+        self.account = {}
+        self.batch_executor = None
         self.symbols = symbols
+        self.symbols_info = {}
+        self.order_book = {}
         for symbol in symbols:
             self.order_book[symbol] = OrderBookCache(symbol)
+        self.resync_started_ns = {}
+        self.resync_stats = {}
 
-        self.subscriptions = []
+        self.subscriptions = {}
         self.orderbook_listeners = []
         self.account_listeners = []
         self.trades_listeners = []
+        self.channel_handlers = {
+            CHANNEL_ORDERBOOK: self._on_orderbook_update,
+            CHANNEL_TRADES: self._on_trades_update,
+            CHANNEL_ACCOUNTS: self._on_account_update,
+        }
+        self.websocket_manager = WebsocketManager(
+            self.network.ws_host,
+            self._on_message,
+            num_connections=num_connections,
+            shard_by=shard_by,
+            on_disconnect=self._on_disconnect,
+        )
 
-    @safe_execute
+    @rate_limited(ENDPOINT_PRIVATE)
     def get_user(self):
         user = self.sync_client.private.get_user()
         return user
@@ -114,12 +254,15 @@ class DydxConnector:
     def get_client(self):
         return self.sync_client
 
-    @safe_execute
+    def get_rate_limiter_stats(self) -> dict:
+        return self.rate_limiter.get_stats()
+
+    @rate_limited(ENDPOINT_PRIVATE)
     def get_our_accounts(self):
         account = self.sync_client.private.get_accounts()
         return account
 
-    @safe_execute
+    @rate_limited(ENDPOINT_PUBLIC)
     def get_symbol_info(self, symbol, cached=True):
         if symbol not in self.symbols_info or not cached:
             self.symbols_info[symbol] = self.sync_client.public.get_markets(
@@ -128,18 +271,18 @@ class DydxConnector:
             return self.symbols_info[symbol]
         return self.symbols_info[symbol]
 
-    @safe_execute
+    @rate_limited(ENDPOINT_PUBLIC)
     def get_order_book(self, symbol):
         order_book = self.sync_client.public.get_orderbook(market=symbol)
         return order_book
 
-    @safe_execute
+    @rate_limited(ENDPOINT_PRIVATE)
     def get_our_orders(self, *, opened=True):
         if opened:
             return self.sync_client.private.get_orders(status=ORDER_STATUS_OPEN)
         return self.sync_client.private.get_orders()
 
-    @safe_execute
+    @rate_limited(ENDPOINT_PRIVATE)
     def get_our_positions(self, *, opened=True, symbol=None):
         if opened:
             status = POSITION_STATUS_OPEN
@@ -154,7 +297,10 @@ class DydxConnector:
             positions = self.sync_client.private.get_positions(status=status)
         return positions
 
-    @safe_execute
+    @rate_limited(ENDPOINT_PUBLIC)
+    def get_trades(self, symbol: str, starting_before_or_at: str = None):
+        return self.sync_client.public.get_trades(symbol, starting_before_or_at)
+
     def get_historical_trades(
         self, symbol: str, start_dt: datetime, end_dt: datetime
     ) -> list:
@@ -164,11 +310,8 @@ class DydxConnector:
         progress_bar = tqdm(range(diff_seconds))
         trades = []
         while period_end_dt > start_dt:
-            trades.extend(
-                self.sync_client.public.get_trades(symbol, period_end_dt)[
-                    "trades"
-                ]
-            )
+            # Each page takes its own token and is retried on its own
+            trades.extend(self.get_trades(symbol, period_end_dt)["trades"])
             period_start_dt = datetime.strptime(
                 trades[-1]["createdAt"], "%Y-%m-%dT%H:%M:%S.%fZ"
             )
@@ -180,9 +323,8 @@ class DydxConnector:
         trades.reverse()
         return trades
 
-    @safe_execute
-    def send_limit_order(
-        self,
+    @staticmethod
+    def _limit_order_params(
         *,
         symbol: str,
         side: str,
@@ -190,27 +332,23 @@ class DydxConnector:
         quantity: str,
         client_id: str = None,
         cancel_id: str = None,
-    ):
-        return self.sync_client.private.create_order(
-            position_id=self.sync_client.private.get_account()["account"][
-                "positionId"
-            ],
-            market=symbol,
-            side=side,
-            order_type=ORDER_TYPE_LIMIT,
-            post_only=False,
-            size=quantity,
-            price=price,
-            limit_fee="0.015",
-            time_in_force=TIME_IN_FORCE_GTT,
-            expiration_epoch_seconds=10613988637,
-            client_id=client_id,
-            cancel_id=cancel_id,
-        )
-
-    @safe_execute
-    def send_trailing_stop_order(
-        self,
+    ) -> dict:
+        return {
+            "market": symbol,
+            "side": side,
+            "order_type": ORDER_TYPE_LIMIT,
+            "post_only": False,
+            "size": quantity,
+            "price": price,
+            "limit_fee": "0.015",
+            "time_in_force": TIME_IN_FORCE_GTT,
+            "expiration_epoch_seconds": 10613988637,
+            "client_id": client_id,
+            "cancel_id": cancel_id,
+        }
+
+    @staticmethod
+    def _trailing_stop_order_params(
         *,
         symbol: str,
         side: str,
@@ -218,108 +356,234 @@ class DydxConnector:
         quantity: str,
         trailing_percent: str,
         client_id: str = None,
-    ):
-        return self.sync_client.private.create_order(
-            position_id=self.sync_client.private.get_account()["account"][
-                "positionId"
-            ],
-            market=symbol,
-            side=side,
-            size=quantity,
-            price=price,
-            order_type=ORDER_TYPE_TRAILING_STOP,
-            post_only=False,
-            trailing_percent=trailing_percent,
-            limit_fee="0.015",
-            time_in_force=TIME_IN_FORCE_GTT,
-            expiration_epoch_seconds=10613988637,
-            client_id=client_id,
-        )
-
-    @safe_execute
-    def send_take_profit_order(
-        self,
+    ) -> dict:
+        return {
+            "market": symbol,
+            "side": side,
+            "size": quantity,
+            "price": price,
+            "order_type": ORDER_TYPE_TRAILING_STOP,
+            "post_only": False,
+            "trailing_percent": trailing_percent,
+            "limit_fee": "0.015",
+            "time_in_force": TIME_IN_FORCE_GTT,
+            "expiration_epoch_seconds": 10613988637,
+            "client_id": client_id,
+        }
+
+    @staticmethod
+    def _take_profit_order_params(
         *,
         symbol: str,
         side: str,
         price: str,
         quantity: str,
         client_id: str = None,
-    ):
-        return self.sync_client.private.create_order(
-            position_id=self.sync_client.private.get_account()["account"][
-                "positionId"
-            ],
-            market=symbol,
-            side=side,
-            order_type=ORDER_TYPE_TAKE_PROFIT,
-            post_only=False,
-            size=quantity,
-            price=price,
-            trigger_price=price,
-            limit_fee="0.015",
-            time_in_force=TIME_IN_FORCE_GTT,
-            expiration_epoch_seconds=10613988637,
-            client_id=client_id,
-        )
-
-    @safe_execute
-    def send_market_order(
-        self,
+    ) -> dict:
+        return {
+            "market": symbol,
+            "side": side,
+            "order_type": ORDER_TYPE_TAKE_PROFIT,
+            "post_only": False,
+            "size": quantity,
+            "price": price,
+            "trigger_price": price,
+            "limit_fee": "0.015",
+            "time_in_force": TIME_IN_FORCE_GTT,
+            "expiration_epoch_seconds": 10613988637,
+            "client_id": client_id,
+        }
+
+    @staticmethod
+    def _market_order_params(
         *,
         symbol: str,
         side: str,
         price: str,
         quantity: str,
         client_id: str = None,
-    ):
+    ) -> dict:
+        return {
+            "market": symbol,
+            "side": side,
+            "order_type": ORDER_TYPE_MARKET,
+            "post_only": False,
+            "size": quantity,
+            "price": price,
+            "limit_fee": "0.015",
+            "time_in_force": TIME_IN_FORCE_FOK,
+            "expiration_epoch_seconds": 10613988637,
+            "client_id": client_id,
+        }
+
+    @rate_limited(ENDPOINT_PRIVATE)
+    def refresh_account(self) -> dict:
+        self.account = self.sync_client.private.get_account()["account"]
+        return self.account
+
+    @async_rate_limited(ENDPOINT_PRIVATE)
+    async def async_refresh_account(self) -> dict:
+        self.account = (await self.async_client.get_account())["account"]
+        return self.account
+
+    def get_position_id(self) -> str:
+        if not self.account:
+            self.refresh_account()
+        return self.account["positionId"]
+
+    async def async_get_position_id(self) -> str:
+        if not self.account:
+            await self.async_refresh_account()
+        return self.account["positionId"]
+
+    def _create_order(self, order_params: dict) -> dict:
         return self.sync_client.private.create_order(
-            position_id=self.sync_client.private.get_account()["account"][
-                "positionId"
-            ],
-            market=symbol,
-            side=side,
-            order_type=ORDER_TYPE_MARKET,
-            post_only=False,
-            size=quantity,
-            price=price,
-            limit_fee="0.015",
-            time_in_force=TIME_IN_FORCE_FOK,
-            expiration_epoch_seconds=10613988637,
-            client_id=client_id,
+            position_id=self.get_position_id(),
+            **order_params,
+        )
+
+    async def _async_create_order(self, order_params: dict) -> dict:
+        order_params["client_id"] = (
+            order_params["client_id"] or random_client_id()
         )
+        position_id = await self.async_get_position_id()
+        signature = self.order_signer.pop(position_id, order_params)
+        if signature is None:
+            signature = await self.order_signer.sign(position_id, order_params)
+        return await self.async_client.create_order(
+            position_id=position_id,
+            signature=signature,
+            **order_params,
+        )
+
+    async def _async_prepare_order(self, order_params: dict) -> None:
+        await self.order_signer.prepare(
+            await self.async_get_position_id(), order_params
+        )
+
+    # The order params helpers get their keyword-only arguments through
+    # **kwargs
+    # pylint: disable=missing-kwoa
+    @rate_limited(ENDPOINT_ORDERS)
+    def send_limit_order(self, **kwargs):
+        return self._create_order(self._limit_order_params(**kwargs))
+
+    @rate_limited(ENDPOINT_ORDERS)
+    def send_trailing_stop_order(self, **kwargs):
+        return self._create_order(self._trailing_stop_order_params(**kwargs))
+
+    @rate_limited(ENDPOINT_ORDERS)
+    def send_take_profit_order(self, **kwargs):
+        return self._create_order(self._take_profit_order_params(**kwargs))
 
-    @safe_execute
+    @rate_limited(ENDPOINT_ORDERS)
+    def send_market_order(self, **kwargs):
+        return self._create_order(self._market_order_params(**kwargs))
+
+    @rate_limited(ENDPOINT_CANCEL)
     def cancel_order(self, order_id) -> None:
         return self.sync_client.private.cancel_order(order_id=str(order_id))
 
-    @safe_execute
+    @rate_limited(ENDPOINT_CANCEL_ALL)
     def cancel_all_orders(self, symbol) -> None:
         return self.sync_client.private.cancel_all_orders(market=symbol)
 
+    @async_rate_limited(ENDPOINT_ORDERS)
+    async def async_send_limit_order(self, **kwargs):
+        return await self._async_create_order(
+            self._limit_order_params(**kwargs)
+        )
+
+    @async_rate_limited(ENDPOINT_ORDERS)
+    async def async_send_trailing_stop_order(self, **kwargs):
+        return await self._async_create_order(
+            self._trailing_stop_order_params(**kwargs)
+        )
+
+    @async_rate_limited(ENDPOINT_ORDERS)
+    async def async_send_take_profit_order(self, **kwargs):
+        return await self._async_create_order(
+            self._take_profit_order_params(**kwargs)
+        )
+
+    @async_rate_limited(ENDPOINT_ORDERS)
+    async def async_send_market_order(self, **kwargs):
+        return await self._async_create_order(
+            self._market_order_params(**kwargs)
+        )
+
+    async def async_prepare_market_order(self, **kwargs) -> None:
+        await self._async_prepare_order(self._market_order_params(**kwargs))
+
+    async def async_prepare_trailing_stop_order(self, **kwargs) -> None:
+        await self._async_prepare_order(
+            self._trailing_stop_order_params(**kwargs)
+        )
+
+    @async_rate_limited(ENDPOINT_CANCEL)
+    async def async_cancel_order(self, order_id) -> None:
+        return await self.async_client.cancel_order(str(order_id))
+
+    @async_rate_limited(ENDPOINT_CANCEL_ALL)
+    async def async_cancel_all_orders(self, symbol) -> None:
+        return await self.async_client.cancel_all_orders(market=symbol)
+
+    def _execute(self, request: OrderRequest) -> OrderResult:
+        result = OrderResult(request)
+        start_ns = time.monotonic_ns()
+        try:
+            result.response = getattr(self, request.method)(**request.params)
+        except Exception as error:
+            result.error = error
+        result.elapsed_ns = time.monotonic_ns() - start_ns
+        return result
+
+    async def _async_execute(self, request: OrderRequest) -> OrderResult:
+        result = OrderResult(request)
+        start_ns = time.monotonic_ns()
+        try:
+            result.response = await getattr(self, "async_" + request.method)(
+                **request.params
+            )
+        except Exception as error:
+            result.error = error
+        result.elapsed_ns = time.monotonic_ns() - start_ns
+        return result
+
+    def send_batch(self, requests: list) -> list:
+        if self.batch_executor is None:
+            self.batch_executor = ThreadPoolExecutor(
+                max_workers=self.batch_max_workers
+            )
+        return list(self.batch_executor.map(self._execute, requests))
+
+    async def async_send_batch(self, requests: list) -> list:
+        return await asyncio.gather(
+            *[self._async_execute(request) for request in requests]
+        )
+
+    async def async_close(self) -> None:
+        await self.async_client.close()
+        self.order_signer.shutdown()
+
     async def subscribe_and_recieve(self) -> None:
-        async with websockets.connect(self.network.ws_host) as websocket:
-            for request in self.subscriptions:
-                await websocket.send(json.dumps(request))
-
-            while True:
-                update = json.loads(await websocket.recv())
-                now = datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S.%fZ")
-
-                if "channel" in update:
-                    if update["channel"] == "v3_orderbook":
-                        self._call_orderbook_listeners(update)
-                    elif update["channel"] == "v3_trades":
-                        if "trades" in update["contents"]:
-                            for trade in update["contents"]["trades"]:
-                                trade["exchange"] = "dydx"
-                                trade["symbol"] = update["id"]
-                                trade["price"] = float(trade["price"])
-                                trade["size"] = float(trade["size"])
-                                trade["recieveTime"] = now
-                                self._call_trade_listeners(trade)
-                    elif update["channel"] == "v3_accounts":
-                        self._call_account_listeners(update)
+        self.websocket_manager.assign(self.subscriptions.values())
+        await self.websocket_manager.run()
+
+    def _on_message(self, message, receive_ns: int) -> None:
+        self._dispatch(self.decoder(message), receive_ns)
+
+    def _dispatch(self, update: dict, receive_ns: int) -> None:
+        message_type = update.get("type")
+        if message_type == "error":
+            LOGGER.error(f"dYdX websocket error: {update.get('message')}")
+            return
+        # connected, unsubscribed and pong messages have no contents
+        if message_type not in ("subscribed", "channel_data"):
+            return
+        handler = self.channel_handlers.get(update.get("channel"))
+        if handler is not None:
+            handler(update, receive_ns)
 
     def add_orderbook_listener(self, listener) -> None:
         self.orderbook_listeners.append(listener)
@@ -330,17 +594,34 @@ class DydxConnector:
     def add_trade_listener(self, listener) -> None:
         self.trades_listeners.append(listener)
 
-    def add_orderbook_subscription(self, symbol: str) -> None:
-        self.subscriptions.append(
+    def subscribe(
+        self, channel: str, symbol: str, request: dict, listener=None
+    ) -> Subscription:
+        key = (channel, symbol)
+        if key not in self.subscriptions:
+            self.subscriptions[key] = Subscription(channel, symbol, request)
+        if listener is not None:
+            self.subscriptions[key].add_listener(listener)
+        return self.subscriptions[key]
+
+    def add_orderbook_subscription(
+        self, symbol: str, listener=None
+    ) -> Subscription:
+        if symbol not in self.order_book:
+            self.order_book[symbol] = OrderBookCache(symbol)
+        return self.subscribe(
+            CHANNEL_ORDERBOOK,
+            symbol,
             {
                 "type": "subscribe",
-                "channel": "v3_orderbook",
+                "channel": CHANNEL_ORDERBOOK,
                 "id": symbol,
                 "includeOffsets": True,
-            }
+            },
+            listener,
         )
 
-    def add_account_subscription(self) -> None:
+    def add_account_subscription(self, listener=None) -> Subscription:
         now_iso_string = generate_now_iso()
         signature = self.get_client().private.sign(
             request_path="/ws/accounts",
@@ -348,10 +629,12 @@ class DydxConnector:
             iso_timestamp=now_iso_string,
             data={},
         )
-        self.subscriptions.append(
+        return self.subscribe(
+            CHANNEL_ACCOUNTS,
+            None,
             {
                 "type": "subscribe",
-                "channel": "v3_accounts",
+                "channel": CHANNEL_ACCOUNTS,
                 "accountNumber": "0",
                 "apiKey": self.get_client().api_key_credentials["key"],
                 "passphrase": self.get_client().api_key_credentials[
@@ -359,38 +642,114 @@ class DydxConnector:
                 ],
                 "timestamp": now_iso_string,
                 "signature": signature,
-            }
+            },
+            listener,
         )
 
-    def add_trade_subscription(self, symbol: str) -> None:
-        self.subscriptions.append(
+    def add_trade_subscription(
+        self, symbol: str, listener=None
+    ) -> Subscription:
+        return self.subscribe(
+            CHANNEL_TRADES,
+            symbol,
             {
                 "type": "subscribe",
-                "channel": "v3_trades",
+                "channel": CHANNEL_TRADES,
                 "id": symbol,
-            }
+            },
+            listener,
         )
 
-    def _call_orderbook_listeners(self, update) -> None:
+    def get_resync_stats(self) -> dict:
+        return {
+            symbol: asdict(stats) for symbol, stats in self.resync_stats.items()
+        }
+
+    def _start_resync(self, symbol: str) -> ResyncStats:
+        self.order_book[symbol].reset()
+        self.resync_started_ns.setdefault(symbol, time.monotonic_ns())
+        return self.resync_stats.setdefault(symbol, ResyncStats())
+
+    def _finish_resync(self, symbol: str) -> None:
+        started_ns = self.resync_started_ns.pop(symbol, None)
+        if started_ns is None:
+            return
+        stats = self.resync_stats[symbol]
+        stats.resyncs += 1
+        stats.last_ns = time.monotonic_ns() - started_ns
+        stats.total_ns += stats.last_ns
+        stats.max_ns = max(stats.max_ns, stats.last_ns)
+
+    def resync_order_book(self, symbol: str) -> None:
+        """
+        Drops the cached book and asks for a fresh subscribed snapshot.
+        Updates are not passed to listeners until the snapshot arrives.
+        """
+        subscription = self.subscriptions[(CHANNEL_ORDERBOOK, symbol)]
+        self._start_resync(symbol).gaps += 1
+        self.websocket_manager.resubscribe(subscription)
+
+    def _on_disconnect(self, shard) -> None:
+        for subscription in shard.subscriptions:
+            if subscription.channel == CHANNEL_ORDERBOOK:
+                self._start_resync(subscription.symbol).disconnects += 1
+
+    def _on_orderbook_update(self, update: dict, _receive_ns: int) -> None:
         symbol = update["id"]
-        if update["type"] == "subscribed":
-            is_first_request = True
-        elif update["type"] == "channel_data":
-            is_first_request = False
-        self.order_book[symbol].update_orders(
-            update["contents"], is_first_request=is_first_request
-        )
+        order_book = self.order_book[symbol]
+        is_first_request = update["type"] == "subscribed"
+        try:
+            order_book.update_orders(
+                update["contents"], is_first_request=is_first_request
+            )
+        except OrderBookGapError as error:
+            if symbol not in self.resync_started_ns:
+                LOGGER.warning(f"Resyncing order book: {error}")
+                self.resync_order_book(symbol)
+            return
+        if is_first_request:
+            self._finish_resync(symbol)
+        subscription = self.subscriptions.get((CHANNEL_ORDERBOOK, symbol))
+        if subscription is not None:
+            subscription.notify(update)
         for listener in self.orderbook_listeners:
             listener(update)
 
-    def _call_account_listeners(self, update) -> None:
+    def _on_trades_update(self, update: dict, receive_ns: int) -> None:
+        if "trades" not in update["contents"]:
+            return
+        symbol = update["id"]
+        subscription = self.subscriptions.get((CHANNEL_TRADES, symbol))
+        for trade in update["contents"]["trades"]:
+            trade = Trade(
+                symbol,
+                trade["side"],
+                float(trade["price"]),
+                float(trade["size"]),
+                trade["createdAt"],
+                receive_ns,
+            )
+            if subscription is not None:
+                subscription.notify(trade)
+            for listener in self.trades_listeners:
+                listener(trade)
+
+    def _update_account_cache(self, update) -> None:
+        contents = update.get("contents", {})
+        if "account" in contents:
+            self.account = contents["account"]
+        for account in contents.get("accounts", []):
+            if account.get("id") == self.account.get("id"):
+                self.account.update(account)
+
+    def _on_account_update(self, update: dict, _receive_ns: int) -> None:
+        self._update_account_cache(update)
+        subscription = self.subscriptions.get((CHANNEL_ACCOUNTS, None))
+        if subscription is not None:
+            subscription.notify(update)
         for listener in self.account_listeners:
             listener(update)
 
-    def _call_trade_listeners(self, update) -> None:
-        for listener in self.trades_listeners:
-            listener(update)
-
     async def async_start(self) -> None:
         while True:
             try:
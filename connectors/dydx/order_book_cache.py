@@ -1,14 +1,198 @@
+import time
+from itertools import islice
+from typing import NamedTuple
+
 from sortedcontainers import SortedDict
 
+from utils.book_snapshot import BookSnapshot
+from utils.book_snapshot import make_side
+from utils.book_snapshot import pack_snapshot
+from utils.book_snapshot import unpack_snapshot
+
+
+class OrderBookGapError(Exception):
+    pass
+
+
+def check_offset(order_book, offset: int) -> None:
+    """order_book: OrderBookCache or TickOrderBook"""
+    if not order_book.is_synced:
+        raise OrderBookGapError(
+            f"{order_book.symbol}: update {offset} before snapshot"
+        )
+    if offset < order_book.offset:
+        raise OrderBookGapError(
+            f"{order_book.symbol}: offset {offset} after {order_book.offset}"
+        )
+
+
+class OrderBookTop(NamedTuple):
+    best_bid: float
+    best_ask: float
+    mid: float
+    spread: float
+    bid_depth: tuple
+    ask_depth: tuple
+    offset: int
+
+
+class OrderBookDelta(NamedTuple):
+    """Levels changed by one message as price -> size, "0" if removed"""
+
+    bids: dict
+    asks: dict
+    offset: int
+
 
 class OrderBookCache:
-    def __init__(self, symbol: str) -> None:
+    """
+    bid_depth[i] and ask_depth[i] hold the cumulative size of the best
+    i + 1 levels, up to depth levels. They and the best prices are
+    refreshed after every update from the first level that changed.
+    """
+
+    def __init__(self, symbol: str, depth: int = 20) -> None:
         self.symbol = symbol
+        self.depth = depth
         self.bids = SortedDict()
         self.asks = SortedDict()
+        self.offset = 0
+        self.is_synced = False
+        self.best_bid = None
+        self.best_ask = None
+        self.bid_depth = []
+        self.ask_depth = []
+        self._bid_changed = None
+        self._ask_changed = None
+        self.last_delta = None
+
+    def reset(self) -> None:
+        self.bids.clear()
+        self.asks.clear()
+        self.offset = 0
+        self.is_synced = False
+        self.best_bid = None
+        self.best_ask = None
+        self.bid_depth.clear()
+        self.ask_depth.clear()
+        self._bid_changed = None
+        self._ask_changed = None
+        self.last_delta = None
+
+    @property
+    def mid(self) -> float:
+        if self.best_bid is None or self.best_ask is None:
+            return None
+        return (self.best_bid + self.best_ask) / 2
+
+    @property
+    def spread(self) -> float:
+        if self.best_bid is None or self.best_ask is None:
+            return None
+        return self.best_ask - self.best_bid
+
+    def get_bid_volume(self, levels: int) -> float:
+        """Return value: total size of the best levels bids"""
+        levels = min(levels, len(self.bid_depth))
+        return self.bid_depth[levels - 1] if levels else 0
+
+    def get_ask_volume(self, levels: int) -> float:
+        """Return value: total size of the best levels asks"""
+        levels = min(levels, len(self.ask_depth))
+        return self.ask_depth[levels - 1] if levels else 0
+
+    def get_top(self) -> OrderBookTop:
+        return OrderBookTop(
+            self.best_bid,
+            self.best_ask,
+            self.mid,
+            self.spread,
+            tuple(self.bid_depth),
+            tuple(self.ask_depth),
+            self.offset,
+        )
+
+    @staticmethod
+    def _get_levels(book: SortedDict):
+        for price, level in book.items():
+            yield price, float(level["size"]), int(level["offset"])
+
+    def to_bytes(self, timestamp: int = None) -> bytes:
+        """timestamp: ms since epoch, now by default"""
+        if timestamp is None:
+            timestamp = int(time.time() * 1000)
+        return pack_snapshot(
+            BookSnapshot(
+                self.symbol,
+                timestamp,
+                self.offset,
+                make_side(self._get_levels(self.bids)),
+                make_side(self._get_levels(self.asks)),
+            )
+        )
+
+    @staticmethod
+    def _load_levels(book: SortedDict, side) -> None:
+        book.update(
+            (price, {"size": repr(size), "offset": str(offset)})
+            for price, size, offset in zip(*side)
+        )
+
+    @classmethod
+    def from_bytes(cls, data: bytes, depth: int = 20) -> "OrderBookCache":
+        snapshot = unpack_snapshot(data)
+        order_book = cls(snapshot.symbol, depth=depth)
+        cls._load_levels(order_book.bids, snapshot.bids)
+        cls._load_levels(order_book.asks, snapshot.asks)
+        order_book.offset = snapshot.offset
+        order_book.is_synced = True
+        if order_book.bids:
+            order_book._mark_bid(order_book.bids.keys()[-1])
+        if order_book.asks:
+            order_book._mark_ask(order_book.asks.keys()[0])
+        order_book._update_top()
+        return order_book
+
+    def _mark_bid(self, price: float) -> None:
+        if self._bid_changed is None or price > self._bid_changed:
+            self._bid_changed = price
+
+    def _mark_ask(self, price: float) -> None:
+        if self._ask_changed is None or price < self._ask_changed:
+            self._ask_changed = price
+
+    def _update_top(self) -> None:
+        if self._bid_changed is not None:
+            # Levels above the highest changed price are still valid
+            rank = len(self.bids) - self.bids.bisect_right(self._bid_changed)
+            if rank < self.depth:
+                del self.bid_depth[rank:]
+                total = self.bid_depth[-1] if self.bid_depth else 0
+                for price in islice(
+                    self.bids.irange(maximum=self._bid_changed, reverse=True),
+                    self.depth - rank,
+                ):
+                    total += float(self.bids[price]["size"])
+                    self.bid_depth.append(total)
+            self.best_bid = self.bids.keys()[-1] if self.bids else None
+            self._bid_changed = None
+        if self._ask_changed is not None:
+            rank = self.asks.bisect_left(self._ask_changed)
+            if rank < self.depth:
+                del self.ask_depth[rank:]
+                total = self.ask_depth[-1] if self.ask_depth else 0
+                for price in islice(
+                    self.asks.irange(minimum=self._ask_changed),
+                    self.depth - rank,
+                ):
+                    total += float(self.asks[price]["size"])
+                    self.ask_depth.append(total)
+            self.best_ask = self.asks.keys()[0] if self.asks else None
+            self._ask_changed = None
 
     def add_bid(self, *, price: str, size: str, offset: str) -> None:
         price = float(price)
+        self._mark_bid(price)
         if (
             price in self.bids
             and int(self.bids[price]["offset"]) < int(offset)
@@ -23,16 +207,17 @@ class OrderBookCache:
 
     def add_ask(self, *, price: str, size: str, offset: str) -> None:
         price = float(price)
+        self._mark_ask(price)
         if (
             price in self.asks
             and int(self.asks[price]["offset"]) < int(offset)
             or price not in self.asks
         ):
             self.asks[price] = {"size": size, "offset": offset}
-            while self._get_first_ask() < self._get_last_bid():
+            while not self._is_order_book_stable():
                 self._remove_last_bid()
 
-        if self.asks[price]["size"] == "0":
+        if price in self.asks and self.asks[price]["size"] == "0":
             del self.asks[price]
 
     def _is_order_book_stable(self) -> bool:
@@ -48,27 +233,83 @@ class OrderBookCache:
         return self.asks.keys()[0]
 
     def _remove_last_bid(self) -> None:
+        self._mark_bid(self._get_last_bid())
         del self.bids[self._get_last_bid()]
 
     def _remove_first_ask(self) -> None:
+        self._mark_ask(self._get_first_ask())
         del self.asks[self._get_first_ask()]
 
+    @staticmethod
+    def _write_levels(
+        book: SortedDict, levels: list, offset: str, changes: dict
+    ) -> None:
+        int_offset = int(offset)
+        for price, size in levels:
+            price = float(price)
+            level = book.get(price)
+            if level is not None and int(level["offset"]) >= int_offset:
+                continue
+            if size == "0" or float(size) == 0:
+                if level is not None:
+                    del book[price]
+                    changes[price] = "0"
+            else:
+                book[price] = {"size": size, "offset": offset}
+                changes[price] = size
+
+    def _uncross(self, delta: OrderBookDelta) -> None:
+        # The older of the two crossing levels is stale; on a tie the ask
+        # wins, as asks are applied after bids in a message
+        while self.bids and self.asks:
+            bid_price, bid = self.bids.peekitem(-1)
+            ask_price, ask = self.asks.peekitem(0)
+            if bid_price < ask_price:
+                return
+            if int(ask["offset"]) >= int(bid["offset"]):
+                del self.bids[bid_price]
+                delta.bids[bid_price] = "0"
+            else:
+                del self.asks[ask_price]
+                delta.asks[ask_price] = "0"
+
+    def apply_delta(self, contents: dict) -> OrderBookDelta:
+        """
+        Applies a v3_orderbook channel_data message as one batch.
+        Return value: levels changed by the message
+        """
+        check_offset(self, int(contents["offset"]))
+        self.offset = int(contents["offset"])
+        delta = OrderBookDelta({}, {}, self.offset)
+        self._write_levels(
+            self.bids, contents["bids"], contents["offset"], delta.bids
+        )
+        self._write_levels(
+            self.asks, contents["asks"], contents["offset"], delta.asks
+        )
+        self._uncross(delta)
+        if delta.bids:
+            self._mark_bid(max(delta.bids))
+        if delta.asks:
+            self._mark_ask(min(delta.asks))
+        self._update_top()
+        self.last_delta = delta
+        return delta
+
     def update_orders(self, contents: dict, is_first_request=False) -> None:
         if not is_first_request:
-            for bid in contents["bids"]:
-                self.add_bid(
-                    price=bid[0], size=bid[1], offset=contents["offset"]
-                )
-            for ask in contents["asks"]:
-                self.add_ask(
-                    price=ask[0], size=ask[1], offset=contents["offset"]
-                )
-        else:
-            for bid in contents["bids"]:
-                self.add_bid(
-                    price=bid["price"], size=bid["size"], offset=bid["offset"]
-                )
-            for ask in contents["asks"]:
-                self.add_ask(
-                    price=ask["price"], size=ask["size"], offset=ask["offset"]
-                )
+            self.apply_delta(contents)
+            return
+        self.reset()
+        for bid in contents["bids"]:
+            self.add_bid(
+                price=bid["price"], size=bid["size"], offset=bid["offset"]
+            )
+            self.offset = max(self.offset, int(bid["offset"]))
+        for ask in contents["asks"]:
+            self.add_ask(
+                price=ask["price"], size=ask["size"], offset=ask["offset"]
+            )
+            self.offset = max(self.offset, int(ask["offset"]))
+        self.is_synced = True
+        self._update_top()
@@ -0,0 +1,102 @@
+import asyncio
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from dydx3.starkex.order import SignableOrder
+
+
+def sign_order(
+    network_id: int, stark_private_key: str, position_id, order_params: dict
+) -> str:
+    return SignableOrder(
+        network_id=network_id,
+        position_id=position_id,
+        client_id=order_params["client_id"],
+        market=order_params["market"],
+        side=order_params["side"],
+        human_size=order_params["size"],
+        human_price=order_params["price"],
+        limit_fee=order_params["limit_fee"],
+        expiration_epoch_seconds=order_params["expiration_epoch_seconds"],
+    ).sign(stark_private_key)
+
+
+class OrderSigner:
+    """
+    Signs orders with the STARK key in a process pool, so signing never
+    runs on the event loop. Signatures made ahead of time by prepare()
+    are cached until they expire or are used by pop().
+    """
+
+    def __init__(
+        self,
+        network_id: int,
+        stark_private_key: str,
+        max_workers: int = 2,
+        ttl_sec: float = 3600,
+    ) -> None:
+        self.network_id = network_id
+        self.stark_private_key = stark_private_key
+        self.max_workers = max_workers
+        self.ttl_sec = ttl_sec
+        self.executor = None
+        self.signatures = {}
+
+    @staticmethod
+    def get_key(position_id, order_params: dict) -> tuple:
+        # Only these fields are covered by the STARK signature
+        return (
+            str(position_id),
+            order_params["client_id"],
+            order_params["market"],
+            order_params["side"],
+            order_params["size"],
+            order_params["price"],
+            order_params["limit_fee"],
+            order_params["expiration_epoch_seconds"],
+        )
+
+    def get_executor(self) -> ProcessPoolExecutor:
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self.executor
+
+    async def sign(self, position_id, order_params: dict) -> str:
+        return await asyncio.get_running_loop().run_in_executor(
+            self.get_executor(),
+            sign_order,
+            self.network_id,
+            self.stark_private_key,
+            position_id,
+            order_params,
+        )
+
+    async def prepare(self, position_id, order_params: dict) -> None:
+        self._remove_expired()
+        signature = await self.sign(position_id, order_params)
+        self.signatures[self.get_key(position_id, order_params)] = (
+            signature,
+            time.monotonic() + self.ttl_sec,
+        )
+
+    def pop(self, position_id, order_params: dict) -> str:
+        signature, expiration = self.signatures.pop(
+            self.get_key(position_id, order_params), (None, 0)
+        )
+        if expiration < time.monotonic():
+            return None
+        return signature
+
+    def _remove_expired(self) -> None:
+        now = time.monotonic()
+        for key in [
+            key
+            for key, (_, expiration) in self.signatures.items()
+            if expiration < now
+        ]:
+            del self.signatures[key]
+
+    def shutdown(self) -> None:
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+            self.executor = None
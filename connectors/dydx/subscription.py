@@ -0,0 +1,29 @@
+CHANNEL_ORDERBOOK = "v3_orderbook"
+CHANNEL_TRADES = "v3_trades"
+CHANNEL_ACCOUNTS = "v3_accounts"
+
+
+class Subscription:
+    def __init__(self, channel: str, symbol: str, request: dict) -> None:
+        self.channel = channel
+        self.symbol = symbol
+        self.request = request
+        self.listeners = []
+
+    @property
+    def key(self) -> tuple:
+        return (self.channel, self.symbol)
+
+    @property
+    def unsubscribe_request(self) -> dict:
+        request = {"type": "unsubscribe", "channel": self.channel}
+        if self.symbol is not None:
+            request["id"] = self.symbol
+        return request
+
+    def add_listener(self, listener) -> None:
+        self.listeners.append(listener)
+
+    def notify(self, update) -> None:
+        for listener in self.listeners:
+            listener(update)
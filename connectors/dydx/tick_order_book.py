@@ -0,0 +1,263 @@
+from decimal import Decimal
+
+import numpy as np
+
+from connectors.dydx.order_book_cache import check_offset
+
+
+class TickOrderBook:
+    """
+    Order book on a fixed tick grid. Absolute tick t lives in slot
+    t % num_ticks of preallocated arrays, and only the window of
+    num_ticks ticks starting at low_tick is kept. The window is moved
+    when the best price leaves it; levels that fall out are dropped.
+    Same update_orders interface as OrderBookCache.
+    """
+
+    search_span = 64
+
+    def __init__(
+        self, symbol: str, tick_size: float, num_ticks: int = 1 << 16
+    ) -> None:
+        self.symbol = symbol
+        self.tick_size = tick_size
+        self.precision = max(0, -Decimal(str(tick_size)).as_tuple().exponent)
+        self.num_ticks = num_ticks
+        self.bid_sizes = np.zeros(num_ticks, dtype=np.float64)
+        self.ask_sizes = np.zeros(num_ticks, dtype=np.float64)
+        self.bid_offsets = np.zeros(num_ticks, dtype=np.int64)
+        self.ask_offsets = np.zeros(num_ticks, dtype=np.int64)
+        self.low_tick = None
+        self.best_bid_tick = None
+        self.best_ask_tick = None
+        self.offset = 0
+        self.is_synced = False
+
+    def reset(self) -> None:
+        self.bid_sizes.fill(0)
+        self.ask_sizes.fill(0)
+        self.bid_offsets.fill(0)
+        self.ask_offsets.fill(0)
+        self.low_tick = None
+        self.best_bid_tick = None
+        self.best_ask_tick = None
+        self.offset = 0
+        self.is_synced = False
+
+    def to_tick(self, price) -> int:
+        return int(round(float(price) / self.tick_size))
+
+    def to_price(self, tick: int) -> float:
+        return round(tick * self.tick_size, self.precision)
+
+    def _in_window(self, tick: int) -> bool:
+        return self.low_tick <= tick < self.low_tick + self.num_ticks
+
+    def _segments(self, from_tick: int, to_tick: int):
+        """Return value: slot slices covering ticks [from_tick, to_tick)"""
+        from_tick = max(from_tick, self.low_tick)
+        to_tick = min(to_tick, self.low_tick + self.num_ticks)
+        if from_tick >= to_tick:
+            return []
+        start = from_tick % self.num_ticks
+        stop = start + to_tick - from_tick
+        if stop <= self.num_ticks:
+            return [(from_tick, slice(start, stop))]
+        return [
+            (from_tick, slice(start, self.num_ticks)),
+            (
+                from_tick + self.num_ticks - start,
+                slice(0, stop - self.num_ticks),
+            ),
+        ]
+
+    def _clear(self, from_tick: int, to_tick: int, is_bid: bool) -> None:
+        sizes, offsets = self._get_side(is_bid)
+        for _, segment in self._segments(from_tick, to_tick):
+            sizes[segment] = 0
+            offsets[segment] = 0
+
+    def _get_side(self, is_bid: bool) -> tuple:
+        if is_bid:
+            return self.bid_sizes, self.bid_offsets
+        return self.ask_sizes, self.ask_offsets
+
+    def _find_bid(self, from_tick: int):
+        """Return value: highest bid tick <= from_tick"""
+        # The next level is usually a few ticks away, so look near first
+        to_tick = from_tick + 1
+        span = self.search_span
+        while to_tick > self.low_tick:
+            for first_tick, segment in reversed(
+                self._segments(to_tick - span, to_tick)
+            ):
+                nonzero = np.flatnonzero(self.bid_sizes[segment])
+                if len(nonzero):
+                    return first_tick + int(nonzero[-1])
+            to_tick -= span
+            span *= 2
+        return None
+
+    def _find_ask(self, from_tick: int):
+        """Return value: lowest ask tick >= from_tick"""
+        high_tick = self.low_tick + self.num_ticks
+        span = self.search_span
+        while from_tick < high_tick:
+            for first_tick, segment in self._segments(
+                from_tick, from_tick + span
+            ):
+                nonzero = np.flatnonzero(self.ask_sizes[segment])
+                if len(nonzero):
+                    return first_tick + int(nonzero[0])
+            from_tick += span
+            span *= 2
+        return None
+
+    def _move_window(self, tick: int) -> None:
+        low_tick = tick - self.num_ticks // 2
+        shift = low_tick - self.low_tick
+        if abs(shift) >= self.num_ticks:
+            for array in (
+                self.bid_sizes,
+                self.ask_sizes,
+                self.bid_offsets,
+                self.ask_offsets,
+            ):
+                array.fill(0)
+        elif shift > 0:
+            self._clear(self.low_tick, low_tick, True)
+            self._clear(self.low_tick, low_tick, False)
+        else:
+            high_tick = self.low_tick + self.num_ticks
+            self._clear(high_tick + shift, high_tick, True)
+            self._clear(high_tick + shift, high_tick, False)
+        self.low_tick = low_tick
+        if self.best_bid_tick is not None and not self._in_window(
+            self.best_bid_tick
+        ):
+            self.best_bid_tick = None
+        if self.best_ask_tick is not None and not self._in_window(
+            self.best_ask_tick
+        ):
+            self.best_ask_tick = None
+
+    def _set_level(self, tick: int, size: float, offset: int, is_bid: bool):
+        if self.low_tick is None:
+            self.low_tick = tick - self.num_ticks // 2
+        if not self._in_window(tick):
+            best_tick = self.best_bid_tick if is_bid else self.best_ask_tick
+            is_better = best_tick is None or (
+                tick > best_tick if is_bid else tick < best_tick
+            )
+            if size == 0 or not is_better:
+                return
+            self._move_window(tick)
+
+        sizes, offsets = self._get_side(is_bid)
+        slot = tick % self.num_ticks
+        if sizes[slot] and offsets[slot] >= offset:
+            return
+        if size == 0:
+            sizes[slot] = 0
+            offsets[slot] = 0
+            if is_bid and tick == self.best_bid_tick:
+                self.best_bid_tick = self._find_bid(tick)
+            elif not is_bid and tick == self.best_ask_tick:
+                self.best_ask_tick = self._find_ask(tick)
+            return
+
+        sizes[slot] = size
+        offsets[slot] = offset
+        if is_bid:
+            self._on_bid_added(tick)
+        else:
+            self._on_ask_added(tick)
+
+    def _on_bid_added(self, tick: int) -> None:
+        if self.best_bid_tick is None or tick > self.best_bid_tick:
+            self.best_bid_tick = tick
+        if self.best_ask_tick is not None and self.best_ask_tick <= tick:
+            self._clear(self.best_ask_tick, tick + 1, False)
+            self.best_ask_tick = self._find_ask(tick + 1)
+
+    def _on_ask_added(self, tick: int) -> None:
+        if self.best_ask_tick is None or tick < self.best_ask_tick:
+            self.best_ask_tick = tick
+        if self.best_bid_tick is not None and self.best_bid_tick >= tick:
+            self._clear(tick, self.best_bid_tick + 1, True)
+            self.best_bid_tick = self._find_bid(tick - 1)
+
+    def add_bid(self, *, price: str, size: str, offset: str) -> None:
+        self._set_level(self.to_tick(price), float(size), int(offset), True)
+
+    def add_ask(self, *, price: str, size: str, offset: str) -> None:
+        self._set_level(self.to_tick(price), float(size), int(offset), False)
+
+    def update_orders(self, contents: dict, is_first_request=False) -> None:
+        if not is_first_request:
+            offset = int(contents["offset"])
+            check_offset(self, offset)
+            self.offset = offset
+            for price, size in contents["bids"]:
+                self._set_level(self.to_tick(price), float(size), offset, True)
+            for price, size in contents["asks"]:
+                self._set_level(self.to_tick(price), float(size), offset, False)
+        else:
+            self.reset()
+            for bid in contents["bids"]:
+                self.add_bid(**bid)
+                self.offset = max(self.offset, int(bid["offset"]))
+            for ask in contents["asks"]:
+                self.add_ask(**ask)
+                self.offset = max(self.offset, int(ask["offset"]))
+            self.is_synced = True
+
+    def get_best_bid(self):
+        if self.best_bid_tick is None:
+            return None
+        return self.to_price(self.best_bid_tick)
+
+    def get_best_ask(self):
+        if self.best_ask_tick is None:
+            return None
+        return self.to_price(self.best_ask_tick)
+
+    def get_bids(self, depth: int = None) -> list:
+        """Return value: [(price, size)] from the best bid down"""
+        levels = []
+        if self.best_bid_tick is None:
+            return levels
+        for first_tick, segment in reversed(
+            self._segments(self.low_tick, self.best_bid_tick + 1)
+        ):
+            sizes = self.bid_sizes[segment]
+            for index in np.flatnonzero(sizes)[::-1]:
+                levels.append(
+                    (
+                        self.to_price(first_tick + int(index)),
+                        float(sizes[index]),
+                    )
+                )
+                if depth is not None and len(levels) >= depth:
+                    return levels
+        return levels
+
+    def get_asks(self, depth: int = None) -> list:
+        """Return value: [(price, size)] from the best ask up"""
+        levels = []
+        if self.best_ask_tick is None:
+            return levels
+        for first_tick, segment in self._segments(
+            self.best_ask_tick, self.low_tick + self.num_ticks
+        ):
+            sizes = self.ask_sizes[segment]
+            for index in np.flatnonzero(sizes):
+                levels.append(
+                    (
+                        self.to_price(first_tick + int(index)),
+                        float(sizes[index]),
+                    )
+                )
+                if depth is not None and len(levels) >= depth:
+                    return levels
+        return levels
@@ -0,0 +1,34 @@
+import time
+from datetime import datetime
+from typing import NamedTuple
+
+
+class Trade(NamedTuple):
+    symbol: str
+    side: str
+    price: float
+    size: float
+    created_at: str
+    # time.monotonic_ns() of the message, only comparable within the
+    # process
+    receive_ns: int
+    exchange: str = "dydx"
+
+    @property
+    def receive_time_ns(self) -> int:
+        """Return value: receive_ns on the wall clock"""
+        return time.time_ns() - time.monotonic_ns() + self.receive_ns
+
+    def to_dict(self) -> dict:
+        """Return value: trade in the format of the dict listeners"""
+        return {
+            "side": self.side,
+            "size": self.size,
+            "price": self.price,
+            "createdAt": self.created_at,
+            "exchange": self.exchange,
+            "symbol": self.symbol,
+            "recieveTime": datetime.utcfromtimestamp(
+                self.receive_time_ns / 1e9
+            ).strftime("%Y-%m-%dT%H:%M:%S.%fZ"),
+        }
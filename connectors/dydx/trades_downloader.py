@@ -0,0 +1,168 @@
+import csv
+import json
+import os
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from typing import Callable
+
+from tqdm import tqdm
+
+TRADE_FIELDS = ["side", "size", "price", "createdAt"]
+ISO_FORMAT = "%Y-%m-%dT%H:%M:%S.%fZ"
+
+
+def to_iso(dt: datetime) -> str:
+    return dt.strftime(ISO_FORMAT)[:-4] + "Z"
+
+
+def get_trade_key(trade: dict) -> tuple:
+    return tuple(trade[field] for field in TRADE_FIELDS)
+
+
+class TradesDownloader:
+    """
+    Downloads trades for [start_dt, end_dt) as independent time slices
+    fetched concurrently. Every finished slice is written to its own
+    part file, so an interrupted run only refetches unfinished slices.
+    Parts are concatenated into output_path in chronological order.
+    """
+
+    page_size = 100
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        get_trades: Callable,
+        symbol: str,
+        start_dt: datetime,
+        end_dt: datetime,
+        output_path: str,
+        slice_sec: int = 3600,
+        max_workers: int = 8,
+    ) -> None:
+        self.get_trades = get_trades
+        self.symbol = symbol
+        self.start_dt = start_dt
+        self.end_dt = end_dt
+        self.output_path = output_path
+        self.parts_dir = output_path + ".parts"
+        self.checkpoint_path = os.path.join(self.parts_dir, "checkpoint.json")
+        self.slice_sec = slice_sec
+        self.max_workers = max_workers
+
+    def get_slices(self) -> list:
+        slices = []
+        slice_start = self.start_dt
+        while slice_start < self.end_dt:
+            slice_end = min(
+                slice_start + timedelta(seconds=self.slice_sec), self.end_dt
+            )
+            slices.append((to_iso(slice_start), to_iso(slice_end)))
+            slice_start = slice_end
+        return slices
+
+    def _get_part_path(self, index: int) -> str:
+        return os.path.join(self.parts_dir, f"{index:06d}.csv")
+
+    def _load_checkpoint(self) -> None:
+        checkpoint = {
+            "symbol": self.symbol,
+            "start": to_iso(self.start_dt),
+            "end": to_iso(self.end_dt),
+            "slice_sec": self.slice_sec,
+        }
+        os.makedirs(self.parts_dir, exist_ok=True)
+        if os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path, "r", encoding="utf8") as file:
+                if json.load(file) != checkpoint:
+                    raise ValueError(
+                        f"{self.parts_dir} belongs to another download"
+                    )
+        else:
+            with open(self.checkpoint_path, "w", encoding="utf8") as file:
+                json.dump(checkpoint, file)
+
+    def fetch_slice(self, slice_start: str, slice_end: str) -> list:
+        """
+        Return value: trades with slice_start <= createdAt < slice_end
+        in chronological order. Pages are walked backwards from
+        slice_end and trades repeated on a page boundary are skipped.
+        """
+        trades = []
+        before = slice_end
+        boundary = Counter()
+        while True:
+            page = self.get_trades(self.symbol, before)["trades"]
+            seen = boundary.copy()
+            new_trades = 0
+            for trade in page:
+                if trade["createdAt"] >= slice_end:
+                    continue
+                if trade["createdAt"] < slice_start:
+                    break
+                key = get_trade_key(trade)
+                if seen[key]:
+                    seen[key] -= 1
+                    continue
+                trades.append(trade)
+                new_trades += 1
+            if len(page) < self.page_size or not new_trades:
+                break
+            oldest = page[-1]["createdAt"]
+            if oldest < slice_start:
+                break
+            before = oldest
+            boundary.clear()
+            # Everything at the boundary timestamp comes back on the next page
+            for trade in trades[::-1]:
+                if trade["createdAt"] != oldest:
+                    break
+                boundary[get_trade_key(trade)] += 1
+        trades.reverse()
+        return trades
+
+    def _download_slice(self, index: int, slice_start: str, slice_end: str):
+        trades = self.fetch_slice(slice_start, slice_end)
+        part_path = self._get_part_path(index)
+        with open(part_path + ".tmp", "w", encoding="utf8", newline="") as file:
+            writer = csv.DictWriter(
+                file, fieldnames=TRADE_FIELDS, extrasaction="ignore"
+            )
+            writer.writerows(trades)
+        os.replace(part_path + ".tmp", part_path)
+        return len(trades)
+
+    def _merge_parts(self, num_slices: int) -> None:
+        with open(self.output_path, "w", encoding="utf8", newline="") as file:
+            csv.writer(file).writerow(TRADE_FIELDS)
+            for index in range(num_slices):
+                with open(
+                    self._get_part_path(index), "r", encoding="utf8"
+                ) as part:
+                    for line in part:
+                        file.write(line)
+
+    def run(self) -> str:
+        """Return value: path of the csv file with all trades"""
+        self._load_checkpoint()
+        slices = self.get_slices()
+        pending = [
+            (index, slice_start, slice_end)
+            for index, (slice_start, slice_end) in enumerate(slices)
+            if not os.path.exists(self._get_part_path(index))
+        ]
+        progress_bar = tqdm(
+            total=len(slices), initial=len(slices) - len(pending)
+        )
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [
+                executor.submit(self._download_slice, *pending_slice)
+                for pending_slice in pending
+            ]
+            for future in as_completed(futures):
+                future.result()
+                progress_bar.update(1)
+        progress_bar.close()
+        self._merge_parts(len(slices))
+        return self.output_path
@@ -0,0 +1,116 @@
+import asyncio
+import json
+import time
+import zlib
+from dataclasses import dataclass, field
+from typing import Callable
+
+import websockets
+
+from utils.reconnect import run_forever
+
+SHARD_BY_SYMBOL = "symbol"
+SHARD_BY_CHANNEL = "channel"
+
+
+@dataclass
+class WebsocketShard:
+    index: int
+    subscriptions: list = field(default_factory=list)
+    websocket: object = None
+    connections: int = 0
+
+
+class WebsocketManager:
+    """
+    Spreads subscriptions over several websocket connections, each read
+    by its own task. All readers hand raw messages to one on_message
+    callback, so the consumer sees a single merged stream. A dropped
+    shard is reported to on_disconnect before it reconnects.
+    """
+
+    reconnect_delay_sec = 1
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        ws_host: str,
+        on_message: Callable,
+        num_connections: int = 1,
+        shard_by: str = SHARD_BY_SYMBOL,
+        on_disconnect: Callable = None,
+    ) -> None:
+        self.ws_host = ws_host
+        self.on_message = on_message
+        self.on_disconnect = on_disconnect
+        self.shard_by = shard_by
+        self.shards = [
+            WebsocketShard(index) for index in range(num_connections)
+        ]
+        self.resubscribe_tasks = set()
+
+    def get_shard(self, subscription) -> WebsocketShard:
+        key = (
+            subscription.symbol
+            if self.shard_by == SHARD_BY_SYMBOL
+            else subscription.channel
+        )
+        if key is None:
+            return self.shards[0]
+        # crc32 is stable between runs unlike the salted built-in hash
+        return self.shards[zlib.crc32(key.encode()) % len(self.shards)]
+
+    def assign(self, subscriptions) -> None:
+        for shard in self.shards:
+            shard.subscriptions.clear()
+        for subscription in subscriptions:
+            self.get_shard(subscription).subscriptions.append(subscription)
+
+    async def _resubscribe(self, websocket, subscription) -> None:
+        await websocket.send(json.dumps(subscription.unsubscribe_request))
+        await websocket.send(json.dumps(subscription.request))
+
+    def resubscribe(self, subscription) -> bool:
+        """Return value: False if the shard is down and will resubscribe
+        on reconnect anyway"""
+        websocket = self.get_shard(subscription).websocket
+        if websocket is None:
+            return False
+        # The loop keeps only weak references to tasks
+        task = asyncio.ensure_future(self._resubscribe(websocket, subscription))
+        self.resubscribe_tasks.add(task)
+        task.add_done_callback(self.resubscribe_tasks.discard)
+        return True
+
+    async def _read_shard(self, shard: WebsocketShard) -> None:
+        async with websockets.connect(self.ws_host) as websocket:
+            shard.websocket = websocket
+            shard.connections += 1
+            for subscription in shard.subscriptions:
+                await websocket.send(json.dumps(subscription.request))
+
+            while True:
+                message = await websocket.recv()
+                self.on_message(message, time.monotonic_ns())
+
+    def _on_shard_closed(self, shard: WebsocketShard) -> None:
+        shard.websocket = None
+        if self.on_disconnect is not None:
+            self.on_disconnect(shard)
+
+    async def _run_shard(self, shard: WebsocketShard) -> None:
+        await run_forever(
+            lambda: self._read_shard(shard),
+            f"WebsocketManager shard {shard.index}",
+            self.reconnect_delay_sec,
+            lambda: self._on_shard_closed(shard),
+        )
+
+    async def run(self) -> None:
+        await asyncio.gather(
+            *[
+                self._run_shard(shard)
+                for shard in self.shards
+                if shard.subscriptions
+            ]
+        )
@@ -0,0 +1,67 @@
+import argparse
+import sys
+import time
+
+sys.path.append("../../")
+
+from connectors.binance.agg_trades_fetcher import read_columns
+from strategy.arbitrage.backtester import Backtester
+from strategy.arbitrage.backtester import Latencies
+from strategy.arbitrage.backtester import load_binance_trades
+from strategy.arbitrage.backtester import load_dydx_trades
+from strategy.arbitrage.cycle_runner import Settings
+
+parser = argparse.ArgumentParser(
+    description="Replays recorded trades through the arbitrage trader"
+)
+parser.add_argument(
+    "--binance-trades",
+    dest="binance_trades",
+    default="BTCUSD_PERP_binance_2022-01-01_2022-02-01",
+    help="directory written by binance_get_trades.py",
+)
+parser.add_argument(
+    "--dydx-trades",
+    dest="dydx_trades",
+    default="ETH-USD_dydx_2022-01-01_2022-02-01.csv",
+    help="csv written by collect_data/get_trades_from_dydx_api.py",
+)
+parser.add_argument("--latency-b-u", dest="latency_b_u", type=int, default=200)
+parser.add_argument("--latency-u-d", dest="latency_u_d", type=int, default=400)
+parser.add_argument("--latency-d-u", dest="latency_d_u", type=int, default=400)
+args = parser.parse_args()
+
+settings = Settings(
+    trailing_percent=0.14,
+    quantity=0.01,
+    profit_threshold=0.0024,
+    sec_to_wait=20,
+    sec_after_trade=2.9,
+    signal_threshold=0.0021,
+    dydx_symbol="ETH-USD",
+    dydx_network="backtest",
+    round_digits=1,
+)
+
+
+def main():
+    backtester = Backtester(
+        settings,
+        load_binance_trades(read_columns(args.binance_trades)),
+        load_dydx_trades(args.dydx_trades),
+        Latencies(args.latency_b_u, args.latency_u_d, args.latency_d_u),
+    )
+    start_time = time.perf_counter()
+    cycles = backtester.run()
+    elapsed = time.perf_counter() - start_time
+
+    closed = [cycle for cycle in cycles if cycle.closing_fill is not None]
+    profits = [cycle.get_profit() for cycle in closed]
+    print(f"events: {backtester.processed} in {elapsed:.1f} s")
+    print(f"cycles: {len(cycles)}, closed: {len(closed)}")
+    print(f"profitable: {len([profit for profit in profits if profit > 0])}")
+    print(f"PROFIT : {sum(profits)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+import sys
+from datetime import datetime
+
+from binance.enums import FuturesType
+
+sys.path.append("../../")
+
+from connectors.binance.connector import BinanceConnector
+from connectors.binance.agg_trades_fetcher import read_columns
+
+symbol = "BTCUSD_PERP"
+path = "BTCUSD_PERP_binance_2022-01-01_2022-02-01"
+begin = datetime(2022, 1, 1)
+end = datetime(2022, 2, 1)
+
+
+def main():
+    binance_connector = BinanceConnector(
+        None, None, [symbol], future_type=FuturesType.COIN_M
+    )
+    binance_connector.fetch_futures_agg_trades(symbol, begin, end, path)
+    trades = read_columns(path)
+    print(f"{len(trades['id'])} aggregate trades saved to {path}")
+
+
+if __name__ == "__main__":
+    main()
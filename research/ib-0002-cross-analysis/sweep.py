@@ -0,0 +1,66 @@
+import argparse
+import sys
+
+sys.path.append("../../")
+
+from connectors.binance.agg_trades_fetcher import read_columns
+from strategy.arbitrage.backtester import Latencies
+from strategy.arbitrage.backtester import load_binance_trades
+from strategy.arbitrage.backtester import load_dydx_trades
+from strategy.arbitrage.parameter_sweep import format_table
+from strategy.arbitrage.parameter_sweep import make_random
+from strategy.arbitrage.parameter_sweep import run_sweep
+from strategy.arbitrage.cycle_runner import Settings
+
+parser = argparse.ArgumentParser(
+    description="Random search over the arbitrage trader settings"
+)
+parser.add_argument(
+    "--binance-trades",
+    dest="binance_trades",
+    default="BTCUSD_PERP_binance_2022-01-01_2022-02-01",
+)
+parser.add_argument(
+    "--dydx-trades",
+    dest="dydx_trades",
+    default="ETH-USD_dydx_2022-01-01_2022-02-01.csv",
+)
+parser.add_argument("--points", dest="points", type=int, default=1000)
+parser.add_argument("--workers", dest="workers", type=int, default=None)
+parser.add_argument("--top", dest="top", type=int, default=30)
+args = parser.parse_args()
+
+settings = Settings(
+    trailing_percent=0.14,
+    quantity=0.01,
+    profit_threshold=0.0024,
+    sec_to_wait=20,
+    sec_after_trade=2.9,
+    signal_threshold=0.0021,
+    dydx_symbol="ETH-USD",
+    dydx_network="backtest",
+    round_digits=1,
+)
+
+
+def main():
+    settings_list = make_random(
+        settings,
+        args.points,
+        signal_threshold=(0.001, 0.004),
+        trailing_percent=(0.05, 0.5),
+        profit_threshold=(0.001, 0.004),
+        sec_to_wait=(5, 60),
+    )
+    results = run_sweep(
+        settings_list,
+        load_binance_trades(read_columns(args.binance_trades)),
+        load_dydx_trades(args.dydx_trades),
+        Latencies(),
+        max_workers=args.workers,
+    )
+    print(format_table(results, top=args.top))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+import argparse
+import json
+import random
+import time
+
+from connectors.dydx.order_book_cache import OrderBookCache
+from connectors.dydx.tick_order_book import TickOrderBook
+
+parser = argparse.ArgumentParser(
+    description="OrderBookCache vs TickOrderBook update speed"
+)
+parser.add_argument(
+    "--file",
+    dest="file",
+    default=None,
+    help="order book recorded by collect_data/collect_order_book.py",
+)
+parser.add_argument("--tick-size", dest="tick_size", type=float, default=0.1)
+parser.add_argument("--updates", dest="updates", type=int, default=100000)
+args = parser.parse_args()
+
+
+def get_price(tick: int) -> str:
+    return f"{tick * args.tick_size:.1f}"
+
+
+def generate_updates(num_updates: int) -> list:
+    random.seed(0)
+    mid_tick = 30000
+    updates = [
+        {
+            "type": "subscribed",
+            "contents": {
+                "bids": [
+                    {"price": get_price(tick), "size": "1", "offset": "1"}
+                    for tick in range(mid_tick - 1000, mid_tick)
+                ],
+                "asks": [
+                    {"price": get_price(tick), "size": "1", "offset": "1"}
+                    for tick in range(mid_tick + 1, mid_tick + 1000)
+                ],
+            },
+        }
+    ]
+    for offset in range(2, num_updates + 2):
+        mid_tick += random.choice([-2, -1, 0, 0, 1, 2])
+        updates.append(
+            {
+                "type": "channel_data",
+                "contents": {
+                    "offset": str(offset),
+                    "bids": [
+                        [
+                            get_price(mid_tick - random.randint(1, 50)),
+                            random.choice(["0", "0.5", "1.5"]),
+                        ]
+                    ],
+                    "asks": [
+                        [
+                            get_price(mid_tick + random.randint(1, 50)),
+                            random.choice(["0", "0.5", "1.5"]),
+                        ]
+                    ],
+                },
+            }
+        )
+    return updates
+
+
+def load_updates(path: str) -> list:
+    with open(path, "r", encoding="utf8") as file:
+        return [json.loads(line)["update"] for line in file]
+
+
+def measure(order_book, updates: list, get_top) -> float:
+    start_time = time.perf_counter()
+    for update in updates:
+        order_book.update_orders(
+            update["contents"],
+            is_first_request=update["type"] == "subscribed",
+        )
+        get_top(order_book)
+    return time.perf_counter() - start_time
+
+
+def get_cache_top(order_book: OrderBookCache) -> tuple:
+    return order_book.best_bid, order_book.best_ask
+
+
+def get_tick_top(order_book: TickOrderBook) -> tuple:
+    return order_book.get_best_bid(), order_book.get_best_ask()
+
+
+def main():
+    if args.file is not None:
+        updates = load_updates(args.file)
+    else:
+        updates = generate_updates(args.updates)
+    symbol = "ETH-USD"
+    results = {
+        "OrderBookCache": measure(
+            OrderBookCache(symbol), updates, get_cache_top
+        ),
+        "TickOrderBook": measure(
+            TickOrderBook(symbol, args.tick_size), updates, get_tick_top
+        ),
+    }
+    for name, elapsed in results.items():
+        print(
+            f"{name:>15}: {elapsed:.3f} s,"
+            f" {elapsed * 10 ** 6 / len(updates):.2f} us per update"
+        )
+
+
+if __name__ == "__main__":
+    main()
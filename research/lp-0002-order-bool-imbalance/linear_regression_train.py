@@ -24,7 +24,7 @@ file = open(
 data = [[0] * (max_order_book_depth * decision_threshold_number)]
 y_desicions = []
 y_jumps = []
-order_book = OrderBookCache(symbol)
+order_book = OrderBookCache(symbol, depth=max_order_book_depth)
 bids_price_window = deque()
 asks_price_window = deque()
 
@@ -36,14 +36,9 @@ def str_to_datetime(s: str) -> datetime:
         return datetime.strptime(s, "%Y-%m-%d %H:%M:%S")
 
 
-def get_balance_measure(bids: list, asks: list, depth: int) -> float:
-    bids_volume = 0
-    asks_volume = 0
-    size_bids = list(map(lambda bid: float(bids[bid]["size"]), bids))
-    size_asks = list(map(lambda ask: float(asks[ask]["size"]), asks))
-    for i in range(depth):
-        bids_volume += size_bids[-i - 1]
-        asks_volume += size_asks[i]
+def get_balance_measure(order_book: OrderBookCache, depth: int) -> float:
+    bids_volume = order_book.get_bid_volume(depth)
+    asks_volume = order_book.get_ask_volume(depth)
     return (bids_volume - asks_volume) / (bids_volume + asks_volume)
 
 
@@ -139,7 +134,7 @@ for i in range(decision_threshold_number):
     clean_and_add_odders(time)
 
     for depth in range(1, max_order_book_depth + 1):
-        balance_measure = get_balance_measure(bids, asks, depth)
+        balance_measure = get_balance_measure(order_book, depth)
         data[0][
             (depth - 1) * decision_threshold_number
             + decision_threshold_number
@@ -179,7 +174,7 @@ for i in range(decision_threshold_number, len(file)):
             len(data[0]) - 1 - j - max_order_book_depth
         ]
     for depth in range(1, max_order_book_depth + 1):
-        balance_measure = get_balance_measure(bids, asks, depth)
+        balance_measure = get_balance_measure(order_book, depth)
         data[-1][depth - 1] = balance_measure
 
     clean_and_add_odders(time)
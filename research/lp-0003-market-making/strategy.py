@@ -1,30 +1,15 @@
 import time
 import argparse
-from functools import wraps
 from threading import Thread, Lock
 from datetime import datetime, timedelta
 from dydx3.errors import DydxApiError
-from connectors.dydx.connector import DydxConnector, safe_execute
+from connectors.dydx.connector import DydxConnector, OrderRequest
+from connectors.dydx.connector import safe_execute
 from connectors.dydx.order_book_cache import OrderBookCache
+from connectors.dydx.trade import Trade
 from utils.logger import LOGGER
 
 
-def too_many_requests_guard(function):
-    @wraps(function)
-    def wrapper(*args, **kwargs):
-        while True:
-            try:
-                return function(*args, **kwargs)
-            except DydxApiError as dydx_error:
-                if dydx_error.status_code == 429:
-                    LOGGER.debug(f"Too many requests error: {dydx_error}")
-                    time.sleep(1)
-                    continue
-                raise dydx_error
-
-    return wrapper
-
-
 class MarketMakingStrategy:
     update_processing_ms = 100
     order_expiration_time_sec = 30
@@ -39,7 +24,7 @@ class MarketMakingStrategy:
 
     trade_update_mutex = Lock()
 
-    def __init__(self, symbol: str) -> None:
+    def __init__(self, symbol: str, order_book_snapshot: str = None) -> None:
         self.symbol = symbol
         if symbol == "ETH-USD":
             self.buying_power = 0.01
@@ -55,13 +40,19 @@ class MarketMakingStrategy:
         self.dydx_connector_order_book = DydxConnector(
             [symbol],
         )
-        self.dydx_connector_trades.add_trade_listener(self.on_trade_update)
-        self.dydx_connector_order_book.add_orderbook_listener(
-            self.on_order_book_update
+        self.dydx_connector_trades.add_trade_subscription(
+            symbol, self.on_trade_update
+        )
+        self.dydx_connector_order_book.add_orderbook_subscription(
+            symbol, self.on_order_book_update
         )
         self.set_null_last_trades()
         self.set_null_open_orders()
         self.order_book = OrderBookCache(self.symbol)
+        if order_book_snapshot is not None:
+            # Warm start, the websocket snapshot replaces it when it arrives
+            with open(order_book_snapshot, "rb") as file:
+                self.order_book = OrderBookCache.from_bytes(file.read())
 
     @staticmethod
     def get_datetime(string_time: str) -> datetime:
@@ -91,18 +82,15 @@ class MarketMakingStrategy:
             <= datetime.utcnow()
         )
 
-    def on_trade_update(self, update: dict) -> None:
-        if self.is_update_expired(self.get_datetime(update["createdAt"])):
+    def on_trade_update(self, update: Trade) -> None:
+        if self.is_update_expired(self.get_datetime(update.created_at)):
             return
-        if self.last_trades[update["side"]]["price"] == update["price"]:
+        if self.last_trades[update.side]["price"] == update.price:
             return
-        if (
-            self.get_new_price(update["side"])
-            == self.open_orders[update["side"]]
-        ):
+        if self.get_new_price(update.side) == self.open_orders[update.side]:
             return
-        self.last_trades[update["side"]]["price"] = update["price"]
-        self.last_trades[update["side"]]["time"] = update["createdAt"]
+        self.last_trades[update.side]["price"] = update.price
+        self.last_trades[update.side]["time"] = update.created_at
         self.on_trade_update_notify()
 
     def on_trade_update_notify(self, update_time=None) -> None:
@@ -118,7 +106,7 @@ class MarketMakingStrategy:
         self.trade_update_mutex.acquire()
         start_time = time.time()
 
-        self.threading_replace_mirror_orders()
+        self.replace_mirror_orders()
         open_positions = self.get_open_positions_by_dydx_api()
         if len(open_positions) != 0:
             self.is_running = False
@@ -196,41 +184,37 @@ class MarketMakingStrategy:
             except DydxApiError as error:
                 LOGGER.debug(f"Cancel error: {error}")
 
-    def threading_replace_mirror_orders(self) -> None:
-        if self.open_orders["BUY"]:
-            thread_send_order_buy = Thread(
-                target=self.send_limit_order,
-                kwargs={
-                    "side": "BUY",
-                    "cancel_id": self.open_orders["BUY"]["id"],
-                },
-            )
-        else:
-            thread_send_order_buy = Thread(
-                target=self.send_limit_order,
-                kwargs={"side": "BUY"},
-            )
-        thread_send_order_buy.start()
-
-        if self.open_orders["SELL"]:
-            thread_send_order_sell = Thread(
-                target=self.send_limit_order,
-                kwargs={
-                    "side": "SELL",
-                    "cancel_id": self.open_orders["SELL"]["id"],
-                },
-            )
-        else:
-            thread_send_order_sell = Thread(
-                target=self.send_limit_order,
-                kwargs={
-                    "side": "SELL",
-                },
+    def replace_mirror_orders(self) -> None:
+        if not self.need_to_update_our_orders():
+            return
+        requests = []
+        for side in ["BUY", "SELL"]:
+            LOGGER.debug(f"Send limit {side}, {self.get_new_price(side)}$")
+            requests.append(
+                OrderRequest(
+                    "send_limit_order",
+                    {
+                        "symbol": self.symbol,
+                        "side": side,
+                        "price": self.get_new_price(side),
+                        "quantity": self.buying_power,
+                        "cancel_id": self.open_orders[side]["id"]
+                        if self.open_orders[side]
+                        else None,
+                    },
+                )
             )
-        thread_send_order_sell.start()
-
-        thread_send_order_buy.join()
-        thread_send_order_sell.join()
+        results = self.dydx_connector_trades.send_batch(requests)
+        for result in results:
+            side = result.request.params["side"]
+            if result.error is None:
+                self.open_orders[side] = result.response["order"]
+            else:
+                LOGGER.debug(f"Send limit {side} error: {result.error}")
+        LOGGER.debug(
+            "Mirror orders replaced in "
+            f"{max(result.elapsed_ns for result in results) / 1e6} ms"
+        )
 
     def set_order_for_second_punch(self) -> None:
         LOGGER.debug("Set orders for second punch")
@@ -262,16 +246,13 @@ class MarketMakingStrategy:
                 size=-total_size,
             )
 
-    @too_many_requests_guard
     def wait_for_second_punch(self, divider: int) -> None:
         if len(self.dydx_connector_trades.get_our_orders()["orders"]) != 0:
             time.sleep(self.order_expiration_time_sec / divider)
 
-    @too_many_requests_guard
     def get_our_orders_by_dydx_api(self) -> dict:
         return self.dydx_connector_trades.get_our_orders()["orders"]
 
-    @too_many_requests_guard
     def get_open_positions_by_dydx_api(self) -> dict:
         return self.dydx_connector_trades.get_our_positions()["positions"]
 
@@ -318,10 +299,10 @@ class MarketMakingStrategy:
         return 10 ** (-self.tick_size_round)
 
     def get_max_bid(self) -> float:
-        return list(map(lambda x: float(x), self.order_book.bids.keys()))[-1]
+        return self.order_book.best_bid
 
     def get_min_ask(self) -> float:
-        return list(map(lambda x: float(x), self.order_book.asks.keys()))[0]
+        return self.order_book.best_ask
 
     def get_new_price(self, side: str, spread=None) -> float:
         if spread == None:
@@ -336,7 +317,6 @@ class MarketMakingStrategy:
                 self.get_min_ask() * (1 + spread), self.tick_size_round
             )
 
-    @too_many_requests_guard
     def send_limit_order(
         self,
         *,
@@ -396,10 +376,13 @@ class MarketMakingStrategy:
 def main() -> None:
     parser = argparse.ArgumentParser()
     parser.add_argument("--symbol", dest="symbol", required=True)
+    parser.add_argument(
+        "--order-book-snapshot", dest="order_book_snapshot", default=None
+    )
     args = parser.parse_args()
     symbol = args.symbol
 
-    mms = MarketMakingStrategy(symbol)
+    mms = MarketMakingStrategy(symbol, args.order_book_snapshot)
     mms.run()
 
 
@@ -100,7 +100,9 @@ class FindLeaps:
             )
 
     def on_dydx_trade(self, trade):
-        # LOGGER.info(f"{trade['symbol']} :: received dydx trade: {trade}")
+        # LOGGER.info(f"{trade.symbol} :: received dydx trade: {trade}")
+        # process_trade writes the trades as json
+        trade = trade.to_dict()
 
         if trade["side"] == "BUY":
             self.process_trade(
@@ -0,0 +1,336 @@
+import csv
+import heapq
+import itertools
+from dataclasses import dataclass
+from typing import NamedTuple
+
+import numpy as np
+
+from connectors.binance.market_feed import MarketTrade
+from connectors.binance.market_feed import STREAM_AGG_TRADE
+from strategy.arbitrage import trade_cycle
+from strategy.arbitrage.cycle_runner import CycleRunner
+from strategy.arbitrage.cycle_runner import Settings
+from strategy.arbitrage.trade_cycle import CycleEvent
+from strategy.arbitrage.trade_cycle import TradeCycle
+from strategy.order_registry import OrderRole
+
+ORDER_MARKET = "MARKET"
+ORDER_LIMIT = "LIMIT"
+ORDER_TRAILING_STOP = "TRAILING_STOP"
+
+
+class Latencies(NamedTuple):
+    """Milliseconds"""
+
+    b_u: int = 200  # from binance(b) to us(u)
+    u_d: int = 400  # from us(u) to dydx(d)
+    d_u: int = 400  # from dydx(d) back to us(u)
+
+
+class TradeArrays(NamedTuple):
+    """
+    Trades sorted by time. is_buy is the taker side for dYdX and
+    not is_buyer_maker for Binance.
+    """
+
+    time: np.ndarray
+    price: np.ndarray
+    is_buy: np.ndarray
+
+
+def load_dydx_trades(path: str) -> TradeArrays:
+    """path: csv of collect_data/get_trades_from_dydx_api.py"""
+    with open(path, "r", encoding="utf8") as file:
+        rows = list(csv.DictReader(file))
+    rows.sort(key=lambda row: row["createdAt"])
+    return TradeArrays(
+        np.array(
+            [row["createdAt"].rstrip("Z") for row in rows],
+            dtype="datetime64[ms]",
+        ).astype(np.int64),
+        np.array([row["price"] for row in rows], dtype=np.float64),
+        np.array([row["side"] == "BUY" for row in rows], dtype=bool),
+    )
+
+
+def load_binance_trades(columns: dict) -> TradeArrays:
+    """columns: see connectors.binance.agg_trades_fetcher.read_columns"""
+    return TradeArrays(
+        columns["time"], columns["price"], ~columns["is_buyer_maker"]
+    )
+
+
+@dataclass
+class SimulatedOrder:
+    client_id: str
+    order_id: str
+    side: str
+    kind: str
+    price: float = None
+    trailing: float = None
+    # Best price since placement for trailing stops
+    extreme: float = None
+
+
+class SimulatedMatcher:
+    """
+    Fills dYdX orders against recorded trades, ignoring size and queue
+    position. Market orders take the next trade on their side, limits
+    fill when a trade goes through their price and trailing stops fill
+    on the trade that retraces trailing from the best price since they
+    were placed. Every call returns account updates in the format of
+    the dYdX account channel.
+    """
+
+    def __init__(self, quantity: float) -> None:
+        self.quantity = str(quantity)
+        self.orders = {}
+        self.order_ids = itertools.count(1)
+
+    def _update(self, order: SimulatedOrder, status: str, price=None) -> dict:
+        contents = {
+            "orders": [
+                {
+                    "clientId": order.client_id,
+                    "id": order.order_id,
+                    "status": status,
+                    "cancelReason": None,
+                }
+            ]
+        }
+        if price is not None:
+            contents["fills"] = [
+                {
+                    "orderClientId": order.client_id,
+                    "orderId": order.order_id,
+                    "side": order.side,
+                    "price": str(price),
+                    "size": self.quantity,
+                }
+            ]
+        return {"contents": contents}
+
+    # pylint: disable=too-many-arguments
+    def add_order(
+        self, client_id: str, side: str, kind: str, price=None, trailing=None
+    ) -> list:
+        order = SimulatedOrder(
+            client_id, str(next(self.order_ids)), side, kind, price, trailing
+        )
+        self.orders[order.order_id] = order
+        if kind == ORDER_LIMIT:
+            return [self._update(order, "OPEN")]
+        if kind == ORDER_TRAILING_STOP:
+            return [self._update(order, "UNTRIGGERED")]
+        return []
+
+    def cancel(self, order_ids: list) -> list:
+        updates = []
+        for order_id in order_ids:
+            order = self.orders.pop(order_id, None)
+            if order is not None:
+                updates.append(self._update(order, "CANCELED"))
+        return updates
+
+    def _is_filled(self, order: SimulatedOrder, price: float, is_buy: bool):
+        is_buy_order = order.side == "BUY"
+        if order.kind == ORDER_MARKET:
+            return is_buy == is_buy_order
+        if order.kind == ORDER_LIMIT:
+            if is_buy_order:
+                return not is_buy and price < order.price
+            return is_buy and price > order.price
+        if order.extreme is None:
+            order.extreme = price
+        elif is_buy_order:
+            order.extreme = min(order.extreme, price)
+        else:
+            order.extreme = max(order.extreme, price)
+        if is_buy_order:
+            return price >= order.extreme * (1 + order.trailing)
+        return price <= order.extreme * (1 - order.trailing)
+
+    def on_trade(self, price: float, is_buy: bool) -> list:
+        if not self.orders:
+            return []
+        filled = [
+            order
+            for order in self.orders.values()
+            if self._is_filled(order, price, is_buy)
+        ]
+        for order in filled:
+            del self.orders[order.order_id]
+        return [
+            self._update(
+                order,
+                "FILLED",
+                order.price if order.kind == ORDER_LIMIT else price,
+            )
+            for order in filled
+        ]
+
+
+class Backtester(CycleRunner):
+    """
+    Replays recorded Binance and dYdX trades through the CycleRunner of
+    the live Trader on a simulated clock. Binance trades reach the
+    runner after latencies.b_u, orders reach SimulatedMatcher after
+    u_d and account updates come back after d_u. Scheduled events are
+    kept in a heap and merged with the two sorted trade arrays.
+    """
+
+    def __init__(
+        self,
+        settings: Settings,
+        binance_trades: TradeArrays,
+        dydx_trades: TradeArrays,
+        latencies: Latencies = Latencies(),
+    ) -> None:
+        super().__init__(settings, "backtest")
+        self.binance_trades = binance_trades
+        self.dydx_trades = dydx_trades
+        self.latencies = latencies
+        self.matcher = SimulatedMatcher(settings.quantity)
+        self.now_ms = 0
+        self.scheduled = []
+        self.sequence = itertools.count()
+        self.finished_cycles = []
+        self.processed = 0
+
+    def schedule(self, delay_ms: float, callback, *args) -> None:
+        heapq.heappush(
+            self.scheduled,
+            (self.now_ms + delay_ms, next(self.sequence), callback, args),
+        )
+
+    def _send_order(
+        self, role: OrderRole, side: str, cycle, attempt: int = 0, **kwargs
+    ):
+        client_id = self.register(role, side, cycle, attempt)
+        self.schedule(
+            self.latencies.u_d, self._on_order_arrival, client_id, side, kwargs
+        )
+
+    def _on_order_arrival(self, client_id: str, side: str, kwargs: dict):
+        self._report(self.matcher.add_order(client_id, side, **kwargs))
+
+    def _on_cancel_arrival(self, order_ids: list) -> None:
+        self._report(self.matcher.cancel(order_ids))
+
+    def _report(self, updates: list) -> None:
+        for update in updates:
+            self.schedule(self.latencies.d_u, self._on_account_update, update)
+
+    def _on_account_update(self, update: dict) -> None:
+        for event in self.get_account_events(update):
+            self.on_cycle_event(event, self.now_ms)
+
+    def execute(self, cycle: TradeCycle, action: trade_cycle.Action) -> None:
+        if action.kind == trade_cycle.ACTION_START_TIMER:
+            self.schedule(action.value * 1000, self._on_timeout, cycle.cycle_id)
+        elif action.kind == trade_cycle.ACTION_SEND_MARKET:
+            self._send_order(
+                OrderRole.MARKET, cycle.side, cycle, kind=ORDER_MARKET
+            )
+        elif action.kind == trade_cycle.ACTION_SEND_EXITS:
+            self._send_order(
+                OrderRole.LIMIT,
+                cycle.opp_side,
+                cycle,
+                kind=ORDER_LIMIT,
+                price=float(action.value),
+            )
+            self._send_order(
+                OrderRole.TRAILING,
+                cycle.opp_side,
+                cycle,
+                kind=ORDER_TRAILING_STOP,
+                trailing=abs(float(cycle.get_trailing_percent())) / 100,
+            )
+        elif action.kind == trade_cycle.ACTION_CANCEL_EXITS:
+            self.schedule(
+                self.latencies.u_d,
+                self._on_cancel_arrival,
+                self.get_open_exit_ids(cycle),
+            )
+        elif action.kind == trade_cycle.ACTION_CANCEL_ORDER:
+            self.schedule(
+                self.latencies.u_d, self._on_cancel_arrival, [action.value]
+            )
+        elif action.kind == trade_cycle.ACTION_CLOSE_POSITION:
+            self._send_order(
+                OrderRole.CLOSE_POSITION,
+                cycle.opp_side,
+                cycle,
+                action.value,
+                kind=ORDER_MARKET,
+            )
+
+    def _on_timeout(self, cycle_id: int) -> None:
+        self.on_cycle_event(
+            CycleEvent(trade_cycle.EVENT_TIMEOUT, cycle_id), self.now_ms
+        )
+
+    def on_cycle_done(self, cycle: TradeCycle) -> None:
+        self.finished_cycles.append(cycle)
+
+    def run(self) -> list:
+        """Return value: finished TradeCycles"""
+        # pylint: disable=too-many-locals
+        inf = float("inf")
+        symbol = self.settings.binance_symbol
+        is_taker_buy = self.binance_trades.is_buy
+        binance_times = (
+            self.binance_trades.time[is_taker_buy] + self.latencies.b_u
+        ).tolist()
+        binance_exchange_times = self.binance_trades.time[is_taker_buy].tolist()
+        binance_prices = self.binance_trades.price[is_taker_buy].tolist()
+        dydx_times = self.dydx_trades.time.tolist()
+        dydx_prices = self.dydx_trades.price.tolist()
+        dydx_is_buy = self.dydx_trades.is_buy.tolist()
+        binance_index = dydx_index = 0
+        while True:
+            next_binance = (
+                binance_times[binance_index]
+                if binance_index < len(binance_times)
+                else inf
+            )
+            next_dydx = (
+                dydx_times[dydx_index] if dydx_index < len(dydx_times) else inf
+            )
+            next_scheduled = self.scheduled[0][0] if self.scheduled else inf
+            # Scheduled events go first on ties: an order that arrives
+            # at the time of a trade can take it
+            if next_scheduled <= next_binance and next_scheduled <= next_dydx:
+                if next_scheduled == inf:
+                    break
+                self.now_ms, _, callback, args = heapq.heappop(self.scheduled)
+                callback(*args)
+            elif next_dydx <= next_binance:
+                self.now_ms = next_dydx
+                self._report(
+                    self.matcher.on_trade(
+                        dydx_prices[dydx_index], dydx_is_buy[dydx_index]
+                    )
+                )
+                dydx_index += 1
+            else:
+                self.now_ms = next_binance
+                if not self.is_full():
+                    side = self.on_market_event(
+                        MarketTrade(
+                            symbol,
+                            STREAM_AGG_TRADE,
+                            binance_prices[binance_index],
+                            0.0,
+                            False,
+                            binance_exchange_times[binance_index],
+                            next_binance * 1_000_000,
+                        )
+                    )
+                    if side is not None:
+                        self.on_signal(side, self.now_ms)
+                binance_index += 1
+            self.processed += 1
+        return self.finished_cycles
@@ -0,0 +1,191 @@
+import abc
+import dataclasses
+import random
+from collections import deque
+
+from connectors.binance.market_feed import STREAM_BOOK_TICKER
+from connectors.binance.market_feed import STREAM_TRADE
+from strategy.arbitrage import trade_cycle
+from strategy.arbitrage.trade_cycle import CycleEvent
+from strategy.arbitrage.trade_cycle import TradeCycle
+from strategy.order_registry import OrderRegistry, OrderRole
+from utils.logger import LOGGER
+from utils.sliding_window import SlidingWindow
+
+
+@dataclasses.dataclass
+class Settings:
+    trailing_percent: float
+    quantity: float
+    profit_threshold: float
+    sec_to_wait: float
+    sec_after_trade: float
+    signal_threshold: float
+    dydx_symbol: str
+    dydx_network: str
+    round_digits: int
+    binance_symbol: str = "btcusd_perp"
+    # STREAM_BOOK_TICKER moves the window on the mid price, which
+    # usually changes before the trades print
+    signal_stream: str = STREAM_TRADE
+    # Cycles running at once and signals waiting for a free slot
+    max_cycles: int = 1
+    max_queued_cycles: int = 0
+
+
+class CycleRunner(abc.ABC):
+    """
+    Signal detection and trade cycle bookkeeping of the arbitrage
+    strategy without any I/O. Actions returned by the cycles are passed
+    to execute, which the live Trader and the backtester implement, so
+    both run the same decisions.
+    """
+
+    def __init__(self, settings: Settings, start_time: str) -> None:
+        self.settings = settings
+        self.start_time = start_time
+
+        self.cycle_counter = 0
+        self.cycles = {}
+        self.queued_sides = deque()
+        self.order_registry = OrderRegistry()
+        self.min_signal_time_ms = 0
+        self.sliding_window = SlidingWindow()
+
+        self.side = "BUY"
+        self.opp_side = "SELL"
+
+    @abc.abstractmethod
+    def execute(self, cycle: TradeCycle, action: trade_cycle.Action) -> None:
+        pass
+
+    def on_cycle_done(self, cycle: TradeCycle) -> None:
+        pass
+
+    def _update_window(self, price: float, time: int) -> bool:
+        if random.random() < 0.01:
+            max_in_window = self.sliding_window.get_max_value()
+            min_in_window = self.sliding_window.get_min_value()
+            LOGGER.debug(
+                f"Binance trade listener is still alive.\n"
+                f"Current jump: {max_in_window / min_in_window}\n"
+            )
+        if self.sliding_window.push_back(price, time):
+            max_in_window = self.sliding_window.get_max_value()
+            min_in_window = self.sliding_window.get_min_value()
+            if max_in_window / min_in_window >= (
+                1 + self.settings.signal_threshold
+            ):
+                timestamp_of_max = self.sliding_window.get_timestamp_of_max()
+                timestamp_of_min = self.sliding_window.get_timestamp_of_min()
+                if timestamp_of_max > timestamp_of_min:
+                    self.side = "BUY"
+                    self.opp_side = "SELL"
+                elif timestamp_of_max < timestamp_of_min:
+                    self.side = "SELL"
+                    self.opp_side = "BUY"
+                else:
+                    return False
+                return True
+        return False
+
+    def is_full(self) -> bool:
+        return (
+            len(self.cycles) >= self.settings.max_cycles
+            and len(self.queued_sides) >= self.settings.max_queued_cycles
+        )
+
+    def on_market_event(self, event) -> str:
+        """Return value: side of the signal or None"""
+        if self.is_full() or event.time_ms <= self.min_signal_time_ms:
+            return None
+        if self.settings.signal_stream == STREAM_BOOK_TICKER:
+            price = event.mid
+        else:
+            price = event.price
+        if self._update_window(price, event.time_ms):
+            self.sliding_window.clear()
+            return self.side
+        return None
+
+    def get_client_id(self, prefix: str, side: str, cycle: int = None) -> str:
+        if cycle is None:
+            cycle = self.cycle_counter
+        return f"{prefix}-{side}-{cycle}-{self.start_time}"
+
+    def register(
+        self, role: OrderRole, side: str, cycle: TradeCycle, attempt: int = 0
+    ) -> str:
+        """
+        attempt: number of the resend, part of the client id if not 0
+        Return value: client id of the new order
+        """
+        prefix = f"{role.value}{attempt}" if attempt else role.value
+        client_id = self.get_client_id(prefix, side, cycle.cycle_id)
+        self.order_registry.register(
+            client_id, role, cycle.cycle_id, self.settings.dydx_symbol
+        )
+        return client_id
+
+    def get_open_exit_ids(self, cycle: TradeCycle) -> list:
+        orders = self.order_registry.get_cycle_orders(cycle.cycle_id)
+        return [
+            orders[role].order_id
+            for role in trade_cycle.EXITS
+            if role in orders and orders[role].is_opened
+        ]
+
+    def start_cycle(self, side: str, now_ms: int) -> None:
+        self.cycle_counter += 1
+        cycle = TradeCycle(self.cycle_counter, side, self.settings)
+        self.cycles[cycle.cycle_id] = cycle
+        self.min_signal_time_ms = int(
+            now_ms + self.settings.sec_after_trade * 1000
+        )
+        self.run_actions(cycle, cycle.start(), now_ms)
+
+    def on_signal(self, side: str, now_ms: int) -> None:
+        if len(self.cycles) < self.settings.max_cycles:
+            self.start_cycle(side, now_ms)
+        elif len(self.queued_sides) < self.settings.max_queued_cycles:
+            self.queued_sides.append(side)
+
+    def run_actions(self, cycle: TradeCycle, actions: list, now_ms: int):
+        for action in actions:
+            self.execute(cycle, action)
+        if cycle.is_done:
+            del self.cycles[cycle.cycle_id]
+            self.order_registry.remove_cycle(cycle.cycle_id)
+            self.on_cycle_done(cycle)
+            if self.queued_sides:
+                self.start_cycle(self.queued_sides.popleft(), now_ms)
+
+    def on_cycle_event(self, event: CycleEvent, now_ms: int) -> None:
+        cycle = self.cycles.get(event.cycle_id)
+        if cycle is not None:
+            self.run_actions(cycle, cycle.on_event(event), now_ms)
+
+    def get_account_events(self, account_update: dict) -> list:
+        """Return value: CycleEvents of the tracked fills and orders"""
+        events = []
+        contents = account_update.get("contents", {})
+        for fill in contents.get("fills", []):
+            order = self.order_registry.on_fill(fill)
+            if order is not None:
+                events.append(
+                    CycleEvent(
+                        trade_cycle.EVENT_FILL, order.cycle_id, order.role, fill
+                    )
+                )
+        for update in contents.get("orders", []):
+            order = self.order_registry.on_order(update)
+            if order is not None:
+                events.append(
+                    CycleEvent(
+                        trade_cycle.EVENT_ORDER,
+                        order.cycle_id,
+                        order.role,
+                        update,
+                    )
+                )
+        return events
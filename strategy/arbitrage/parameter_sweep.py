@@ -0,0 +1,169 @@
+import dataclasses
+import itertools
+import logging
+import random
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import NamedTuple
+
+import numpy as np
+from tqdm import tqdm
+
+from strategy.arbitrage.backtester import Backtester
+from strategy.arbitrage.backtester import Latencies
+from strategy.arbitrage.backtester import TradeArrays
+from strategy.arbitrage.cycle_runner import Settings
+from utils.logger import LOGGER
+
+SWEEP_COLUMNS = (
+    "signal_threshold",
+    "trailing_percent",
+    "profit_threshold",
+    "sec_to_wait",
+)
+
+
+class SweepResult(NamedTuple):
+    settings: Settings
+    cycles: int
+    closed: int
+    profitable: int
+    profit: float
+
+
+class SharedArray(NamedTuple):
+    """What a worker needs to attach to an array in shared memory"""
+
+    name: str
+    shape: tuple
+    dtype: str
+
+
+def make_grid(base: Settings, **values) -> list:
+    """values: Settings field -> list of values to try"""
+    names = list(values)
+    return [
+        dataclasses.replace(base, **dict(zip(names, point)))
+        for point in itertools.product(*values.values())
+    ]
+
+
+def make_random(base: Settings, num_points: int, seed=0, **ranges) -> list:
+    """ranges: Settings field -> (low, high), sampled uniformly"""
+    rng = random.Random(seed)
+    return [
+        dataclasses.replace(
+            base,
+            **{
+                name: rng.uniform(low, high)
+                for name, (low, high) in ranges.items()
+            },
+        )
+        for _ in range(num_points)
+    ]
+
+
+def _to_shared(array: np.ndarray, blocks: list) -> SharedArray:
+    block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    blocks.append(block)
+    np.ndarray(array.shape, array.dtype, buffer=block.buf)[:] = array
+    return SharedArray(block.name, array.shape, array.dtype.str)
+
+
+# Set in every worker by _init_worker
+_worker_data = {}
+
+
+def _attach(trades: tuple) -> TradeArrays:
+    arrays = []
+    for shared in trades:
+        block = shared_memory.SharedMemory(name=shared.name)
+        # Keep the mapping open for the lifetime of the worker
+        _worker_data.setdefault("blocks", []).append(block)
+        arrays.append(np.ndarray(shared.shape, shared.dtype, buffer=block.buf))
+    return TradeArrays(*arrays)
+
+
+def _init_worker(binance_trades: tuple, dydx_trades: tuple, latencies):
+    LOGGER.setLevel(logging.WARNING)
+    _worker_data["binance_trades"] = _attach(binance_trades)
+    _worker_data["dydx_trades"] = _attach(dydx_trades)
+    _worker_data["latencies"] = latencies
+
+
+def run_backtest(
+    settings: Settings,
+    binance_trades: TradeArrays,
+    dydx_trades: TradeArrays,
+    latencies: Latencies,
+) -> SweepResult:
+    cycles = Backtester(settings, binance_trades, dydx_trades, latencies).run()
+    profits = [
+        cycle.get_profit() for cycle in cycles if cycle.closing_fill is not None
+    ]
+    return SweepResult(
+        settings,
+        len(cycles),
+        len(profits),
+        len([profit for profit in profits if profit > 0]),
+        sum(profits),
+    )
+
+
+def _run_in_worker(settings: Settings) -> SweepResult:
+    return run_backtest(
+        settings,
+        _worker_data["binance_trades"],
+        _worker_data["dydx_trades"],
+        _worker_data["latencies"],
+    )
+
+
+def run_sweep(
+    settings_list: list,
+    binance_trades: TradeArrays,
+    dydx_trades: TradeArrays,
+    latencies: Latencies = Latencies(),
+    max_workers: int = None,
+) -> list:
+    """
+    Backtests every Settings on a process pool. The trades are copied
+    into shared memory once and mapped by the workers instead of being
+    pickled for every task.
+    Return value: SweepResults by profit, best first
+    """
+    blocks = []
+    try:
+        shared_binance = tuple(_to_shared(a, blocks) for a in binance_trades)
+        shared_dydx = tuple(_to_shared(a, blocks) for a in dydx_trades)
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=_init_worker,
+            initargs=(shared_binance, shared_dydx, latencies),
+        ) as executor:
+            results = list(
+                tqdm(
+                    executor.map(_run_in_worker, settings_list),
+                    total=len(settings_list),
+                )
+            )
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+    return sorted(results, key=lambda result: result.profit, reverse=True)
+
+
+def format_table(results: list, top: int = 20) -> str:
+    header = list(SWEEP_COLUMNS) + ["cycles", "closed", "profitable", "profit"]
+    lines = [" ".join(f"{name:>17}" for name in header)]
+    for result in results[:top]:
+        values = [getattr(result.settings, name) for name in SWEEP_COLUMNS]
+        values += [
+            result.cycles,
+            result.closed,
+            result.profitable,
+            result.profit,
+        ]
+        lines.append(" ".join(f"{value:>17.6g}" for value in values))
+    return "\n".join(lines)
@@ -14,6 +14,8 @@ if __name__ == "__main__":
         dydx_symbol=MARKET_ETH_USD,
         dydx_network=Network.ropsten,
         round_digits=1,
+        max_cycles=1,
+        max_queued_cycles=0,
     )
     trader_old = trader.Trader(settings=trader_settings)
     trader_old.run()
@@ -0,0 +1,233 @@
+from typing import NamedTuple
+
+from strategy.order_registry import OrderRole
+from utils.logger import LOGGER
+
+EXITS = (OrderRole.LIMIT, OrderRole.TRAILING)
+
+STATE_MARKET_SENT = "market sent"
+STATE_EXITS_SENT = "exits sent"
+STATE_CANCELING = "canceling"
+STATE_CLOSING = "closing"
+STATE_DONE = "done"
+
+EVENT_SIGNAL = "signal"
+EVENT_FILL = "fill"
+EVENT_ORDER = "order"
+EVENT_TIMEOUT = "timeout"
+
+ACTION_SEND_MARKET = "send market"
+ACTION_SEND_EXITS = "send exits"
+ACTION_START_TIMER = "start timer"
+ACTION_CANCEL_EXITS = "cancel exits"
+ACTION_CANCEL_ORDER = "cancel order"
+ACTION_CLOSE_POSITION = "close position"
+
+
+class CycleEvent(NamedTuple):
+    kind: str
+    cycle_id: int = None
+    role: OrderRole = None
+    data: dict = None
+
+
+class Action(NamedTuple):
+    kind: str
+    cycle_id: int
+    value: object = None
+
+
+def get_opposite_side(side: str) -> str:
+    return "SELL" if side == "BUY" else "BUY"
+
+
+class TradeCycle:
+    """
+    One market entry with its limit and trailing exits as a synchronous
+    state machine. on_event takes fills, order updates and timeouts and
+    returns the actions the trader has to carry out, so the cycle never
+    waits on anything itself.
+    """
+
+    # pylint: disable=too-many-instance-attributes
+    maker_comission = 0.0002
+    taker_comission = 0.0005
+    # A canceled FOK close is sent again up to this many times in all
+    max_close_attempts = 3
+
+    def __init__(self, cycle_id: int, side: str, settings) -> None:
+        self.cycle_id = cycle_id
+        self.side = side
+        self.opp_side = get_opposite_side(side)
+        self.settings = settings
+        self.state = None
+        self.opening_fill = None
+        self.closing_fill = None
+        self.filled = set()
+        self.finished = set()
+        self.opened = set()
+        # role -> FILLED order update that came before its fill
+        self.waiting_fill = {}
+        self.close_attempts = 0
+
+    @property
+    def is_done(self) -> bool:
+        return self.state == STATE_DONE
+
+    def get_limit_price(self, price: str) -> str:
+        profit_threshold = self.settings.profit_threshold
+        round_digits = self.settings.round_digits
+        half_step = 0.5 / pow(10, round_digits)
+        (multiplier, add_for_round) = (
+            (1 + profit_threshold, half_step)
+            if self.opp_side == "SELL"
+            else (1 - profit_threshold, -half_step)
+        )
+        limit_price = round(
+            float(price) * multiplier + add_for_round, round_digits
+        )
+        return str(limit_price)
+
+    def get_trailing_percent(self) -> str:
+        return str(
+            self.settings.trailing_percent
+            if self.opp_side == "BUY"
+            else -self.settings.trailing_percent
+        )
+
+    def get_profit(self) -> float:
+        closing_price = float(self.closing_fill["price"])
+        opening_price = float(self.opening_fill["price"])
+        quantity = self.settings.quantity
+        if OrderRole.LIMIT in self.filled:
+            closing_comission = self.maker_comission
+        else:
+            closing_comission = self.taker_comission
+        return (
+            (closing_price - opening_price)
+            * quantity
+            * (-1 if self.side == "SELL" else 1)
+            - closing_price * quantity * closing_comission
+            - opening_price * quantity * self.taker_comission
+        )
+
+    def _log(self, message: str) -> None:
+        LOGGER.info(f"cycle {self.cycle_id} | {message}")
+
+    def _action(self, kind: str, value=None) -> Action:
+        return Action(kind, self.cycle_id, value)
+
+    def _finish(self, message: str) -> list:
+        self.state = STATE_DONE
+        self._log(
+            f"{message} | price: {self.closing_fill['price']}"
+            f" | profit: {self.get_profit()}"
+        )
+        return []
+
+    def start(self) -> list:
+        self.state = STATE_MARKET_SENT
+        self._log(f"market sent | side: {self.side}")
+        return [self._action(ACTION_SEND_MARKET)]
+
+    def _on_fill(self, role: OrderRole, fill: dict) -> None:
+        self.filled.add(role)
+        if role == OrderRole.MARKET:
+            self.opening_fill = fill
+        else:
+            self.closing_fill = fill
+
+    def _on_market_finished(self) -> list:
+        if self.opening_fill is None:
+            self.state = STATE_DONE
+            self._log("market canceled")
+            return []
+        self.state = STATE_EXITS_SENT
+        limit_price = self.get_limit_price(self.opening_fill["price"])
+        self._log(f"exits sent | {self.opp_side} | price: {limit_price}")
+        return [
+            self._action(ACTION_SEND_EXITS, limit_price),
+            self._action(ACTION_START_TIMER, self.settings.sec_to_wait),
+        ]
+
+    def _on_exits_finished(self) -> list:
+        """After the timeout: close the position if no exit filled"""
+        for role in EXITS:
+            if role in self.filled:
+                return self._finish(f"{role.name.lower()} filled")
+        if not self.opened <= self.finished:
+            return []
+        self.state = STATE_CLOSING
+        self._log(f"orders canceled, closing position | {self.opp_side}")
+        return [self._action(ACTION_CLOSE_POSITION, self.close_attempts)]
+
+    def _on_order_opened(self, role: OrderRole, order: dict) -> list:
+        self.opened.add(role)
+        if role in EXITS and self.state in (STATE_CANCELING, STATE_CLOSING):
+            # Acknowledged after the cancel was sent
+            return [self._action(ACTION_CANCEL_ORDER, order.get("id"))]
+        return []
+
+    def _on_exit_finished(self, role: OrderRole, status: str) -> list:
+        if status == "FILLED":
+            return self._finish(f"{role.name.lower()} filled") + [
+                self._action(ACTION_CANCEL_EXITS)
+            ]
+        return []
+
+    def _on_close_finished(self, status: str) -> list:
+        if status == "FILLED":
+            return self._finish("position closed")
+        self.close_attempts += 1
+        if self.close_attempts < self.max_close_attempts:
+            self._log(f"close position canceled, retrying | {self.opp_side}")
+            return [self._action(ACTION_CLOSE_POSITION, self.close_attempts)]
+        self.state = STATE_DONE
+        LOGGER.error(
+            f"cycle {self.cycle_id} | close position canceled"
+            f" {self.close_attempts} times, position is left open"
+        )
+        return []
+
+    def _on_order_finished(self, role: OrderRole, status: str) -> list:
+        self.finished.add(role)
+        if role == OrderRole.CLOSE_POSITION:
+            return self._on_close_finished(status)
+        if role == OrderRole.MARKET:
+            if self.state == STATE_MARKET_SENT:
+                return self._on_market_finished()
+        elif self.state == STATE_EXITS_SENT:
+            return self._on_exit_finished(role, status)
+        elif self.state == STATE_CANCELING:
+            return self._on_exits_finished()
+        return []
+
+    def _on_order(self, role: OrderRole, order: dict) -> list:
+        status = order["status"]
+        if status in ("OPEN", "UNTRIGGERED"):
+            return self._on_order_opened(role, order)
+        if status not in ("FILLED", "CANCELED"):
+            return []
+        if status == "FILLED" and role not in self.filled:
+            # Finished when its fill arrives, the fill has the price
+            self.waiting_fill[role] = order
+            return []
+        return self._on_order_finished(role, status)
+
+    def on_event(self, event: CycleEvent) -> list:
+        """Return value: actions to carry out"""
+        if self.is_done:
+            return []
+        if event.kind == EVENT_FILL:
+            self._on_fill(event.role, event.data)
+            order = self.waiting_fill.pop(event.role, None)
+            return [] if order is None else self._on_order(event.role, order)
+        if event.kind == EVENT_ORDER:
+            return self._on_order(event.role, event.data)
+        if event.kind == EVENT_TIMEOUT and self.state == STATE_EXITS_SENT:
+            self.state = STATE_CANCELING
+            self._log("timeout reached | cancelling exits")
+            return [
+                self._action(ACTION_CANCEL_EXITS)
+            ] + self._on_exits_finished()
+        return []
@@ -1,14 +1,19 @@
 import asyncio
-import contextlib
-import dataclasses
-import json
-import random
+import signal
+import time
 from datetime import datetime
-import websockets
 
-from connectors.dydx.connector import DydxConnector
+from connectors.binance.market_feed import BinanceMarketFeed
+from connectors.dydx.connector import DydxConnector, OrderRequest
+from strategy.arbitrage import trade_cycle
+from strategy.arbitrage.cycle_runner import CycleRunner
+from strategy.arbitrage.cycle_runner import Settings
+from strategy.arbitrage.trade_cycle import CycleEvent
+from strategy.arbitrage.trade_cycle import TradeCycle
+from strategy.order_registry import FINAL_STATUSES
+from strategy.order_registry import OrderRole
+from utils.latency import LatencyRecorder
 from utils.logger import LOGGER
-from utils.sliding_window import SlidingWindow
 
 
 def custom_exception_handler(loop, context):
@@ -29,64 +34,45 @@ def handle_task_result(task: asyncio.Task) -> None:
         raise error
 
 
-@dataclasses.dataclass
-class Settings:
-    trailing_percent: float
-    quantity: float
-    profit_threshold: float
-    sec_to_wait: float
-    sec_after_trade: float
-    signal_threshold: float
-    dydx_symbol: str
-    dydx_network: str
-    round_digits: int
+def get_now_ms() -> int:
+    return time.time_ns() // 1_000_000
 
 
-class Trader:
+class Trader(CycleRunner):
+    """
+    Turns Binance signals into dYdX trade cycles. The feed listener only
+    updates the sliding window, so the socket is read at full rate.
+    Signals, fills, order updates and timeouts go through one event
+    queue to the TradeCycle state machines, and the actions they return
+    are sent to dYdX as separate tasks.
+    """
+
     # pylint: disable=line-too-long
-    # pylint: disable=too-many-branches
     # pylint: disable=too-few-public-methods
-    maker_comission = 0.0002
-    taker_comission = 0.0005
-    symbol_binance = "btcusd_perp"
-    socket_binance = f"wss://dstream.binance.com/ws/{symbol_binance}@trade"
 
     def __init__(self, settings: Settings):
+        super().__init__(settings, str(datetime.now()))
         self.trailing_percent = settings.trailing_percent
         self.quantity = settings.quantity
-        self.profit_threshold = settings.profit_threshold
-        self.sec_to_wait = settings.sec_to_wait
-        self.sec_after_trade = settings.sec_after_trade
-        self.signal_threshold = settings.signal_threshold
         self.dydx_symbol = settings.dydx_symbol
         self.dydx_network = settings.dydx_network
-        self.round_digits = settings.round_digits
-
-        self.cycle_counter = 0
-
-        self.start_time = datetime.now()
-        self.dispatch_time = datetime.now()
-        self.sliding_window = SlidingWindow()
-
-        self.market_filled_or_canceled = asyncio.Event()
-        self.limit_filled_or_canceled = asyncio.Event()
-        self.trailing_filled_or_canceled = asyncio.Event()
-        self.mirror_filled = asyncio.Event()
-        self.position_closed = asyncio.Event()
-
-        self.side = "BUY"
-        self.opp_side = "SELL"
 
-        self.is_market_filled = False
-        self.is_limit_filled = False
-        self.is_trailing_filled = False
-        self.is_closing_filled = False
+        self.events = asyncio.Queue()
 
-        self.is_limit_opened = False
-        self.is_trailing_opened = False
+        # Stages of a cycle, all monotonic ns except the exchange clock
+        self.latency = LatencyRecorder()
+        self.latency_path = "latency.log"
+        self.signal_receive_ns = {}
+        self.market_sent_ns = {}
 
-        self.openeng_fill = {}
-        self.closing_fill = {}
+        self.binance_feed = BinanceMarketFeed(
+            [settings.binance_symbol],
+            streams=(settings.signal_stream,),
+            skip_buyer_maker=True,
+        )
+        self.binance_feed.add_listener(
+            settings.signal_stream, self._on_binance_event
+        )
 
         self.dydx_connector = DydxConnector(
             symbols=[self.dydx_symbol],
@@ -98,291 +84,249 @@ class Trader:
 
         self.loop = asyncio.get_event_loop()
 
-    def _get_limit_price(self, price: str) -> str:
-        (multiplier, add_for_round) = (
-            (1 + self.profit_threshold, 0.5 / (10 ** self.round_digits))
-            if self.opp_side == "SELL"
-            else (1 - self.profit_threshold, -0.5 / (10 ** self.round_digits))
-        )
-        limit_price = round(
-            float(price) * multiplier + add_for_round, self.round_digits
-        )
-        return str(limit_price)
-
-    def _get_trailing_percent(self) -> str:
-        return str(
-            self.trailing_percent
-            if self.opp_side == "BUY"
-            else -self.trailing_percent
-        )
-
     @staticmethod
     def _get_worst_price(side: str) -> str:
-        return str(1 if side == "SELL" else 10 ** 8)
-
-    def _get_profit(self, closed_by_limit=False):
-        closing_price = float(self.closing_fill["price"])
-        opening_price = float(self.openeng_fill["price"])
-        closing_comission = (
-            closing_price * self.quantity * self.maker_comission
-            if closed_by_limit
-            else self.taker_comission
-        )
-        opening_comission = opening_price * self.quantity * self.taker_comission
-        return (
-            (closing_price - opening_price)
-            * self.quantity
-            * (-1 if self.side == "SELL" else 1)
-            - closing_comission
-            - opening_comission
-        )
+        return "1" if side == "SELL" else "100000000"
 
-    def _update_window(self, price: float, time: int) -> bool:
-        if random.random() < 0.01:
-            max_in_window = self.sliding_window.get_max_value()
-            min_in_window = self.sliding_window.get_min_value()
-            LOGGER.debug(
-                f"Binance trade listener is still alive.\n"
-                f"Current jump: {max_in_window / min_in_window}\n"
-            )
-        if self.sliding_window.push_back(price, time):
-            max_in_window = self.sliding_window.get_max_value()
-            min_in_window = self.sliding_window.get_min_value()
-            if max_in_window / min_in_window >= (1 + self.signal_threshold):
-                timestamp_of_max = self.sliding_window.get_timestamp_of_max()
-                timestamp_of_min = self.sliding_window.get_timestamp_of_min()
-                if timestamp_of_max > timestamp_of_min:
-                    self.side = "BUY"
-                    self.opp_side = "SELL"
-                elif timestamp_of_max < timestamp_of_min:
-                    self.side = "SELL"
-                    self.opp_side = "BUY"
-                else:
-                    return False
-                return True
-        return False
-
-    async def _listen_binance(self):
-        async with websockets.connect(
-            self.socket_binance, ping_interval=None
-        ) as sock:
-            while True:
-                data = await sock.recv()
-                trade = json.loads(data)
-                # m -- side ("BUY" == 0, "SELL" == 1)
-                # T -- milliseconds timestamp
-                # p -- price
-                if (
-                    not trade["m"]
-                    and trade["T"] / 1000
-                    > self.dispatch_time.second + self.sec_to_wait + 0.5
-                ):
-                    if self._update_window(float(trade["p"]), int(trade["T"])):
-                        await self._initiate_trade_cycle()
-
-    async def _initiate_trade_cycle(self):
-        LOGGER.info(
-            "--------------------------------------------------------------"
+    def _on_binance_event(self, event) -> None:
+        # Includes the offset between our clock and the exchange one
+        self.latency.record(
+            "binance T -> receive", time.time_ns() - event.time_ms * 1_000_000
         )
-        self.cycle_counter += 1
-
-        self.dispatch_time = datetime.now()
-        self._send_market()
-        LOGGER.info(
-            f"cycle {self.cycle_counter} | market sent | side: {self.side}"
-        )
-
-        await self.market_filled_or_canceled.wait()
-        if not self.is_market_filled:
-            self._reset()
-            return
-
-        limit_price = self._get_limit_price(self.openeng_fill["price"])
+        side = self.on_market_event(event)
+        if side is not None:
+            signal_ns = self.latency.record_since(
+                "receive -> signal", event.receive_ns
+            )
+            self.events.put_nowait(
+                CycleEvent(
+                    trade_cycle.EVENT_SIGNAL,
+                    data=(side, event.receive_ns, signal_ns),
+                )
+            )
 
-        self._send_limit(limit_price)
-        LOGGER.info(
-            f"cycle {self.cycle_counter} | limit sent | {self.opp_side} | price: {limit_price}"
-        )
+    def dump_latency(self) -> None:
+        LOGGER.info(f"Latency:\n{self.latency.format_stats()}")
+        self.latency.dump(self.latency_path)
 
-        self._send_trailing()
-        # await self.trailing_opened_or_canceled()
-        # TODO: то же самое, но еще нужно будет отменить limit
-        LOGGER.info(
-            f"cycle {self.cycle_counter} | trailing sent | {self.opp_side} | percent: {self.trailing_percent}"
+    def start_cycle(self, side: str, now_ms: int) -> None:
+        super().start_cycle(side, now_ms)
+        self.binance_feed.min_trade_time_ms = self.min_signal_time_ms
+        self._create_task(
+            self._prepare_orders(self.cycle_counter + 1), "prepare orders"
         )
 
-        with contextlib.suppress(asyncio.TimeoutError):
-            await asyncio.wait_for(self.mirror_filled.wait(), self.sec_to_wait)
+    def _create_task(self, coroutine, name: str) -> None:
+        task = self.loop.create_task(coroutine, name=name)
+        task.add_done_callback(handle_task_result)
 
-        if self.mirror_filled.is_set():
-            if self.is_limit_filled:
-                LOGGER.info(
-                    f"cycle {self.cycle_counter} | limit filled | price: {self.closing_fill['price']} | profit: {self._get_profit(closed_by_limit=True)}"
+    def execute(self, cycle: TradeCycle, action: trade_cycle.Action) -> None:
+        if action.kind == trade_cycle.ACTION_START_TIMER:
+            self.loop.call_later(
+                action.value,
+                self.events.put_nowait,
+                CycleEvent(trade_cycle.EVENT_TIMEOUT, cycle.cycle_id),
+            )
+            return
+        value = action.value
+        if action.kind == trade_cycle.ACTION_CANCEL_EXITS:
+            # Resolved now, the registry forgets the cycle once it is done
+            value = self.get_open_exit_ids(cycle)
+        coroutine = {
+            trade_cycle.ACTION_SEND_MARKET: self._send_market,
+            trade_cycle.ACTION_SEND_EXITS: self._send_exit_orders,
+            trade_cycle.ACTION_CANCEL_EXITS: self._cancel_orders,
+            trade_cycle.ACTION_CANCEL_ORDER: self._cancel_order,
+            trade_cycle.ACTION_CLOSE_POSITION: self._close_position,
+        }[action.kind](cycle, value)
+        self._create_task(coroutine, f"cycle {cycle.cycle_id} {action.kind}")
+
+    async def _process_events(self):
+        while True:
+            event = await self.events.get()
+            if event.kind == trade_cycle.EVENT_SIGNAL:
+                side, receive_ns, signal_ns = event.data
+                self.latency.record_since("signal -> cycle", signal_ns)
+                cycle_counter = self.cycle_counter
+                self.on_signal(side, get_now_ms())
+                if self.cycle_counter != cycle_counter:
+                    self.signal_receive_ns[self.cycle_counter] = receive_ns
+            else:
+                self.on_cycle_event(event, get_now_ms())
+
+    async def _prepare_orders(self, next_cycle: int):
+        # Orders of the next cycle are signed ahead of time, when the
+        # previous one starts, so sending them costs only the network
+        # round trip
+        try:
+            for side in ("BUY", "SELL"):
+                await self.dydx_connector.async_prepare_market_order(
+                    symbol=self.dydx_symbol,
+                    side=side,
+                    price=Trader._get_worst_price(side),
+                    quantity=str(self.quantity),
+                    client_id=self.get_client_id(
+                        OrderRole.MARKET.value, side, next_cycle
+                    ),
                 )
-            elif self.is_trailing_filled:
-                LOGGER.info(
-                    f"cycle {self.cycle_counter} | trailing filled | price: {self.closing_fill['price']} | profit: {self._get_profit()}"
+                await self.dydx_connector.async_prepare_trailing_stop_order(
+                    symbol=self.dydx_symbol,
+                    side=side,
+                    price=Trader._get_worst_price(side),
+                    quantity=str(self.quantity),
+                    trailing_percent=str(self.trailing_percent),
+                    client_id=self.get_client_id(
+                        OrderRole.TRAILING.value, side, next_cycle
+                    ),
                 )
-            self._cancel_orders()
-        else:
-            LOGGER.info(
-                f"cycle {self.cycle_counter} | timeout reached | cancelling all orders"
-            )
-            self._cancel_orders()
-
-            if self.is_limit_opened:
-                await self.limit_filled_or_canceled.wait()
-                if self.is_limit_filled:
-                    LOGGER.info(
-                        f"cycle {self.cycle_counter} | limit filled | price: {self.closing_fill['price']} | profit: {self._get_profit(closed_by_limit=True)}"
-                    )
-                    self._reset()
-                    return
-
-            if self.is_trailing_opened:
-                await self.trailing_filled_or_canceled.wait()
-                if self.is_trailing_filled:
-                    LOGGER.info(
-                        f"cycle {self.cycle_counter} | trailing filled | price: {self.closing_fill['price']} | profit: {self._get_profit()}"
-                    )
-                    self._reset()
-                    return
-
-            LOGGER.info(
-                f"cycle {self.cycle_counter} | orders canceled, closing position | {self.opp_side}"
-            )
-            self._close_position()
-            await self.position_closed.wait()
-            LOGGER.info(
-                f"cycle {self.cycle_counter} | position closed | price: {self.closing_fill['price']} | profit: {self._get_profit()}"
-            )
-
-        self._reset()
-
-    def _reset(self):
-        self.market_filled_or_canceled.clear()
-        self.limit_filled_or_canceled.clear()
-        self.trailing_filled_or_canceled.clear()
-        self.mirror_filled.clear()
-        self.position_closed.clear()
-        self.sliding_window.clear()
-
-        self.is_market_filled = False
-        self.is_limit_filled = False
-        self.is_trailing_filled = False
-
-        self.is_limit_opened = False
-        self.is_trailing_opened = False
+                await self.dydx_connector.async_prepare_market_order(
+                    symbol=self.dydx_symbol,
+                    side=side,
+                    price=Trader._get_worst_price(side),
+                    quantity=str(self.quantity),
+                    client_id=self.get_client_id(
+                        OrderRole.CLOSE_POSITION.value, side, next_cycle
+                    ),
+                )
+        except Exception as error:
+            LOGGER.error(f"Failed to prepare orders: {error}")
 
-    def _send_market(self):
-        self.dydx_connector.send_market_order(
+    async def _send_market(self, cycle: TradeCycle, _value):
+        start_ns = time.monotonic_ns()
+        self.market_sent_ns[cycle.cycle_id] = start_ns
+        await self.dydx_connector.async_send_market_order(
             symbol=self.dydx_symbol,
-            side=self.side,
-            price=Trader._get_worst_price(self.side),
+            side=cycle.side,
+            price=Trader._get_worst_price(cycle.side),
             quantity=str(self.quantity),
-            client_id=f"mk-{self.side}-{self.cycle_counter}-{self.start_time}",  # MarKet
+            client_id=self.register(OrderRole.MARKET, cycle.side, cycle),
         )
-
-    def _send_trailing(self):
-        self.dydx_connector.send_trailing_stop_order(
-            symbol=self.dydx_symbol,
-            side=self.opp_side,
-            price=Trader._get_worst_price(self.opp_side),
-            quantity=str(self.quantity),
-            trailing_percent=self._get_trailing_percent(),
-            client_id=f"ts-{self.opp_side}-{self.cycle_counter}-{self.start_time}",  # Trailing Stop
+        self.latency.record_since("market send", start_ns)
+        receive_ns = self.signal_receive_ns.pop(cycle.cycle_id, None)
+        if receive_ns is not None:
+            self.latency.record_since("tick to trade", receive_ns)
+
+    async def _send_exit_orders(self, cycle: TradeCycle, limit_price: str):
+        start_ns = time.monotonic_ns()
+        results = await self.dydx_connector.async_send_batch(
+            [
+                OrderRequest(
+                    "send_limit_order",
+                    {
+                        "symbol": self.dydx_symbol,
+                        "side": cycle.opp_side,
+                        "price": limit_price,
+                        "quantity": str(self.quantity),
+                        "client_id": self.register(
+                            OrderRole.LIMIT, cycle.opp_side, cycle
+                        ),
+                    },
+                ),
+                OrderRequest(
+                    "send_trailing_stop_order",
+                    {
+                        "symbol": self.dydx_symbol,
+                        "side": cycle.opp_side,
+                        "price": Trader._get_worst_price(cycle.opp_side),
+                        "quantity": str(self.quantity),
+                        "trailing_percent": cycle.get_trailing_percent(),
+                        "client_id": self.register(
+                            OrderRole.TRAILING, cycle.opp_side, cycle
+                        ),
+                    },
+                ),
+            ]
         )
+        self.latency.record_since("exits send", start_ns)
+        for result in results:
+            if result.error is not None:
+                LOGGER.error(
+                    f"cycle {cycle.cycle_id} | {result.request.method} failed | {result.error}"
+                )
+            else:
+                LOGGER.info(
+                    f"cycle {cycle.cycle_id} | {result.request.method} | {result.elapsed_ns / 1e6} ms"
+                )
+        return results
 
-    def _send_limit(self, limit_price):
-        self.dydx_connector.send_limit_order(
+    async def _close_position(self, cycle: TradeCycle, attempt: int):
+        await self.dydx_connector.async_send_market_order(
             symbol=self.dydx_symbol,
-            side=self.opp_side,
-            price=limit_price,
+            side=cycle.opp_side,
+            price=Trader._get_worst_price(cycle.opp_side),
             quantity=str(self.quantity),
-            client_id=f"lm-{self.opp_side}-{self.cycle_counter}-{self.start_time}",  # LiMit
+            client_id=self.register(
+                OrderRole.CLOSE_POSITION, cycle.opp_side, cycle, attempt
+            ),
         )
 
-    def _close_position(self):
-        self.dydx_connector.send_market_order(
-            symbol=self.dydx_symbol,
-            side=self.opp_side,
-            price=Trader._get_worst_price(self.opp_side),
-            quantity=str(self.quantity),
-            client_id=f"cp-{self.opp_side}-{self.cycle_counter}-{self.start_time}",  # Close Position
-        )
+    async def _cancel_orders(self, cycle: TradeCycle, order_ids: list):
+        if self.settings.max_cycles == 1:
+            await self.dydx_connector.async_cancel_all_orders(
+                symbol=self.dydx_symbol
+            )
+            return
+        # Other cycles may still have open exits
+        for order_id in order_ids:
+            await self._cancel_order(cycle, order_id)
 
-    def _cancel_orders(self):
-        self.dydx_connector.cancel_all_orders(symbol=self.dydx_symbol)
+    async def _cancel_order(self, _cycle: TradeCycle, order_id: str):
+        try:
+            await self.dydx_connector.async_cancel_order(order_id)
+        except Exception as error:
+            LOGGER.error(f"Failed to cancel order {order_id}: {error}")
 
     def _account_listener(self, account_update):
         if "contents" not in account_update:
             return
-
-        if "fills" in account_update["contents"]:
-            for fill in account_update["contents"]["fills"]:
-                if fill["orderClientId"].startswith("mk"):
-                    self.is_market_filled = True
-                    self.openeng_fill = fill
-                elif fill["orderClientId"].startswith("lm"):
-                    self.is_limit_filled = True
-                    self.closing_fill = fill
-                elif fill["orderClientId"].startswith("ts"):
-                    self.is_trailing_filled = True
-                    self.closing_fill = fill
-                elif fill["orderClientId"].startswith("cp"):
-                    self.is_closing_filled = True
-                    self.closing_fill = fill
-
-        if "orders" in account_update["contents"]:
-            for order in account_update["contents"]["orders"]:
-                LOGGER.info(
-                    f"UPDATE | {order['clientId']} {order['status']} | {order['cancelReason']}"
+        for order in account_update["contents"].get("orders", []):
+            LOGGER.info(
+                f"UPDATE | {order['clientId']} {order['status']} | {order['cancelReason']}"
+            )
+        for event in self.get_account_events(account_update):
+            if (
+                event.kind == trade_cycle.EVENT_FILL
+                and event.role == OrderRole.MARKET
+                and event.cycle_id in self.market_sent_ns
+            ):
+                self.latency.record_since(
+                    "market -> fill", self.market_sent_ns.pop(event.cycle_id)
                 )
-
-                if order["status"] == "CANCELED":
-                    if order["clientId"].startswith("mk"):
-                        self.market_filled_or_canceled.set()
-                    elif order["clientId"].startswith("lm"):
-                        self.limit_filled_or_canceled.set()
-                    elif order["clientId"].startswith("ts"):
-                        self.trailing_filled_or_canceled.set()
-
-                elif order["status"] == "FILLED":
-                    if order["clientId"].startswith("mk"):
-                        self.market_filled_or_canceled.set()
-                    elif order["clientId"].startswith("lm"):
-                        self.limit_filled_or_canceled.set()
-                        self.mirror_filled.set()
-                    elif order["clientId"].startswith("ts"):
-                        self.trailing_filled_or_canceled.set()
-                        self.mirror_filled.set()
-                    elif order["clientId"].startswith("cp"):
-                        self.position_closed.set()
-
-                elif order["status"] == "OPEN":
-                    if order["clientId"].startswith("lm"):
-                        self.is_limit_opened = True
-
-                elif order["status"] == "UNTRIGGERED":
-                    if order["clientId"].startswith("ts"):
-                        self.is_trailing_opened = True
+            elif (
+                event.kind == trade_cycle.EVENT_ORDER
+                and event.role == OrderRole.MARKET
+                and event.data["status"] in FINAL_STATUSES
+            ):
+                # A FOK market order can be canceled without a fill
+                self.market_sent_ns.pop(event.cycle_id, None)
+            self.events.put_nowait(event)
 
     def _setup(self):
         self.loop.set_exception_handler(custom_exception_handler)
+        # kill -USR1 <pid> prints the latency table and appends it to
+        # latency_path
+        self.loop.add_signal_handler(signal.SIGUSR1, self.dump_latency)
         tasks = [
             self.loop.create_task(
-                self._listen_binance(), name="listen binance"
+                self.binance_feed.run(), name="binance market feed"
+            ),
+            self.loop.create_task(
+                self._process_events(), name="process cycle events"
             ),
             self.loop.create_task(
                 self.dydx_connector.async_start(),
                 name="dydx connector async start",
             ),
+            self.loop.create_task(
+                self._prepare_orders(self.cycle_counter + 1),
+                name="prepare orders",
+            ),
         ]
         for task in tasks:
             task.add_done_callback(handle_task_result)
 
     def run(self):
-        self.dydx_connector.add_account_subscription()
-        self.dydx_connector.add_account_listener(self._account_listener)
+        self.dydx_connector.refresh_account()
+        self.dydx_connector.add_account_subscription(self._account_listener)
         self._setup()
         self.loop.run_forever()
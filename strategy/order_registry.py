@@ -0,0 +1,107 @@
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from enum import Enum
+
+FINAL_STATUSES = ("FILLED", "CANCELED")
+
+
+class OrderRole(Enum):
+    """Values are the client id prefixes"""
+
+    MARKET = "mk"
+    LIMIT = "lm"
+    TRAILING = "ts"
+    CLOSE_POSITION = "cp"
+
+
+@dataclass
+class TrackedOrder:
+    # pylint: disable=too-many-instance-attributes
+    client_id: str
+    role: OrderRole
+    cycle_id: int
+    symbol: str = None
+    order_id: str = None
+    status: str = None
+    fills: list = field(default_factory=list)
+    # Resolved with the final status, FILLED or CANCELED
+    finished: Future = field(default_factory=Future)
+
+    @property
+    def is_opened(self) -> bool:
+        return self.order_id is not None and not self.is_finished
+
+    @property
+    def is_finished(self) -> bool:
+        return self.finished.done()
+
+    @property
+    def is_filled(self) -> bool:
+        return self.status == "FILLED"
+
+    @property
+    def filled_size(self) -> float:
+        return sum(float(fill["size"]) for fill in self.fills)
+
+
+class OrderRegistry:
+    """
+    Orders of all cycles and symbols indexed by client id, exchange
+    order id and cycle, so account updates are matched to their order
+    by lookup instead of by client id prefix.
+    """
+
+    def __init__(self) -> None:
+        self.by_client_id = {}
+        self.by_order_id = {}
+        self.by_cycle = {}
+
+    def register(
+        self, client_id: str, role: OrderRole, cycle_id: int, symbol=None
+    ) -> TrackedOrder:
+        """Register before sending, updates can beat the response"""
+        order = TrackedOrder(client_id, role, cycle_id, symbol)
+        self.by_client_id[client_id] = order
+        # Resent orders share the role, so they are kept by client id
+        self.by_cycle.setdefault(cycle_id, {})[client_id] = order
+        return order
+
+    def get(self, client_id: str) -> TrackedOrder:
+        return self.by_client_id.get(client_id)
+
+    def get_by_order_id(self, order_id: str) -> TrackedOrder:
+        return self.by_order_id.get(order_id)
+
+    def get_cycle_orders(self, cycle_id: int) -> dict:
+        """Return value: role -> the last registered TrackedOrder"""
+        return {
+            order.role: order
+            for order in self.by_cycle.get(cycle_id, {}).values()
+        }
+
+    def on_fill(self, fill: dict) -> TrackedOrder:
+        """Return value: the filled order or None if it is not tracked"""
+        order = self.by_client_id.get(
+            fill.get("orderClientId")
+        ) or self.by_order_id.get(fill.get("orderId"))
+        if order is not None:
+            order.fills.append(fill)
+        return order
+
+    def on_order(self, update: dict) -> TrackedOrder:
+        """Return value: the updated order or None if it is not tracked"""
+        order = self.by_client_id.get(update.get("clientId"))
+        if order is None:
+            return None
+        if order.order_id is None and update.get("id") is not None:
+            order.order_id = update["id"]
+            self.by_order_id[order.order_id] = order
+        order.status = update["status"]
+        if order.status in FINAL_STATUSES and not order.finished.done():
+            order.finished.set_result(order.status)
+        return order
+
+    def remove_cycle(self, cycle_id: int) -> None:
+        for order in self.by_cycle.pop(cycle_id, {}).values():
+            self.by_client_id.pop(order.client_id, None)
+            self.by_order_id.pop(order.order_id, None)
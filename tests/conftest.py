@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from strategy.arbitrage.backtester import TradeArrays
+from strategy.arbitrage.cycle_runner import Settings
+
+
+def make_trades(rows: list) -> TradeArrays:
+    """rows: (time ms, price, is taker buy)"""
+    return TradeArrays(
+        np.array([row[0] for row in rows], dtype=np.int64),
+        np.array([row[1] for row in rows], dtype=np.float64),
+        np.array([row[2] for row in rows], dtype=bool),
+    )
+
+
+@pytest.fixture
+def settings() -> Settings:
+    return Settings(
+        trailing_percent=0.5,
+        quantity=1,
+        profit_threshold=0.001,
+        sec_to_wait=30,
+        sec_after_trade=0,
+        signal_threshold=0.001,
+        dydx_symbol="ETH-USD",
+        dydx_network="backtest",
+        round_digits=1,
+    )
+
+
+@pytest.fixture
+def trades() -> tuple:
+    """Binance and dYdX trades of one jump that is traded"""
+    binance_trades = make_trades(
+        [(1000, 30000.0, True), (1050, 30015.0, True), (1100, 30040.0, True)]
+    )
+    dydx_trades = make_trades(
+        [(1200, 1000.0, True), (1300, 1000.5, False), (1500, 1001.5, True)]
+    )
+    return binance_trades, dydx_trades
@@ -0,0 +1,54 @@
+from connectors.binance.agg_trades_fetcher import AggTradesFetcher
+from connectors.binance.agg_trades_fetcher import read_columns
+
+TRADES = [
+    {
+        "a": 100 + i,
+        "p": str(30000 + i),
+        "q": "0.5",
+        "f": 1000 + i,
+        "l": 1000 + i,
+        "T": 1_000_000 + 10 * i,
+        "m": i % 2 == 0,
+    }
+    for i in range(250)
+]
+
+
+def get_agg_trades(fromId=None, startTime=None, endTime=None, limit=500):
+    if fromId is not None:
+        trades = [trade for trade in TRADES if trade["a"] >= fromId]
+    elif startTime is not None:
+        trades = [
+            trade for trade in TRADES if startTime <= trade["T"] <= endTime
+        ]
+    else:
+        return TRADES[-limit:]
+    return trades[:limit]
+
+
+def get_fetcher(path) -> AggTradesFetcher:
+    fetcher = AggTradesFetcher(
+        get_agg_trades,
+        str(path),
+        start_ms=1_000_000 + 5,
+        end_ms=1_000_000 + 2000,
+        pages_per_chunk=2,
+        max_workers=3,
+    )
+    fetcher.page_size = 7
+    return fetcher
+
+
+def test_fetch_in_order_and_resume(tmp_path):
+    get_fetcher(tmp_path).run()
+    columns = read_columns(str(tmp_path))
+    assert list(columns["id"]) == list(range(101, 300))
+    assert columns["time"][-1] == 1_000_000 + 1990
+    assert not columns["is_buyer_maker"][0]
+
+    # A half written row is dropped and fetched again on resume
+    with open(tmp_path / "price.bin", "ab") as file:
+        file.write(b"\x00" * 4)
+    get_fetcher(tmp_path).run()
+    assert list(read_columns(str(tmp_path))["id"]) == list(range(101, 300))
@@ -0,0 +1,57 @@
+import pytest
+from conftest import make_trades
+
+from strategy.arbitrage.backtester import Backtester
+from strategy.arbitrage.backtester import Latencies
+from strategy.arbitrage.cycle_runner import CycleRunner
+
+
+def test_jump_is_traded_through_the_cycle(settings):
+    # Binance jumps by 0.13% within 100 ms
+    binance_trades = make_trades(
+        [(1000, 30000.0, True), (1050, 30015.0, True), (1100, 30040.0, True)]
+    )
+    dydx_trades = make_trades(
+        [
+            # Before the market order arrives at 1100 + 10 + 20
+            (1120, 999.0, True),
+            (1200, 1000.0, True),
+            (1300, 1000.5, False),
+            # Through the limit at 1001.0
+            (1500, 1001.5, True),
+        ]
+    )
+    backtester = Backtester(
+        settings, binance_trades, dydx_trades, Latencies(10, 20, 20)
+    )
+    cycles = backtester.run()
+    assert len(cycles) == 1
+    cycle = cycles[0]
+    assert cycle.side == "BUY"
+    assert cycle.opening_fill["price"] == "1000.0"
+    assert cycle.closing_fill["price"] == "1001.0"
+    assert backtester.processed > len(dydx_trades.time)
+
+
+def test_timeout_closes_position(settings):
+    binance_trades = make_trades([(1000, 30000.0, True), (1050, 30060.0, True)])
+    dydx_trades = make_trades(
+        [(1200, 1000.0, True)]
+        + [(2000 + 1000 * i, 1000.0, i % 2 == 0) for i in range(40)]
+    )
+    cycles = Backtester(
+        settings, binance_trades, dydx_trades, Latencies(10, 20, 20)
+    ).run()
+    assert len(cycles) == 1
+    assert cycles[0].opening_fill["price"] == "1000.0"
+    assert cycles[0].closing_fill["price"] == "1000.0"
+    assert cycles[0].get_profit() < 0
+
+
+def test_runner_must_execute_actions(settings):
+    class Runner(CycleRunner):
+        # pylint: disable=too-few-public-methods
+        pass
+
+    with pytest.raises(TypeError):
+        Runner(settings, "test")
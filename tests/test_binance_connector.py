@@ -0,0 +1,112 @@
+import asyncio
+from datetime import timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from connectors.binance import connector as binance_connector
+from connectors.binance.connector import BinanceConnector
+
+SYMBOL_INFO = {
+    "symbol": "ETHUSDT",
+    "filters": [
+        {"filterType": "LOT_SIZE", "stepSize": "0.00100000"},
+        {"filterType": "PRICE_FILTER", "tickSize": "0.10000000"},
+    ],
+}
+
+
+class FakeClient:
+    def __init__(self, *_) -> None:
+        self.requests = []
+
+    def get_exchange_info(self) -> dict:
+        self.requests.append("exchange info")
+        return {"symbols": [SYMBOL_INFO]}
+
+    def get_symbol_info(self, symbol: str) -> dict:
+        self.requests.append(symbol)
+
+
+class FakeSocket:
+    # pylint: disable=too-few-public-methods
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *_):
+        return False
+
+    async def recv(self) -> dict:
+        await asyncio.sleep(0.01)
+        return {
+            "stream": "ethusdt@trade",
+            "data": {"s": "ETHUSDT", "m": True, "p": "3000", "q": "1", "E": 1},
+        }
+
+
+@pytest.fixture(name="connector")
+def fixture_connector(monkeypatch) -> BinanceConnector:
+    monkeypatch.setattr(binance_connector, "Client", FakeClient)
+    # The symbol info cache is shared by all connectors
+    monkeypatch.setattr(BinanceConnector, "symbol_infos", {})
+    return BinanceConnector("key", "secret", ["ETHUSDT", "BTCUSD_PERP"])
+
+
+def test_symbol_filters_are_loaded_on_first_use(connector):
+    assert not connector.sync_client.requests
+    assert connector.trunc_price("ETHUSDT", 3000.129) == 3000.1
+    assert connector.trunc_quantity("ETHUSDT", 0.123456) == 0.123
+    assert connector.sync_client.requests == ["exchange info"]
+
+
+def test_unknown_symbol(connector):
+    with pytest.raises(ValueError, match="BTCUSD_PERP"):
+        connector.trunc_price("BTCUSD_PERP", 3000.129)
+
+
+def test_connectors_have_their_own_state(connector):
+    other = BinanceConnector("key", "secret", ["ETHUSDT"])
+    connector.trunc_price("ETHUSDT", 3000.129)
+    assert "ETHUSDT" not in other.symbol_filters
+    assert other.depth_syncs is not connector.depth_syncs
+
+
+def test_depth_syncs_are_cancelled_on_stop(monkeypatch, connector):
+    requested = []
+    pending = set()
+
+    async def futures_order_book(symbol, limit):
+        assert limit == BinanceConnector.depth_snapshot_limit
+        requested.append(symbol)
+        pending.add(symbol)
+        try:
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            pending.remove(symbol)
+            raise
+
+    async_client = SimpleNamespace(futures_order_book=futures_order_book)
+
+    async def create(*_):
+        return async_client
+
+    monkeypatch.setattr(
+        binance_connector, "AsyncClient", SimpleNamespace(create=create)
+    )
+    monkeypatch.setattr(
+        binance_connector,
+        "BinanceSocketManager",
+        lambda client: SimpleNamespace(
+            futures_multiplex_socket=lambda streams, future_type: FakeSocket()
+        ),
+    )
+
+    async def run():
+        await connector.start(run_duration=timedelta(milliseconds=50))
+        assert not connector.depth_sync_tasks
+        # Lets the cancelled snapshot requests finish
+        await asyncio.sleep(0)
+        assert not pending
+
+    asyncio.run(run())
+    assert sorted(requested) == ["BTCUSD_PERP", "ETHUSDT"]
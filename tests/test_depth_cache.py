@@ -0,0 +1,49 @@
+from decimal import Decimal
+
+from connectors.binance.depth_cache import DepthCache
+
+
+def get_depth_cache(conv_type=float) -> DepthCache:
+    depth_cache = DepthCache("BTCUSDT", conv_type=conv_type)
+    depth_cache.apply_orders(
+        {
+            "E": 1,
+            "bids": [["99.5", "1"], ["100.0", "2"], ["98.0", "3"]],
+            "asks": [["101.0", "1"], ["100.5", "2"], ["102.0", "3"]],
+        }
+    )
+    return depth_cache
+
+
+def test_top_levels_are_sorted():
+    depth_cache = get_depth_cache()
+    assert depth_cache.top_bids(2) == [[100.0, 2.0], [99.5, 1.0]]
+    assert depth_cache.top_asks(2) == [[100.5, 2.0], [101.0, 1.0]]
+    assert depth_cache.get_bids()[-1] == [98.0, 3.0]
+    assert depth_cache.get_best_ask() == 100.5
+
+
+def test_zero_quantity_removes_level():
+    depth_cache = get_depth_cache()
+    depth_cache.apply_orders({"E": 2, "b": [["100.00000000", "0.00000000"]]})
+    assert depth_cache.get_best_bid() == 99.5
+
+
+def test_trade_removes_crossed_levels():
+    depth_cache = get_depth_cache()
+    depth_cache.apply_trade(
+        {"E": 3, "aggressor_side": "BUY", "p": "102.0", "qty": 0.5}
+    )
+    assert depth_cache.get_asks() == [[102.0, 3.0]]
+    depth_cache.apply_trade(
+        {"E": 4, "aggressor_side": "SELL", "p": "99.0", "qty": 0.5}
+    )
+    assert depth_cache.get_bids() == [[99.0, 0.5], [98.0, 3.0]]
+
+
+def test_snapshot_round_trip():
+    depth_cache = get_depth_cache(Decimal)
+    restored = DepthCache.from_bytes(depth_cache.to_bytes(), Decimal)
+    assert restored.timestamp == 1
+    assert restored.get_bids() == depth_cache.get_bids()
+    assert restored.get_asks() == depth_cache.get_asks()
@@ -0,0 +1,51 @@
+from connectors.binance.depth_sync import DepthSync
+
+SNAPSHOT = {
+    "lastUpdateId": 100,
+    "E": 1,
+    "bids": [["99.0", "1"]],
+    "asks": [["101.0", "1"]],
+}
+
+
+def get_event(first_id, last_id, previous_id, bids=(), asks=()) -> dict:
+    return {
+        "e": "depthUpdate",
+        "E": last_id,
+        "s": "BTCUSDT",
+        "U": first_id,
+        "u": last_id,
+        "pu": previous_id,
+        "b": list(bids),
+        "a": list(asks),
+    }
+
+
+def test_buffered_events_are_applied_after_snapshot():
+    depth_sync = DepthSync("BTCUSDT")
+    assert not depth_sync.on_event(get_event(90, 95, 89, [["98.0", "1"]]))
+    assert not depth_sync.on_event(get_event(96, 105, 95, [["99.0", "2"]]))
+    assert depth_sync.on_snapshot(SNAPSHOT)
+    assert depth_sync.depth_cache.top_bids(2) == [[99.0, 2.0]]
+    assert depth_sync.on_event(get_event(106, 110, 105, [], [["100.5", "3"]]))
+    assert depth_sync.depth_cache.get_best_ask() == 100.5
+    assert depth_sync.depth_cache.last_update_id == 110
+
+
+def test_gap_requests_new_snapshot():
+    depth_sync = DepthSync("BTCUSDT")
+    depth_sync.on_event(get_event(96, 105, 95))
+    assert depth_sync.on_snapshot(SNAPSHOT)
+    assert not depth_sync.on_event(get_event(111, 115, 110))
+    assert depth_sync.needs_snapshot
+    assert not depth_sync.is_synced
+    assert depth_sync.resyncs == 1
+    assert not depth_sync.on_event(get_event(116, 120, 115))
+    assert depth_sync.buffer
+
+
+def test_stale_snapshot_is_rejected():
+    depth_sync = DepthSync("BTCUSDT")
+    depth_sync.on_event(get_event(120, 130, 119))
+    assert not depth_sync.on_snapshot(SNAPSHOT)
+    assert depth_sync.needs_snapshot
@@ -0,0 +1,268 @@
+import asyncio
+import json
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+from dydx3.errors import DydxApiError
+
+from connectors.dydx import connector
+from connectors.dydx.async_client import ApiResponse
+from connectors.dydx.connector import DydxConnector
+from connectors.dydx.connector import OrderRequest
+from connectors.dydx.connector import RATE_LIMITS
+from connectors.dydx.subscription import CHANNEL_ACCOUNTS
+from connectors.dydx.subscription import CHANNEL_ORDERBOOK
+from connectors.dydx.subscription import CHANNEL_TRADES
+from utils.rate_limiter import RateLimiter
+
+SNAPSHOT = {
+    "bids": [{"price": "99", "size": "1", "offset": "10"}],
+    "asks": [{"price": "101", "size": "1", "offset": "12"}],
+}
+
+
+def get_connector(monkeypatch, public=None, private=None) -> DydxConnector:
+    """A connector over a stubbed dydx3 client, without a network"""
+
+    def get_client(**kwargs):
+        return SimpleNamespace(
+            network_id=kwargs["network_id"],
+            host=kwargs["host"],
+            onboarding=SimpleNamespace(derive_stark_key=lambda: "key"),
+            public=public,
+            private=private,
+        )
+
+    monkeypatch.setattr(connector, "Client", get_client)
+    return DydxConnector(rate_limiter=RateLimiter(RATE_LIMITS))
+
+
+def send(dydx: DydxConnector, message: dict) -> None:
+    dydx.websocket_manager.on_message(json.dumps(message), time.monotonic_ns())
+
+
+def orderbook_message(message_type: str, contents: dict = None) -> dict:
+    message = {
+        "type": message_type,
+        "channel": CHANNEL_ORDERBOOK,
+        "id": "ETH-USD",
+    }
+    if contents is not None:
+        message["contents"] = contents
+    return message
+
+
+def test_unsubscribed_ack_during_resync(monkeypatch):
+    dydx = get_connector(monkeypatch)
+    dydx.add_orderbook_subscription("ETH-USD")
+    dydx.websocket_manager.assign(dydx.subscriptions.values())
+    sent = []
+
+    async def send_request(message: str) -> None:
+        sent.append(json.loads(message)["type"])
+
+    dydx.websocket_manager.shards[0].websocket = SimpleNamespace(
+        send=send_request
+    )
+    updates = []
+    dydx.add_orderbook_listener(updates.append)
+
+    async def resync():
+        send(dydx, orderbook_message("subscribed", SNAPSHOT))
+        # Goes back before the snapshot offset
+        send(
+            dydx,
+            orderbook_message(
+                "channel_data", {"offset": "5", "bids": [], "asks": []}
+            ),
+        )
+        await asyncio.gather(*dydx.websocket_manager.resubscribe_tasks)
+        send(dydx, orderbook_message("unsubscribed"))
+        send(dydx, {"type": "error", "message": "Invalid subscription id"})
+        send(dydx, orderbook_message("subscribed", SNAPSHOT))
+
+    asyncio.run(resync())
+    assert sent == ["unsubscribe", "subscribe"]
+    assert not dydx.websocket_manager.resubscribe_tasks
+    assert len(updates) == 2
+    stats = dydx.get_resync_stats()["ETH-USD"]
+    assert (stats["gaps"], stats["resyncs"]) == (1, 1)
+
+
+def test_trade_dict_has_wall_clock_receive_time(monkeypatch):
+    dydx = get_connector(monkeypatch)
+    trades = []
+    dydx.add_trade_subscription("ETH-USD", trades.append)
+    trade = {
+        "side": "BUY",
+        "size": "0.5",
+        "price": "1000.5",
+        "createdAt": "2022-01-01T00:00:00.000Z",
+    }
+    send(
+        dydx,
+        {
+            "type": "channel_data",
+            "channel": CHANNEL_TRADES,
+            "id": "ETH-USD",
+            "contents": {"trades": [trade]},
+        },
+    )
+    assert len(trades) == 1
+    trade_dict = trades[0].to_dict()
+    assert trade_dict == dict(
+        trade,
+        size=0.5,
+        price=1000.5,
+        exchange="dydx",
+        symbol="ETH-USD",
+        recieveTime=trade_dict["recieveTime"],
+    )
+    receive_time = datetime.strptime(
+        trade_dict["recieveTime"], "%Y-%m-%dT%H:%M:%S.%fZ"
+    )
+    assert abs((datetime.utcnow() - receive_time).total_seconds()) < 60
+
+
+ACCOUNT = {"id": "a1", "positionId": "7", "quoteBalance": "100"}
+
+
+def get_order_requests() -> list:
+    """The second order is rejected"""
+    return [
+        OrderRequest(
+            method,
+            {
+                "symbol": "ETH-USD",
+                "side": "SELL",
+                "price": price,
+                "quantity": "0.01",
+                "client_id": f"{method}-{price}",
+            },
+        )
+        for method, price in [
+            ("send_limit_order", "1001"),
+            ("send_market_order", "0"),
+            ("send_limit_order", "1002"),
+        ]
+    ]
+
+
+def create_order(position_id: str, **order_params) -> dict:
+    assert position_id == "7"
+    if order_params["price"] == "0":
+        raise DydxApiError(ApiResponse(400, '{"errors": ["Invalid price"]}'))
+    return {"order": {"clientId": order_params["client_id"]}}
+
+
+def check_results(requests: list, results: list) -> None:
+    assert [result.request for result in results] == requests
+    assert results[0].response["order"]["clientId"] == "send_limit_order-1001"
+    assert results[2].response["order"]["clientId"] == "send_limit_order-1002"
+    assert results[1].response is None
+    assert isinstance(results[1].error, DydxApiError)
+    assert results[1].error.status_code == 400
+    assert all(result.elapsed_ns > 0 for result in results)
+
+
+def test_send_batch(monkeypatch):
+    private = SimpleNamespace(
+        get_account=lambda: {"account": dict(ACCOUNT)},
+        create_order=create_order,
+    )
+    dydx = get_connector(monkeypatch, private=private)
+    requests = get_order_requests()
+    check_results(requests, dydx.send_batch(requests))
+
+
+def test_async_send_batch_keeps_request_order(monkeypatch):
+    dydx = get_connector(monkeypatch)
+    dydx.account = dict(ACCOUNT)
+    done = []
+
+    async def async_create_order(position_id, signature, **order_params):
+        assert signature == "signature"
+        # The first order is answered last
+        await asyncio.sleep(0.01 if order_params["price"] == "1001" else 0)
+        done.append(order_params["client_id"])
+        return create_order(position_id, **order_params)
+
+    async def sign(_position_id, _order_params):
+        return "signature"
+
+    dydx.async_client = SimpleNamespace(create_order=async_create_order)
+    dydx.order_signer = SimpleNamespace(
+        pop=lambda position_id, order_params: None, sign=sign
+    )
+    requests = get_order_requests()
+    results = asyncio.run(dydx.async_send_batch(requests))
+    assert done[-1] == "send_limit_order-1001"
+    check_results(requests, results)
+
+
+def test_account_updates_refresh_the_cache(monkeypatch):
+    dydx = get_connector(monkeypatch)
+    updates = []
+    dydx.subscribe(CHANNEL_ACCOUNTS, None, {}, updates.append)
+    send(
+        dydx,
+        {
+            "type": "subscribed",
+            "channel": CHANNEL_ACCOUNTS,
+            "contents": {"account": dict(ACCOUNT)},
+        },
+    )
+    assert dydx.get_position_id() == "7"
+    send(
+        dydx,
+        {
+            "type": "channel_data",
+            "channel": CHANNEL_ACCOUNTS,
+            "contents": {
+                "accounts": [
+                    {"id": "a1", "quoteBalance": "90"},
+                    {"id": "other", "quoteBalance": "0"},
+                ],
+                "orders": [],
+            },
+        },
+    )
+    assert dydx.account == dict(ACCOUNT, quoteBalance="90")
+    assert len(updates) == 2
+
+
+def test_updates_go_to_their_subscription(monkeypatch):
+    dydx = get_connector(monkeypatch)
+    received = {symbol: [] for symbol in ("ETH-USD", "BTC-USD")}
+    for symbol, updates in received.items():
+        dydx.add_trade_subscription(symbol, updates.append)
+        dydx.add_orderbook_subscription(symbol, updates.append)
+    all_trades = []
+    dydx.add_trade_listener(all_trades.append)
+
+    send(
+        dydx,
+        {
+            "type": "channel_data",
+            "channel": CHANNEL_TRADES,
+            "id": "BTC-USD",
+            "contents": {
+                "trades": [
+                    {
+                        "side": "SELL",
+                        "size": "1",
+                        "price": "50000",
+                        "createdAt": "2022-01-01T00:00:00.000Z",
+                    }
+                ]
+            },
+        },
+    )
+    send(dydx, orderbook_message("subscribed", SNAPSHOT))
+    # Not subscribed
+    send(dydx, {"type": "channel_data", "channel": "v3_markets"})
+
+    assert [trade.symbol for trade in received["BTC-USD"]] == ["BTC-USD"]
+    assert all_trades == received["BTC-USD"]
+    assert [update["id"] for update in received["ETH-USD"]] == ["ETH-USD"]
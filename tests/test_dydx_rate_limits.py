@@ -0,0 +1,51 @@
+from datetime import datetime
+from functools import partial
+from types import SimpleNamespace
+
+from connectors.dydx.connector import DydxConnector
+from connectors.dydx.connector import ENDPOINT_PUBLIC
+from connectors.dydx.connector import RATE_LIMITS
+from utils.rate_limiter import RateLimiter
+
+
+def get_connector(pages: list) -> SimpleNamespace:
+    """Just what the rate limited methods use, without a network"""
+    pages = list(pages)
+    public = SimpleNamespace(
+        get_trades=lambda symbol, starting_before_or_at: {
+            "trades": pages.pop(0)
+        }
+    )
+    connector = SimpleNamespace(
+        rate_limiter=RateLimiter(RATE_LIMITS),
+        sync_client=SimpleNamespace(public=public),
+    )
+    connector.get_trades = partial(DydxConnector.get_trades, connector)
+    return connector
+
+
+def get_public_requests(connector: SimpleNamespace) -> int:
+    return connector.rate_limiter.get_stats()[ENDPOINT_PUBLIC]["requests"]
+
+
+def test_get_trades_takes_one_token():
+    connector = get_connector([[]])
+    DydxConnector.get_trades(connector, "ETH-USD")
+    assert get_public_requests(connector) == 1
+
+
+def test_get_historical_trades_takes_one_token_per_page():
+    connector = get_connector(
+        [
+            [{"createdAt": "2022-01-01T12:00:00.000Z"}],
+            [{"createdAt": "2021-12-31T23:59:59.000Z"}],
+        ]
+    )
+    trades = DydxConnector.get_historical_trades(
+        connector, "ETH-USD", datetime(2022, 1, 1), datetime(2022, 1, 2)
+    )
+    assert [trade["createdAt"][:10] for trade in trades] == [
+        "2021-12-31",
+        "2022-01-01",
+    ]
+    assert get_public_requests(connector) == 2
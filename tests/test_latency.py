@@ -0,0 +1,26 @@
+import time
+
+from utils.latency import LatencyRecorder
+
+
+def test_ring_keeps_last_samples():
+    recorder = LatencyRecorder(capacity=100)
+    for latency_us in range(1, 201):
+        recorder.record("send", latency_us * 1000)
+    stats = recorder.get_stats()["send"]
+    assert stats.count == 200
+    assert stats.max == 200
+    assert 150 <= stats.p50 <= 151
+    assert stats.p99 > 198
+
+
+def test_record_since_and_dump(tmp_path):
+    recorder = LatencyRecorder()
+    start_ns = time.monotonic_ns()
+    end_ns = recorder.record_since("stage", start_ns)
+    assert recorder.get_stats()["stage"].max == (end_ns - start_ns) / 1000
+    path = tmp_path / "latency.log"
+    recorder.dump(str(path))
+    lines = path.read_text().splitlines()
+    assert lines[1].split()[:2] == ["stage", "count"]
+    assert lines[2].split()[:2] == ["stage", "1"]
@@ -0,0 +1,68 @@
+import json
+
+from connectors.binance.market_feed import BinanceMarketFeed
+from connectors.binance.market_feed import STREAM_BOOK_TICKER
+from connectors.binance.market_feed import STREAM_TRADE
+
+
+def get_trade_message(time_ms: int, is_buyer_maker: bool, kind="MARKET"):
+    data = {
+        "e": "trade",
+        "E": time_ms + 1,
+        "T": time_ms,
+        "s": "BTCUSD_PERP",
+        "t": 1,
+        "p": "30000.1",
+        "q": "2",
+        "X": kind,
+        "m": is_buyer_maker,
+    }
+    return json.dumps(
+        {"stream": "btcusd_perp@trade", "data": data}, separators=(",", ":")
+    )
+
+
+def test_trades_are_filtered_before_decoding():
+    feed = BinanceMarketFeed(["BTCUSD_PERP"], skip_buyer_maker=True)
+    trades = []
+    feed.add_listener(STREAM_TRADE, trades.append)
+    feed.min_trade_time_ms = 1000
+    feed.on_message(get_trade_message(2000, True), 0)
+    feed.on_message(get_trade_message(2000, False, "INSURANCE_FUND"), 0)
+    feed.on_message(get_trade_message(1000, False), 0)
+    feed.on_message(get_trade_message(2000, False), 5)
+    assert feed.filtered == 3
+    assert len(trades) == 1
+    assert trades[0].price == 30000.1
+    assert trades[0].time_ms == 2000
+    assert trades[0].receive_ns == 5
+
+
+def test_book_ticker():
+    feed = BinanceMarketFeed(["BTCUSD_PERP"])
+    best_prices = []
+    feed.add_listener(STREAM_BOOK_TICKER, best_prices.append)
+    feed.on_message(get_trade_message(2000, False), 0)
+    feed.on_message(
+        json.dumps(
+            {
+                "stream": "btcusd_perp@bookTicker",
+                "data": {
+                    "e": "bookTicker",
+                    "u": 7,
+                    "s": "BTCUSD_PERP",
+                    "b": "100.0",
+                    "B": "3",
+                    "a": "101.0",
+                    "A": "4",
+                    "T": 1500,
+                    "E": 1501,
+                },
+            },
+            separators=(",", ":"),
+        ),
+        0,
+    )
+    assert len(best_prices) == 1
+    assert best_prices[0].mid == 100.5
+    assert best_prices[0].update_id == 7
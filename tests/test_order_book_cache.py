@@ -0,0 +1,162 @@
+import pytest
+
+from connectors.dydx.order_book_cache import OrderBookCache
+from connectors.dydx.order_book_cache import OrderBookGapError
+from connectors.dydx.tick_order_book import TickOrderBook
+
+SNAPSHOT = {
+    "bids": [
+        {"price": "99", "size": "1", "offset": "10"},
+        {"price": "98", "size": "2", "offset": "11"},
+    ],
+    "asks": [
+        {"price": "101", "size": "1", "offset": "12"},
+        {"price": "102", "size": "2", "offset": "9"},
+    ],
+}
+
+
+def get_order_book() -> OrderBookCache:
+    order_book = OrderBookCache("ETH-USD")
+    order_book.update_orders(SNAPSHOT, is_first_request=True)
+    return order_book
+
+
+def test_snapshot_sets_offset():
+    order_book = get_order_book()
+    assert order_book.is_synced
+    assert order_book.offset == 12
+    assert list(order_book.bids.keys()) == [98, 99]
+    assert list(order_book.asks.keys()) == [101, 102]
+
+
+def test_update_before_snapshot_is_a_gap():
+    order_book = OrderBookCache("ETH-USD")
+    with pytest.raises(OrderBookGapError):
+        order_book.update_orders({"offset": "1", "bids": [], "asks": []})
+
+
+def test_offset_going_back_is_a_gap():
+    order_book = get_order_book()
+    order_book.update_orders(
+        {"offset": "20", "bids": [["99", "0"]], "asks": []}
+    )
+    assert 99 not in order_book.bids
+    with pytest.raises(OrderBookGapError):
+        order_book.update_orders({"offset": "15", "bids": [], "asks": []})
+
+
+def test_snapshot_replaces_stale_levels():
+    order_book = get_order_book()
+    order_book.update_orders(
+        {"offset": "20", "bids": [["97", "5"]], "asks": []}
+    )
+    order_book.update_orders(
+        {"bids": [], "asks": [{"price": "103", "size": "1", "offset": "30"}]},
+        is_first_request=True,
+    )
+    assert not order_book.bids
+    assert list(order_book.asks.keys()) == [103]
+    assert order_book.offset == 30
+
+
+def test_crossing_ask_removes_bids():
+    order_book = OrderBookCache("ETH-USD")
+    # One-sided snapshot: there is no bid to compare the asks with
+    order_book.update_orders(
+        {"bids": [], "asks": SNAPSHOT["asks"]}, is_first_request=True
+    )
+    assert list(order_book.asks.keys()) == [101, 102]
+
+    order_book = get_order_book()
+    # An ask at the best bid locks the book, the bid is stale
+    order_book.update_orders(
+        {"offset": "20", "bids": [], "asks": [["99", "1"]]}
+    )
+    assert list(order_book.bids.keys()) == [98]
+    # An ask through every bid leaves no bids and no error
+    order_book.update_orders(
+        {"offset": "21", "bids": [], "asks": [["90", "1"]]}
+    )
+    assert not order_book.bids
+    assert order_book.asks.keys()[0] == 90
+
+
+def test_tick_order_book_matches_cache():
+    order_book = get_order_book()
+    tick_order_book = TickOrderBook("ETH-USD", tick_size=1, num_ticks=64)
+    tick_order_book.update_orders(SNAPSHOT, is_first_request=True)
+    updates = [
+        {"offset": "20", "bids": [["99", "0"], ["100", "3"]], "asks": []},
+        {"offset": "21", "bids": [], "asks": [["100", "1"]]},
+        {"offset": "22", "bids": [["97", "4"]], "asks": [["101", "0"]]},
+    ]
+    for update in updates:
+        order_book.update_orders(update)
+        tick_order_book.update_orders(update)
+        assert tick_order_book.get_bids() == [
+            (price, float(level["size"]))
+            for price, level in reversed(order_book.bids.items())
+        ]
+        assert tick_order_book.get_asks() == [
+            (price, float(level["size"]))
+            for price, level in order_book.asks.items()
+        ]
+    assert tick_order_book.get_best_bid() == 98
+    assert tick_order_book.get_best_ask() == 100
+
+
+def test_tick_order_book_moves_window():
+    tick_order_book = TickOrderBook("ETH-USD", tick_size=1, num_ticks=16)
+    tick_order_book.update_orders(SNAPSHOT, is_first_request=True)
+    tick_order_book.update_orders(
+        {"offset": "20", "bids": [["120", "1"]], "asks": [["121", "1"]]}
+    )
+    assert tick_order_book.get_bids() == [(120, 1.0)]
+    assert tick_order_book.get_asks() == [(121, 1.0)]
+
+
+def test_top_of_book_follows_updates():
+    order_book = OrderBookCache("ETH-USD", depth=2)
+    order_book.update_orders(SNAPSHOT, is_first_request=True)
+    assert order_book.get_top() == (99, 101, 100, 2, (1, 3), (1, 3), 12)
+    order_book.update_orders(
+        {"offset": "20", "bids": [["100", "2"]], "asks": [["101", "0"]]}
+    )
+    assert order_book.best_bid == 100
+    assert order_book.best_ask == 102
+    assert order_book.bid_depth == [2, 3]
+    assert order_book.ask_depth == [2]
+    assert order_book.get_bid_volume(5) == 3
+    assert order_book.spread == 2
+
+
+def test_apply_delta_reports_changes_and_uncrosses_once():
+    order_book = get_order_book()
+    delta = order_book.apply_delta(
+        {
+            "offset": "20",
+            "bids": [["102", "1"], ["97", "0"], ["98", "0"]],
+            "asks": [["103", "4"]],
+        }
+    )
+    assert delta.bids == {102: "1", 98: "0"}
+    assert delta.asks == {101: "0", 102: "0", 103: "4"}
+    assert order_book.last_delta is delta
+    assert list(order_book.bids.keys()) == [99, 102]
+    assert list(order_book.asks.keys()) == [103]
+    assert order_book.best_bid == 102
+
+
+def test_snapshot_round_trip():
+    order_book = get_order_book()
+    restored = OrderBookCache.from_bytes(order_book.to_bytes(timestamp=1))
+    assert restored.symbol == "ETH-USD"
+    assert restored.is_synced
+    assert restored.offset == order_book.offset
+    assert restored.get_top() == order_book.get_top()
+    assert [float(level["size"]) for level in restored.bids.values()] == [
+        float(level["size"]) for level in order_book.bids.values()
+    ]
+    restored.update_orders({"offset": "20", "bids": [["98", "0"]], "asks": []})
+    assert list(restored.bids.keys()) == [99]
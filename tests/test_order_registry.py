@@ -0,0 +1,43 @@
+from strategy.order_registry import OrderRegistry, OrderRole
+
+
+def test_updates_are_routed_by_client_and_order_id():
+    registry = OrderRegistry()
+    market = registry.register("mk-BUY-1-x", OrderRole.MARKET, 1)
+    limit = registry.register("lm-SELL-1-x", OrderRole.LIMIT, 1)
+    registry.register("mk-SELL-2-x", OrderRole.MARKET, 2)
+
+    assert registry.on_order({"clientId": "other", "status": "OPEN"}) is None
+    registry.on_order({"clientId": "lm-SELL-1-x", "id": "7", "status": "OPEN"})
+    assert limit.is_opened
+    assert registry.get_by_order_id("7") is limit
+
+    assert registry.on_fill({"orderId": "7", "size": "0.5"}) is limit
+    assert registry.on_fill({"orderClientId": "mk-BUY-1-x", "size": "1"})
+    assert limit.filled_size == 0.5
+    assert not market.is_finished
+
+    registry.on_order({"clientId": "mk-BUY-1-x", "id": "8", "status": "FILLED"})
+    assert market.finished.result(timeout=0) == "FILLED"
+    assert market.is_filled
+
+    registry.remove_cycle(1)
+    assert registry.get("lm-SELL-1-x") is None
+    assert registry.get_by_order_id("7") is None
+    assert registry.get("mk-SELL-2-x") is not None
+
+
+def test_remove_cycle_forgets_resent_orders():
+    registry = OrderRegistry()
+    for client_id in ("cp-SELL-1-x", "cp1-SELL-1-x", "cp2-SELL-1-x"):
+        registry.register(client_id, OrderRole.CLOSE_POSITION, 1)
+        registry.on_order(
+            {"clientId": client_id, "id": client_id, "status": "CANCELED"}
+        )
+    orders = registry.get_cycle_orders(1)
+    assert orders[OrderRole.CLOSE_POSITION].client_id == "cp2-SELL-1-x"
+
+    registry.remove_cycle(1)
+    assert not registry.by_client_id
+    assert not registry.by_order_id
+    assert not registry.by_cycle
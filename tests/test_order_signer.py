@@ -0,0 +1,57 @@
+import asyncio
+
+from connectors.dydx import order_signer
+from connectors.dydx.order_signer import OrderSigner
+
+ORDER_PARAMS = {
+    "client_id": "mk-BUY-1",
+    "market": "ETH-USD",
+    "side": "BUY",
+    "size": "0.01",
+    "price": "100000000",
+    "limit_fee": "0.015",
+    "expiration_epoch_seconds": 10613988637,
+}
+
+
+def get_signer(monkeypatch, ttl_sec: float = 3600) -> OrderSigner:
+    signed = []
+
+    def sign_order(network_id, stark_private_key, position_id, order_params):
+        signed.append(order_params["client_id"])
+        return f"{network_id}-{stark_private_key}-{position_id}-{len(signed)}"
+
+    monkeypatch.setattr(order_signer, "sign_order", sign_order)
+    signer = OrderSigner(3, "key", ttl_sec=ttl_sec)
+    # Default executor of the loop: threads see the stub
+    monkeypatch.setattr(signer, "get_executor", lambda: None)
+    signer.signed = signed
+    return signer
+
+
+def test_pop_prepared_signature(monkeypatch):
+    signer = get_signer(monkeypatch)
+    asyncio.run(signer.prepare(7, ORDER_PARAMS))
+    assert signer.signed == ["mk-BUY-1"]
+    assert signer.pop(7, ORDER_PARAMS) == "3-key-7-1"
+    # A signature is used once
+    assert signer.pop(7, ORDER_PARAMS) is None
+
+
+def test_pop_matches_signed_fields_only(monkeypatch):
+    signer = get_signer(monkeypatch)
+    asyncio.run(signer.prepare(7, ORDER_PARAMS))
+    assert signer.pop(8, ORDER_PARAMS) is None
+    assert signer.pop(7, dict(ORDER_PARAMS, price="1")) is None
+    assert signer.pop(7, dict(ORDER_PARAMS, cancel_id="5")) == "3-key-7-1"
+
+
+def test_expired_signatures(monkeypatch):
+    signer = get_signer(monkeypatch, ttl_sec=-1)
+    asyncio.run(signer.prepare(7, ORDER_PARAMS))
+    assert signer.pop(7, ORDER_PARAMS) is None
+
+    asyncio.run(signer.prepare(7, ORDER_PARAMS))
+    asyncio.run(signer.prepare(7, dict(ORDER_PARAMS, client_id="mk-BUY-2")))
+    # prepare drops what expired before it
+    assert len(signer.signatures) == 1
@@ -0,0 +1,40 @@
+from strategy.arbitrage.backtester import Latencies
+from strategy.arbitrage.parameter_sweep import format_table
+from strategy.arbitrage.parameter_sweep import make_grid
+from strategy.arbitrage.parameter_sweep import make_random
+from strategy.arbitrage.parameter_sweep import run_backtest
+from strategy.arbitrage.parameter_sweep import run_sweep
+
+LATENCIES = Latencies(10, 20, 20)
+
+
+def test_make_points(settings):
+    grid = make_grid(
+        settings, signal_threshold=[0.001, 0.01], sec_to_wait=[10, 20, 30]
+    )
+    assert len(grid) == 6
+    assert {point.sec_to_wait for point in grid} == {10, 20, 30}
+    points = make_random(settings, 5, profit_threshold=(0.001, 0.002))
+    assert len(points) == 5
+    assert all(0.001 <= point.profit_threshold <= 0.002 for point in points)
+
+
+def test_sweep_matches_single_backtests(settings, trades):
+    binance_trades, dydx_trades = trades
+    grid = make_grid(settings, signal_threshold=[0.001, 0.01])
+    results = run_sweep(
+        grid, binance_trades, dydx_trades, LATENCIES, max_workers=2
+    )
+    # Best first
+    profits = [result.profit for result in results]
+    assert profits == sorted(profits, reverse=True)
+    by_threshold = {
+        result.settings.signal_threshold: result for result in results
+    }
+    assert sorted(by_threshold) == [0.001, 0.01]
+    assert by_threshold[0.001] == run_backtest(
+        grid[0], binance_trades, dydx_trades, LATENCIES
+    )
+    assert by_threshold[0.001].closed == 1
+    assert by_threshold[0.01].cycles == 0
+    assert len(format_table(results).splitlines()) == 3
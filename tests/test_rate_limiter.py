@@ -0,0 +1,47 @@
+from utils.rate_limiter import Backoff, RateLimiter, TokenBucket
+
+
+def test_token_bucket_burst_and_wait():
+    bucket = TokenBucket(rate=10, capacity=2)
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    assert 0.09 < bucket.reserve() <= 0.1
+
+
+def test_token_bucket_drain():
+    bucket = TokenBucket(rate=10, capacity=5)
+    bucket.drain()
+    assert bucket.reserve() > 0
+
+
+def test_backoff_is_bounded():
+    backoff = Backoff(base_sec=0.1, max_sec=1)
+    for attempt in range(10):
+        assert 0 <= backoff.get_delay(attempt) <= 1
+
+
+def test_rate_limiter_counts_waits():
+    rate_limiter = RateLimiter({"orders": (1000, 1)})
+    rate_limiter.acquire("orders")
+    rate_limiter.acquire("orders")
+    stats = rate_limiter.get_stats()["orders"]
+    assert stats["requests"] == 2
+    assert stats["waits"] == 1
+    assert stats["wait_time_sec"] > 0
+
+
+def test_rate_limiter_retry_budget():
+    rate_limiter = RateLimiter({"orders": (10, 10)}, retry_budget=2)
+    assert rate_limiter.get_retry_delay("orders", 0) is not None
+    assert rate_limiter.get_retry_delay("orders", 0) is not None
+    assert rate_limiter.get_retry_delay("orders", 0) is None
+    for _ in range(20):
+        rate_limiter.on_success()
+    assert rate_limiter.get_retry_delay("orders", 0) is not None
+    assert rate_limiter.get_stats()["orders"]["retries_denied"] == 1
+
+
+def test_shared_rate_limiter():
+    first = RateLimiter.shared("account", {"orders": (10, 10)})
+    second = RateLimiter.shared("account", {"orders": (10, 10)})
+    assert first is second
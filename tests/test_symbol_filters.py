@@ -0,0 +1,23 @@
+from connectors.binance.symbol_filters import SymbolFilters, get_decimals
+
+SYMBOL_INFO = {
+    "symbol": "ETHUSDT",
+    "filters": [
+        {"filterType": "PRICE_FILTER", "tickSize": "0.01000000"},
+        {"filterType": "LOT_SIZE", "stepSize": "0.00010000"},
+    ],
+}
+
+
+def test_get_decimals():
+    assert get_decimals("0.01000000") == 2
+    assert get_decimals("1.00000000") == 0
+    assert get_decimals("10") == 0
+
+
+def test_trunc_by_filters():
+    symbol_filters = SymbolFilters.from_symbol_info(SYMBOL_INFO)
+    assert symbol_filters.trunc_price(3000.129) == 3000.12
+    assert symbol_filters.trunc_price(0.29) == 0.29
+    assert symbol_filters.trunc_quantity(0.123456) == 0.1234
+    assert symbol_filters.trunc_quantity(1e-7) == 0
@@ -0,0 +1,121 @@
+from types import SimpleNamespace
+
+from strategy.arbitrage import trade_cycle
+from strategy.arbitrage.trade_cycle import CycleEvent
+from strategy.arbitrage.trade_cycle import TradeCycle
+from strategy.order_registry import OrderRole
+
+SETTINGS = SimpleNamespace(
+    trailing_percent=0.05,
+    quantity=0.01,
+    profit_threshold=0.001,
+    sec_to_wait=30,
+    round_digits=1,
+)
+
+
+def order(role: str, status: str) -> CycleEvent:
+    return CycleEvent(
+        trade_cycle.EVENT_ORDER, 1, role, {"id": role, "status": status}
+    )
+
+
+def fill(role: str, price: str) -> CycleEvent:
+    return CycleEvent(trade_cycle.EVENT_FILL, 1, role, {"price": price})
+
+
+def get_kinds(actions: list) -> list:
+    return [action.kind for action in actions]
+
+
+def open_position(cycle: TradeCycle) -> list:
+    assert get_kinds(cycle.start()) == [trade_cycle.ACTION_SEND_MARKET]
+    cycle.on_event(fill(OrderRole.MARKET, "1000"))
+    return cycle.on_event(order(OrderRole.MARKET, "FILLED"))
+
+
+def test_limit_fill_finishes_cycle():
+    cycle = TradeCycle(1, "BUY", SETTINGS)
+    actions = open_position(cycle)
+    assert get_kinds(actions) == [
+        trade_cycle.ACTION_SEND_EXITS,
+        trade_cycle.ACTION_START_TIMER,
+    ]
+    assert actions[0].value == "1001.0"
+    cycle.on_event(order(OrderRole.LIMIT, "OPEN"))
+    cycle.on_event(fill(OrderRole.LIMIT, "1001"))
+    actions = cycle.on_event(order(OrderRole.LIMIT, "FILLED"))
+    assert get_kinds(actions) == [trade_cycle.ACTION_CANCEL_EXITS]
+    assert cycle.is_done
+    assert abs(cycle.get_profit() - (0.01 - 0.002002 - 0.005)) < 1e-9
+
+
+def test_timeout_closes_position_after_exits_are_canceled():
+    cycle = TradeCycle(1, "SELL", SETTINGS)
+    open_position(cycle)
+    cycle.on_event(order(OrderRole.LIMIT, "OPEN"))
+    cycle.on_event(order(OrderRole.TRAILING, "UNTRIGGERED"))
+    actions = cycle.on_event(CycleEvent(trade_cycle.EVENT_TIMEOUT, 1))
+    assert get_kinds(actions) == [trade_cycle.ACTION_CANCEL_EXITS]
+    assert not cycle.on_event(order(OrderRole.LIMIT, "CANCELED"))
+    actions = cycle.on_event(order(OrderRole.TRAILING, "CANCELED"))
+    assert get_kinds(actions) == [trade_cycle.ACTION_CLOSE_POSITION]
+    cycle.on_event(fill(OrderRole.CLOSE_POSITION, "990"))
+    cycle.on_event(order(OrderRole.CLOSE_POSITION, "FILLED"))
+    assert cycle.is_done
+
+
+def test_canceled_market_ends_cycle():
+    cycle = TradeCycle(1, "BUY", SETTINGS)
+    cycle.start()
+    assert not cycle.on_event(order(OrderRole.MARKET, "CANCELED"))
+    assert cycle.is_done
+
+
+def test_filled_status_before_fill_waits_for_the_fill():
+    cycle = TradeCycle(1, "BUY", SETTINGS)
+    cycle.start()
+    assert not cycle.on_event(order(OrderRole.MARKET, "FILLED"))
+    assert not cycle.is_done
+    actions = cycle.on_event(fill(OrderRole.MARKET, "1000"))
+    assert get_kinds(actions) == [
+        trade_cycle.ACTION_SEND_EXITS,
+        trade_cycle.ACTION_START_TIMER,
+    ]
+    assert not cycle.on_event(order(OrderRole.LIMIT, "FILLED"))
+    assert not cycle.is_done
+    actions = cycle.on_event(fill(OrderRole.LIMIT, "1001"))
+    assert get_kinds(actions) == [trade_cycle.ACTION_CANCEL_EXITS]
+    assert cycle.is_done
+
+
+def close_position(cycle: TradeCycle) -> list:
+    open_position(cycle)
+    cycle.on_event(order(OrderRole.LIMIT, "OPEN"))
+    cycle.on_event(order(OrderRole.TRAILING, "UNTRIGGERED"))
+    cycle.on_event(CycleEvent(trade_cycle.EVENT_TIMEOUT, 1))
+    cycle.on_event(order(OrderRole.LIMIT, "CANCELED"))
+    return cycle.on_event(order(OrderRole.TRAILING, "CANCELED"))
+
+
+def test_canceled_close_position_is_sent_again():
+    cycle = TradeCycle(1, "BUY", SETTINGS)
+    actions = close_position(cycle)
+    assert actions[0].value == 0
+    actions = cycle.on_event(order(OrderRole.CLOSE_POSITION, "CANCELED"))
+    assert get_kinds(actions) == [trade_cycle.ACTION_CLOSE_POSITION]
+    assert actions[0].value == 1
+    cycle.on_event(fill(OrderRole.CLOSE_POSITION, "990"))
+    cycle.on_event(order(OrderRole.CLOSE_POSITION, "FILLED"))
+    assert cycle.is_done
+
+
+def test_close_position_gives_up():
+    cycle = TradeCycle(1, "BUY", SETTINGS)
+    close_position(cycle)
+    for _ in range(TradeCycle.max_close_attempts - 1):
+        cycle.on_event(order(OrderRole.CLOSE_POSITION, "CANCELED"))
+    assert not cycle.is_done
+    assert not cycle.on_event(order(OrderRole.CLOSE_POSITION, "CANCELED"))
+    assert cycle.is_done
+    assert cycle.closing_fill is None
@@ -0,0 +1,53 @@
+import csv
+from datetime import datetime, timedelta
+
+from connectors.dydx.trades_downloader import TradesDownloader, to_iso
+
+START_DT = datetime(2022, 1, 1)
+
+
+def get_fake_trades() -> list:
+    trades = []
+    created_at = START_DT
+    for i in range(1000):
+        # Bursts of trades sharing a timestamp straddle page boundaries
+        if i % 7:
+            created_at += timedelta(milliseconds=250)
+        trades.append(
+            {
+                "side": "BUY",
+                "size": str(i),
+                "price": "3000",
+                "createdAt": to_iso(created_at),
+            }
+        )
+    return trades
+
+
+def test_download_dedups_and_resumes(tmp_path):
+    trades = get_fake_trades()
+    requests = []
+
+    def get_trades(_symbol, starting_before_or_at):
+        requests.append(starting_before_or_at)
+        page = [
+            trade
+            for trade in reversed(trades)
+            if trade["createdAt"] <= starting_before_or_at
+        ]
+        return {"trades": page[:100]}
+
+    output_path = str(tmp_path / "trades.csv")
+    end_dt = START_DT + timedelta(seconds=300)
+    TradesDownloader(
+        get_trades, "ETH-USD", START_DT, end_dt, output_path, slice_sec=60
+    ).run()
+    with open(output_path, "r", encoding="utf8") as file:
+        sizes = [row["size"] for row in csv.DictReader(file)]
+    assert sizes == [trade["size"] for trade in trades]
+
+    requests.clear()
+    TradesDownloader(
+        get_trades, "ETH-USD", START_DT, end_dt, output_path, slice_sec=60
+    ).run()
+    assert not requests
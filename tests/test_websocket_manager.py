@@ -0,0 +1,121 @@
+import asyncio
+import json
+
+import pytest
+
+from connectors.dydx import websocket_manager
+from connectors.dydx.subscription import Subscription
+from connectors.dydx.subscription import CHANNEL_ACCOUNTS
+from connectors.dydx.subscription import CHANNEL_ORDERBOOK
+from connectors.dydx.subscription import CHANNEL_TRADES
+from connectors.dydx.websocket_manager import WebsocketManager
+from connectors.dydx.websocket_manager import SHARD_BY_CHANNEL
+
+SYMBOLS = ["BTC-USD", "ETH-USD", "SOL-USD", "LINK-USD", "AVAX-USD"]
+
+
+def get_subscription(channel: str, symbol: str = None) -> Subscription:
+    request = {"type": "subscribe", "channel": channel}
+    if symbol is not None:
+        request["id"] = symbol
+    return Subscription(channel, symbol, request)
+
+
+class FakeWebsocket:
+    def __init__(self, messages: list) -> None:
+        self.messages = list(messages)
+        self.sent = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *_):
+        return False
+
+    async def send(self, message: str) -> None:
+        self.sent.append(json.loads(message))
+
+    async def recv(self) -> str:
+        if not self.messages:
+            raise ConnectionError("closed")
+        return self.messages.pop(0)
+
+
+def test_shard_by_symbol():
+    manager = WebsocketManager("ws", print, num_connections=3)
+    subscriptions = [
+        get_subscription(channel, symbol)
+        for symbol in SYMBOLS
+        for channel in (CHANNEL_ORDERBOOK, CHANNEL_TRADES)
+    ] + [get_subscription(CHANNEL_ACCOUNTS)]
+    manager.assign(subscriptions)
+
+    assert sum(len(shard.subscriptions) for shard in manager.shards) == 11
+    assert len([shard for shard in manager.shards if shard.subscriptions]) > 1
+    for symbol in SYMBOLS:
+        shards = {
+            manager.get_shard(subscription).index
+            for subscription in subscriptions
+            if subscription.symbol == symbol
+        }
+        # Both channels of a symbol share a connection
+        assert len(shards) == 1
+    # Subscriptions without a symbol go to the first shard
+    assert manager.get_shard(subscriptions[-1]) is manager.shards[0]
+
+    # Assignment doesn't depend on the process
+    other = WebsocketManager("ws", print, num_connections=3)
+    other.assign(subscriptions)
+    assert [shard.subscriptions for shard in manager.shards] == [
+        shard.subscriptions for shard in other.shards
+    ]
+
+
+def test_shard_by_channel():
+    manager = WebsocketManager(
+        "ws", print, num_connections=4, shard_by=SHARD_BY_CHANNEL
+    )
+    subscriptions = [
+        get_subscription(CHANNEL_TRADES, symbol) for symbol in SYMBOLS
+    ]
+    manager.assign(subscriptions)
+    assert len({manager.get_shard(s).index for s in subscriptions}) == 1
+    # assign starts over
+    manager.assign(subscriptions[:1])
+    assert sum(len(shard.subscriptions) for shard in manager.shards) == 1
+
+
+class Disconnected(Exception):
+    pass
+
+
+def test_run_subscribes_and_dispatches(monkeypatch):
+    websocket = FakeWebsocket(["first", "second"])
+    monkeypatch.setattr(
+        websocket_manager.websockets, "connect", lambda host: websocket
+    )
+    messages = []
+    disconnected = []
+
+    def on_disconnect(shard):
+        disconnected.append(shard.index)
+        # Stops the reconnect loop
+        raise Disconnected()
+
+    manager = WebsocketManager(
+        "ws",
+        lambda message, receive_ns: messages.append(message),
+        on_disconnect=on_disconnect,
+    )
+    subscription = get_subscription(CHANNEL_TRADES, "BTC-USD")
+    manager.assign([subscription])
+
+    with pytest.raises(Disconnected):
+        asyncio.run(manager.run())
+
+    assert websocket.sent == [subscription.request]
+    assert messages == ["first", "second"]
+    assert disconnected == [0]
+    assert manager.shards[0].connections == 1
+    # A shard that is down subscribes again when it reconnects
+    assert not manager.resubscribe(subscription)
@@ -0,0 +1,94 @@
+import struct
+import sys
+from array import array
+from typing import NamedTuple
+
+# magic, version, symbol length, timestamp ms, offset, number of bids,
+# number of asks
+HEADER = struct.Struct("<4sBHqqII")
+MAGIC = b"OBSN"
+VERSION = 2
+
+
+class BookSide(NamedTuple):
+    prices: array
+    sizes: array
+    offsets: array
+
+
+class BookSnapshot(NamedTuple):
+    symbol: str
+    timestamp: int
+    offset: int
+    bids: BookSide
+    asks: BookSide
+
+
+def make_side(levels) -> BookSide:
+    """levels: iterable of (price, size, offset)"""
+    side = BookSide(array("d"), array("d"), array("q"))
+    for price, size, offset in levels:
+        side.prices.append(price)
+        side.sizes.append(size)
+        side.offsets.append(offset)
+    return side
+
+
+def _to_little_endian(values: array) -> bytes:
+    if sys.byteorder != "little":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_little_endian(typecode: str, data: memoryview) -> array:
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values
+
+
+def pack_snapshot(snapshot: BookSnapshot) -> bytes:
+    symbol = snapshot.symbol.encode()
+    parts = [
+        HEADER.pack(
+            MAGIC,
+            VERSION,
+            len(symbol),
+            snapshot.timestamp,
+            snapshot.offset,
+            len(snapshot.bids.prices),
+            len(snapshot.asks.prices),
+        ),
+        symbol,
+    ]
+    for side in (snapshot.bids, snapshot.asks):
+        parts.extend(_to_little_endian(values) for values in side)
+    return b"".join(parts)
+
+
+def unpack_snapshot(data: bytes) -> BookSnapshot:
+    (
+        magic,
+        version,
+        symbol_length,
+        timestamp,
+        offset,
+        num_bids,
+        num_asks,
+    ) = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Not an order book snapshot")
+    data = memoryview(data)
+    position = HEADER.size + symbol_length
+    symbol = bytes(data[HEADER.size : position]).decode()
+    sides = []
+    for length in (num_bids, num_asks):
+        values = []
+        for typecode in ("d", "d", "q"):
+            end = position + length * 8
+            values.append(_from_little_endian(typecode, data[position:end]))
+            position = end
+        sides.append(BookSide(*values))
+    return BookSnapshot(symbol, timestamp, offset, sides[0], sides[1])
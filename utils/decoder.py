@@ -0,0 +1,19 @@
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def loads_stdlib(data):
+    return json.loads(data)
+
+
+def get_decoder():
+    if orjson is not None:
+        return orjson.loads
+    return loads_stdlib
+
+
+loads = get_decoder()
@@ -0,0 +1,72 @@
+import time
+from typing import NamedTuple
+
+import numpy as np
+
+
+class LatencyStats(NamedTuple):
+    """Microseconds"""
+
+    count: int
+    p50: float
+    p99: float
+    max: float
+
+
+class LatencyRecorder:
+    """
+    Keeps the last capacity latencies of every stage in preallocated
+    ring buffers. Recording is an array store and an index increment
+    with no locks or allocation, so it can sit on the hot path of the
+    event loop that owns the recorder.
+    """
+
+    def __init__(self, capacity: int = 4096) -> None:
+        self.capacity = capacity
+        self.samples = {}
+        self.counts = {}
+
+    def record(self, stage: str, latency_ns: int) -> None:
+        samples = self.samples.get(stage)
+        if samples is None:
+            samples = self.samples[stage] = np.zeros(
+                self.capacity, dtype=np.int64
+            )
+            self.counts[stage] = 0
+        count = self.counts[stage]
+        samples[count % self.capacity] = latency_ns
+        self.counts[stage] = count + 1
+
+    def record_since(self, stage: str, start_ns: int) -> int:
+        """start_ns: time.monotonic_ns() at the start of the stage
+        Return value: time.monotonic_ns() at the end of the stage"""
+        now_ns = time.monotonic_ns()
+        self.record(stage, now_ns - start_ns)
+        return now_ns
+
+    def get_stats(self) -> dict:
+        """Return value: stage -> LatencyStats of the kept samples"""
+        stats = {}
+        for stage, samples in self.samples.items():
+            count = self.counts[stage]
+            kept = samples[: min(count, self.capacity)] / 1000
+            p50, p99 = np.percentile(kept, [50, 99])
+            stats[stage] = LatencyStats(count, p50, p99, kept.max())
+        return stats
+
+    def format_stats(self) -> str:
+        lines = [
+            f"{'stage':<24}{'count':>10}"
+            + "".join(f"{name:>12}" for name in ("p50 us", "p99 us", "max us"))
+        ]
+        for stage, stats in self.get_stats().items():
+            lines.append(
+                f"{stage:<24}{stats.count:>10}{stats.p50:>12.1f}"
+                f"{stats.p99:>12.1f}{stats.max:>12.1f}"
+            )
+        return "\n".join(lines)
+
+    def dump(self, path: str) -> None:
+        with open(path, "a", encoding="utf8") as file:
+            file.write(f"{time.strftime('%Y-%m-%dT%H:%M:%S')}\n")
+            file.write(self.format_stats() + "\n\n")
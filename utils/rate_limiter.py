@@ -0,0 +1,146 @@
+import asyncio
+import random
+import threading
+import time
+from dataclasses import dataclass, asdict
+
+
+@dataclass
+class RateLimiterStats:
+    requests: int = 0
+    waits: int = 0
+    wait_time_sec: float = 0
+    throttled: int = 0
+    retries: int = 0
+    retries_denied: int = 0
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated) * self.rate
+        )
+        self.updated = now
+
+    def reserve(self, tokens: float = 1) -> float:
+        """Return value: seconds to wait before the tokens may be used"""
+        with self.lock:
+            self._refill()
+            self.tokens -= tokens
+            if self.tokens >= 0:
+                return 0
+            return -self.tokens / self.rate
+
+    def drain(self) -> None:
+        with self.lock:
+            self._refill()
+            self.tokens = min(self.tokens, 0)
+
+
+class Backoff:
+    # pylint: disable=too-few-public-methods
+    def __init__(
+        self, base_sec: float = 0.05, max_sec: float = 5, max_retries: int = 8
+    ) -> None:
+        self.base_sec = base_sec
+        self.max_sec = max_sec
+        self.max_retries = max_retries
+
+    def get_delay(self, attempt: int) -> float:
+        # Full jitter: concurrent clients don't retry in lockstep
+        max_delay = self.base_sec * pow(2, attempt)
+        return random.uniform(0, min(self.max_sec, max_delay))
+
+
+class RateLimiter:
+    """
+    Token buckets keyed by endpoint class plus a shared retry budget.
+    Every success adds retry_ratio to the budget and every retry takes
+    one from it, so retries stay a bounded fraction of the traffic.
+    """
+
+    shared_limiters = {}
+    shared_limiters_lock = threading.Lock()
+
+    def __init__(
+        self,
+        limits: dict,
+        backoff: Backoff = None,
+        retry_ratio: float = 0.1,
+        retry_budget: float = 10,
+    ) -> None:
+        self.buckets = {
+            endpoint_class: TokenBucket(rate, capacity)
+            for endpoint_class, (rate, capacity) in limits.items()
+        }
+        self.stats = {
+            endpoint_class: RateLimiterStats() for endpoint_class in limits
+        }
+        self.backoff = backoff or Backoff()
+        self.retry_ratio = retry_ratio
+        self.retry_budget = retry_budget
+        self.retry_tokens = retry_budget
+        self.lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, key: str, limits: dict) -> "RateLimiter":
+        with cls.shared_limiters_lock:
+            if key not in cls.shared_limiters:
+                cls.shared_limiters[key] = cls(limits)
+            return cls.shared_limiters[key]
+
+    def _reserve(self, endpoint_class: str, tokens: float) -> float:
+        delay = self.buckets[endpoint_class].reserve(tokens)
+        stats = self.stats[endpoint_class]
+        stats.requests += 1
+        if delay > 0:
+            stats.waits += 1
+            stats.wait_time_sec += delay
+        return delay
+
+    def acquire(self, endpoint_class: str, tokens: float = 1) -> None:
+        delay = self._reserve(endpoint_class, tokens)
+        if delay > 0:
+            time.sleep(delay)
+
+    async def async_acquire(
+        self, endpoint_class: str, tokens: float = 1
+    ) -> None:
+        delay = self._reserve(endpoint_class, tokens)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def on_success(self) -> None:
+        with self.lock:
+            self.retry_tokens = min(
+                self.retry_budget, self.retry_tokens + self.retry_ratio
+            )
+
+    def on_throttled(self, endpoint_class: str) -> None:
+        self.stats[endpoint_class].throttled += 1
+        self.buckets[endpoint_class].drain()
+
+    def get_retry_delay(self, endpoint_class: str, attempt: int) -> float:
+        """Return value: backoff delay or None if the retry is not allowed"""
+        stats = self.stats[endpoint_class]
+        with self.lock:
+            if attempt >= self.backoff.max_retries or self.retry_tokens < 1:
+                stats.retries_denied += 1
+                return None
+            self.retry_tokens -= 1
+        stats.retries += 1
+        return self.backoff.get_delay(attempt)
+
+    def get_stats(self) -> dict:
+        return {
+            endpoint_class: asdict(stats)
+            for endpoint_class, stats in self.stats.items()
+        }
@@ -0,0 +1,25 @@
+import asyncio
+from typing import Callable
+
+from utils.logger import LOGGER
+
+
+async def run_forever(
+    connect: Callable,
+    name: str,
+    delay_sec: float = 1,
+    on_disconnect: Callable = None,
+) -> None:
+    """
+    connect: coroutine function that reads a connection until it drops
+    on_disconnect: called after every drop, before the delay
+    """
+    while True:
+        try:
+            await connect()
+        except Exception as error:
+            LOGGER.error(f"{name} disconnected: {error}")
+        finally:
+            if on_disconnect is not None:
+                on_disconnect()
+        await asyncio.sleep(delay_sec)